@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import heapq
+import logging
+from typing import Dict, List, Optional, Sequence
+
+from features import RAW_FEATURES
+from lazy import np, pd
+
+logger = logging.getLogger(__name__)
+
+# Numeric columns that can be ranked, summarized or binned
+NUMERIC_COLUMNS = {
+    "cricket": ["No"] + RAW_FEATURES["cricket"],
+    "football": RAW_FEATURES["football"] + ["JerseyNumber"],
+}
+GROUP_BY_COLUMNS = {
+    "cricket": ["Team", "Format", "Gender"],
+    "football": ["Club", "Nationality", "Position", "PreferredFoot"],
+}
+AGGREGATE_STATS = ["count", "mean", "min", "max", "sum"]
+
+MAX_HISTOGRAM_BINS = 100
+
+
+def _column(frame: pd.DataFrame, name: str) -> str:
+    """Resolve a column name case-insensitively (the warehouse may upper-case them)"""
+    if name in frame.columns:
+        return name
+    for column in frame.columns:
+        if column.upper() == name.upper():
+            return column
+    raise KeyError(name)
+
+
+def _numeric(frame: pd.DataFrame, name: str) -> np.ndarray:
+    """Column as float64 with NULLs (and warehouse DECIMALs) handled; NaN marks missing"""
+    return pd.to_numeric(frame[_column(frame, name)], errors="coerce").to_numpy(dtype=np.float64)
+
+
+def top_k(frame: pd.DataFrame, column: str, k: int, descending: bool = True) -> pd.DataFrame:
+    """The ``k`` rows with the highest (or lowest) ``column``, NULLs excluded.
+
+    Uses a partial selection (O(n)) and only sorts the k winners; ties keep
+    table order.
+    """
+    values = _numeric(frame, column)
+    candidates = np.flatnonzero(~np.isnan(values))
+    if not len(candidates) or k <= 0:
+        return frame.iloc[:0]
+    keys = -values[candidates] if descending else values[candidates]
+    if k < len(candidates):
+        # Widen the cut to every row tied with the k-th value so ties resolve by position
+        kth = np.partition(keys, k - 1)[k - 1]
+        candidates = candidates[keys <= kth]
+        keys = keys[keys <= kth]
+    order = np.lexsort((candidates, keys))[:k]
+    return frame.iloc[candidates[order]]
+
+
+def top_k_per_group(frame: pd.DataFrame, group_by: str, column: str, k: int, descending: bool = True) -> Dict:
+    """``k`` best rows of each group, keeping a bounded heap per group in one pass"""
+    values = _numeric(frame, column)
+    groups = frame[_column(frame, group_by)].to_numpy()
+    sign = 1.0 if descending else -1.0
+    heaps: Dict[object, List] = {}
+    for position in np.flatnonzero(~np.isnan(values)):
+        # Negated position so that, among equal values, earlier rows win
+        item = (sign * values[position], -position)
+        heap = heaps.setdefault(groups[position], [])
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    return {
+        group: frame.iloc[[-position for _, position in sorted(heap, reverse=True)]]
+        for group, heap in heaps.items()
+    }
+
+
+def summary(frame: pd.DataFrame, column: str) -> Optional[Dict]:
+    """count/mean/min/max/sum of ``column`` over all rows, or None if every value is NULL"""
+    values = _numeric(frame, column)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    return {
+        "count": int(len(values)),
+        "mean": round(float(values.mean()), 4),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "sum": float(values.sum()),
+    }
+
+
+def group_stats(
+    frame: pd.DataFrame,
+    group_by: str,
+    column: str,
+    sort: str = "count",
+    limit: Optional[int] = None,
+) -> List[Dict]:
+    """count/mean/min/max/sum of ``column`` per ``group_by`` value, best ``sort`` first"""
+    values = _numeric(frame, column)
+    codes, groups = pd.factorize(frame[_column(frame, group_by)], use_na_sentinel=True)
+    keep = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[keep], values[keep]
+
+    count = np.bincount(codes, minlength=len(groups))
+    total = np.bincount(codes, weights=values, minlength=len(groups))
+    low = np.full(len(groups), np.inf)
+    high = np.full(len(groups), -np.inf)
+    np.minimum.at(low, codes, values)
+    np.maximum.at(high, codes, values)
+
+    rows = [
+        {
+            group_by: group,
+            "count": int(count[i]),
+            "mean": round(float(total[i] / count[i]), 4),
+            "min": float(low[i]),
+            "max": float(high[i]),
+            "sum": float(total[i]),
+        }
+        for i, group in enumerate(groups)
+        if count[i]
+    ]
+    rows.sort(key=lambda row: (-row[sort], str(row[group_by])))
+    return rows[:limit] if limit is not None else rows
+
+
+def histogram(frame: pd.DataFrame, column: str, bins: int = 10, value_range: Optional[Sequence[float]] = None) -> Dict:
+    """Equal-width histogram of ``column``; NULLs are counted separately"""
+    values = _numeric(frame, column)
+    missing = np.isnan(values)
+    present = values[~missing]
+    if value_range is None:
+        value_range = (float(present.min()), float(present.max())) if len(present) else (0.0, 0.0)
+    if value_range[0] == value_range[1]:
+        value_range = (value_range[0], value_range[0] + 1)
+    counts, edges = np.histogram(present, bins=bins, range=value_range)
+    return {
+        "column": column,
+        "bins": [
+            {"low": float(edges[i]), "high": float(edges[i + 1]), "count": int(counts[i])}
+            for i in range(len(counts))
+        ],
+        "missing": int(missing.sum()),
+    }
@@ -1,23 +1,51 @@
-from fastapi import FastAPI, HTTPException, Query, Body
+from fastapi import FastAPI, HTTPException, Query, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
-import snowflake.connector
+from fastapi.responses import PlainTextResponse, StreamingResponse
+import asyncio
 import os
-from dotenv import load_dotenv
 from typing import Optional, Dict, List
 import logging
 from pydantic import BaseModel
 
+import db
+from cache import player_cache, make_key
+from pagination import InvalidPageRequest, resolve_sort, decode_cursor, split_page
+from query_builder import all_players, filtered_players, players_by_id
+from aggregates import AGGREGATE_STATS, GROUP_BY_COLUMNS, MAX_HISTOGRAM_BINS, NUMERIC_COLUMNS, group_stats, histogram, summary, top_k, top_k_per_group
+from features import FEATURES, GROUP_COLUMNS, MODEL_COLUMNS, feature_matrix
+from executor import query_executor, QueryTimeoutError, QueryCancelledError, ExecutorBusyError
+from pool import PoolTimeoutError
+from predictor import predictor
+from ingest import BULK_BATCH_SIZE, BULK_INSERT_TIMEOUT, BULK_MAX_ROWS, BulkPayloadError, parse_payload, validate_rows, insert_rows
+from search import MAX_SEARCH_LIMIT
+from schema import (
+    TABLES, ID_COLUMNS, InvalidFieldsError, find_column, insert_params, insert_statement, parse_fields,
+    player_row, project, row_value, with_columns
+)
+from snapshot import TableSnapshot, records, snapshots
+from directory import directory
+from encoding import VARY_HEADER, TimedJSONResponse, UnsupportedFormat, encoded_response, negotiate
+from conditional import table_versions, variant_key
+from streaming import RowStream, RowStreamResponse, wants_ndjson
+from metrics import MetricsMiddleware, record_rows, registry, timed
+from profiler import profiler
+from shared_cache import SyncMiddleware, shared_cache
+from write_behind import QueueFullError, write_queue
+from health import readiness
+import lazy
+from lazy import pd
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+PREDICT_BATCH_MAX_SQUADS = int(os.getenv("PREDICT_BATCH_MAX_SQUADS", "1000"))
 
 app = FastAPI(
     title="Sports Player Stats API",
-    description="API for accessing complete cricket and football player data from Snowflake",
-    version="2.0.0"
+    description="API for accessing complete cricket and football player data from Snowflake (or a local SQLite backend)",
+    version="2.0.0",
+    default_response_class=TimedJSONResponse
 )
 
 # Enhanced CORS configuration
@@ -28,12 +56,39 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if shared_cache is not None:
+    # Apply other workers' writes before the request reads anything
+    app.add_middleware(SyncMiddleware, cache=shared_cache)
+# Added last so it wraps CORS and sees every request
+app.add_middleware(MetricsMiddleware)
+
+registry.collect("pool", db.pool_metrics)
+registry.collect("executor", query_executor.metrics)
+registry.collect("cache", player_cache.stats)
+registry.collect("directory", directory.stats)
+if shared_cache is not None:
+    registry.collect("shared_cache", shared_cache.stats)
+if write_queue is not None:
+    registry.collect("write_behind", write_queue.stats)
+    # Rows accepted but not yet written survive snapshot reloads
+    snapshots.overlay(write_queue.queued)
+registry.collect("startup", readiness.stats)
+
+# ETags follow the snapshots; with reads going to the warehouse they could miss a change
+table_versions.enabled = snapshots.enabled
+
+# /readyz reports ready once all of these pass
+readiness.add("pool", db.pool_open)
+readiness.add("models", lambda: predictor.loaded)
+readiness.add("snapshots", lambda: snapshots.loaded)
+readiness.add("directory", lambda: all(directory.complete(sport) for sport in TABLES))
 
 # Response models
 class PlayerResponse(BaseModel):
     status: str
     count: int
     data: List[Dict]
+    next_cursor: Optional[str] = None
 
 class CricketPlayerCreate(BaseModel):
     Team: str
@@ -111,57 +166,669 @@ class FootballPlayerCreate(BaseModel):
 
 class PredictionRequest(BaseModel):
     player_ids: List[int]
+    # cricket or football; when omitted, cricket if any ID is a cricket player
+    sport: Optional[str] = None
+
+class BatchPredictionRequest(BaseModel):
+    squads: List[List[int]]
+
+@app.on_event("startup")
+async def open_connection_pool():
+    """Start the query executor, snapshot refreshes and write-behind flushes, and
+    warm the connection pool, models and player directory in the background.
+
+    Startup returns without waiting on the warehouse, so the worker answers
+    /healthz at once; /readyz reports ready when the warm-up is done.
+    """
+    readiness.start()
+    query_executor.start()
+    snapshots.subscribe(snapshot_reloaded)
+    if shared_cache is not None:
+        shared_cache.subscribe(changed_elsewhere)
+    await snapshots.start(lambda fn, timeout=None: query_executor.run(fn, timeout=timeout))
+    if write_queue is not None:
+        write_queue.subscribe(queue_flushed)
+        await write_queue.start(lambda fn, timeout=None: query_executor.run(fn, timeout=timeout))
+    global warmer
+    warmer = asyncio.ensure_future(warm_up())
+
+@app.on_event("shutdown")
+async def close_connection_pool():
+    """Stop write-behind flushes, snapshot refreshes and the query executor, then drain pooled connections"""
+    readiness.stop()
+    if warmer is not None:
+        warmer.cancel()
+    if write_queue is not None:
+        # Rows still queued stay in the log and are written after the next start
+        await write_queue.stop(lambda fn: query_executor.run(fn))
+    await snapshots.stop()
+    query_executor.shutdown()
+    db.close_pool()
+
+warmer: Optional[asyncio.Task] = None
+
+WARM_UP_RETRY_DELAY = 1.0
+WARM_UP_MAX_RETRY_DELAY = 30.0
+
+async def _keep_trying(what: str, attempt):
+    """Await ``attempt()`` until it succeeds, backing off between failures"""
+    delay = WARM_UP_RETRY_DELAY
+    while True:
+        try:
+            return await attempt()
+        except Exception as e:
+            logger.error(f"Failed to {what}, retrying in {delay:.0f}s: {str(e)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WARM_UP_MAX_RETRY_DELAY)
+
+async def warm_up():
+    """Open the connection pool, load the models and import numpy and pandas
+    concurrently, then fill the player directory and report ready"""
+    loop = asyncio.get_running_loop()
+    warming = [_keep_trying(
+        f"open {db.backend.name} connection pool",
+        # Endpoints also open the pool lazily on first use
+        lambda: loop.run_in_executor(None, db.open_pool)
+    )]
+    if not predictor.loaded:
+        # Already loaded when server.py preloaded the app before forking
+        warming.append(loop.run_in_executor(None, predictor.load))
+    # Deferred at import so the worker starts fast; imported here, before the first request needs them
+    warming.append(loop.run_in_executor(None, lazy.load))
+    await asyncio.gather(*warming)
+    await load_player_directory()
+    readiness.warmed()
+    if not snapshots.enabled:
+        await refresh_player_directory()
+
+async def load_player_directory():
+    """Fill the player directory from the loaded snapshots, or from the tables'
+    ID columns when snapshots are off. Later snapshot reloads add to it
+    (snapshot_reloaded)."""
+    loop = asyncio.get_running_loop()
+    if snapshots.enabled:
+        await snapshots.wait_loaded()
+    for sport in TABLES:
+        if directory.complete(sport):
+            continue
+        if snapshots.enabled:
+            await loop.run_in_executor(None, directory.add_snapshot, snapshots[sport])
+            continue
+        # Until it is loaded, IDs are found by probing the tables one request at a time
+        await _keep_trying(
+            f"load the {sport} player directory",
+            lambda: query_executor.run(directory.load, sport, timeout=max(snapshots.refresh_interval, 60))
+        )
+
+async def refresh_player_directory():
+    """With snapshots off, reload the tables' ID columns on the snapshot refresh
+    schedule, to pick up rows written outside the API"""
+    while True:
+        await asyncio.sleep(snapshots.refresh_interval)
+        for sport in TABLES:
+            try:
+                await query_executor.run(directory.load, sport, timeout=max(snapshots.refresh_interval, 60))
+            except Exception as e:
+                logger.error(f"Failed to refresh the {sport} player directory: {str(e)}")
+
+def snapshot_reloaded(snapshot: TableSnapshot):
+    """A refresh reloaded ``snapshot`` from the warehouse"""
+    data_changed(snapshot.sport)
+    # Picks up rows written by other processes; off the event loop, as it
+    # walks every ID
+    asyncio.get_running_loop().run_in_executor(None, directory.add_snapshot, snapshot)
+
+def data_changed(sport: str, rows: Optional[List[Dict]] = None):
+    """Drop cached results for ``sport`` and bump its version so clients' ETags go
+    stale; ``rows`` when the change only added those rows"""
+    player_cache.invalidate(sport)
+    table_versions.bump(sport, rows)
+
+def players_added(sport: str, rows: List[Dict]):
+    """Make rows just written (or queued) through the API visible to reads"""
+    if snapshots.ready(sport):
+        snapshots[sport].append_rows(rows)
+    directory.add(sport, [row_value(row, ID_COLUMNS[sport]) for row in rows])
+    data_changed(sport, rows)
+
+async def queue_players(sport: str, rows: List[Dict]) -> List[int]:
+    """Append rows to the write-behind log; returns their write IDs"""
+    try:
+        write_ids = await asyncio.get_running_loop().run_in_executor(None, write_queue.enqueue, sport, rows)
+    except QueueFullError as e:
+        logger.warning(f"Write-behind queue full, rejecting {len(rows)} {sport} players: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "status": "error",
+                "message": "Too many writes waiting for the warehouse; retry later",
+                "error": str(e)
+            },
+            headers={"Retry-After": str(max(1, int(write_queue.flush_interval)))}
+        )
+    players_queued(sport, write_ids, rows)
+    return write_ids
+
+def players_queued(sport: str, write_ids: List[int], rows: List[Dict]):
+    """Make rows just accepted into the write-behind queue visible to reads. The
+    snapshot keeps them over reloads until they are written or dropped"""
+    snapshot = snapshots[sport]
+    if snapshots.enabled and snapshot.ready:
+        snapshot.append_queued(write_ids, rows)
+    directory.add(sport, [row_value(row, ID_COLUMNS[sport]) for row in rows])
+    data_changed(sport, rows)
+
+def queue_flushed(sport: str, written: int, dropped: int):
+    """The write-behind queue wrote rows of ``sport`` to the warehouse, or dropped some"""
+    if dropped:
+        queue_changed(sport)
+    else:
+        # Already in the snapshots since they were queued: only reads from the
+        # warehouse (and the results cached from them) see anything new
+        data_changed(sport, [])
+
+def queue_changed(sport: str):
+    """Rows of ``sport`` left the write-behind queue unwritten (or were queued again):
+    reload the snapshot, which reads the rows still queued, and stop trusting the directory"""
+    snapshots.invalidate(sport)
+    directory.invalidate(sport)
+    data_changed(sport)
+
+def changed_elsewhere(sport: str, rows: Optional[List[Dict]]):
+    """Another worker wrote to ``sport``: drop cached results and append the rows it
+    added to the snapshot, or reload the snapshot if it changed anything else"""
+    player_cache.invalidate(sport)
+    if rows is None:
+        snapshots.invalidate(sport)
+        directory.invalidate(sport)
+        return
+    if snapshots.ready(sport):
+        snapshots[sport].append_rows(rows)
+    else:
+        # Still loading (or reloading): make sure the load it ends with has the rows
+        snapshots.invalidate(sport)
+    directory.add(sport, [row_value(row, ID_COLUMNS[sport]) for row in rows])
+
+def fetch_rows(conn, query: str, params=None) -> List[Dict]:
+    """Execute a query on ``conn`` and return the rows as dicts"""
+    cursor = conn.cursor()
+    try:
+        with timed("execute"):
+            cursor.execute(query, params)
+        columns = [col[0] for col in cursor.description]
+        with timed("fetch"):
+            rows = cursor.fetchall()
+        record_rows(len(rows))
+        with timed("build"):
+            return [dict(zip(columns, row)) for row in rows]
+    finally:
+        cursor.close()
+
+def execute_write(conn, query: str, params) -> None:
+    """Execute a single write statement on ``conn`` and commit it"""
+    cursor = conn.cursor()
+    try:
+        with timed("execute"):
+            cursor.execute(query, params)
+            conn.commit()
+    finally:
+        cursor.close()
+
+async def run_query(request: Optional[Request], fn, *args):
+    """Run blocking database work on the query executor with a pooled connection"""
+    return await _await_query(query_executor.run(fn, *args, request=request))
+
+async def stream_query(query: str, params=None, headers: Optional[Dict] = None) -> StreamingResponse:
+    """Execute a query on the executor and stream its rows back as NDJSON"""
+    rows = await _await_query(query_executor.call(RowStream, query, params))
+    return RowStreamResponse(rows, headers=headers)
+
+async def _await_query(job):
+    """Await an executor job, mapping executor and pool failures to HTTP errors
+    so handlers only deal with query errors"""
+    try:
+        return await job
+    except QueryTimeoutError as e:
+        logger.error(f"Query timed out: {str(e)}")
+        raise HTTPException(
+            status_code=504,
+            detail={
+                "status": "error",
+                "message": "Database query timed out",
+                "error": str(e)
+            }
+        )
+    except QueryCancelledError as e:
+        logger.info(f"Query cancelled: {str(e)}")
+        raise HTTPException(
+            status_code=499,
+            detail={
+                "status": "error",
+                "message": "Request cancelled by client",
+                "error": str(e)
+            }
+        )
+    except (ExecutorBusyError, PoolTimeoutError) as e:
+        logger.error(f"Database capacity exhausted: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "status": "error",
+                "message": "No database connection available",
+                "error": str(e)
+            }
+        )
+
+async def _load_rows(sport: str, message: str, query: str, params=None) -> List[Dict]:
+    """Cache loader for read endpoints.
 
-def get_snowflake_connection():
-    """Establish and return a Snowflake database connection"""
+    Loads are shared by every request waiting on the same cache key, so they
+    are not tied to (or cancelled with) any single client connection. With
+    several workers, results are also shared through the shared cache so
+    each query runs once per write rather than once per worker.
+    """
+    if shared_cache is None:
+        logger.info(message)
+        logger.debug(f"SQL: {query}")
+        return await run_query(None, fetch_rows, query, params)
+    
+    loop = asyncio.get_running_loop()
+    key = shared_cache.key(query, params)
+    generation = shared_cache.generation(sport)
+    rows = await loop.run_in_executor(None, shared_cache.get, sport, key)
+    if rows is not None:
+        return rows
+    logger.info(message)
+    logger.debug(f"SQL: {query}")
+    rows = await run_query(None, fetch_rows, query, params)
     try:
-        conn = snowflake.connector.connect(
-            user=os.getenv('SNOWFLAKE_USER'),
-            password=os.getenv('SNOWFLAKE_PASSWORD'),
-            account=os.getenv('SNOWFLAKE_ACCOUNT'),
-            warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
-            database=os.getenv('SNOWFLAKE_DATABASE'),
-            schema=os.getenv('SNOWFLAKE_SCHEMA'),
-            role=os.getenv('SNOWFLAKE_ROLE', 'PUBLIC')
-        )
-        logger.info("Successfully connected to Snowflake")
-        return conn
+        await loop.run_in_executor(None, shared_cache.set, sport, key, generation, rows)
     except Exception as e:
-        logger.error(f"Snowflake connection error: {str(e)}")
+        logger.warning(f"Failed to share {sport} query result: {str(e)}")
+    return rows
+
+async def _load_players(sport: str, message: str, query: str, params=None, **selection) -> List[Dict]:
+    """Cache loader that serves from the in-memory snapshot when it is loaded.
+
+    ``selection`` is passed to TableSnapshot.select and must describe the same
+    rows as ``query``, which is only run if the snapshot is unavailable.
+    """
+    if snapshots.ready(sport):
+        try:
+            with timed("snapshot"):
+                return snapshots[sport].select(**selection)
+        except Exception as e:
+            logger.warning(f"Snapshot read failed for {sport}, falling back to warehouse: {str(e)}")
+    return await _load_rows(sport, message, query, params)
+
+def _check_sport(sport: str):
+    if sport not in TABLES:
         raise HTTPException(
-            status_code=500,
+            status_code=404,
+            detail={
+                "status": "error",
+                "message": f"Unknown sport {sport!r}",
+                "error": "Expected cricket or football"
+            }
+        )
+
+async def _table_snapshot(sport: str) -> TableSnapshot:
+    """The sport's loaded snapshot, or a transient one built from the (cached)
+    full-table read when snapshots are off or still loading"""
+    _check_sport(sport)
+    if snapshots.ready(sport):
+        return snapshots[sport]
+    
+    async def build():
+        rows = await player_cache.get_or_load(
+            sport,
+            make_key(f"{sport}/players/all"),
+            lambda: _load_rows(sport, f"Executing query to fetch all {sport} players data", all_players(sport).sql)
+        )
+        # Building the indexes is CPU-bound; keep it off the event loop
+        return await asyncio.get_running_loop().run_in_executor(
+            None, TableSnapshot.from_frame, sport, pd.DataFrame(rows)
+        )
+    
+    # Cached like any other read, so it is rebuilt only after writes or expiry
+    return await player_cache.get_or_load(sport, make_key(f"{sport}/snapshot"), build)
+
+async def _player_frame(sport: str, equals: Optional[Dict] = None) -> "pd.DataFrame":
+    """Rows of the sport's table matching ``equals`` as a DataFrame"""
+    with (await _table_snapshot(sport)).reading() as state:
+        if state.frame.empty:
+            return state.frame
+        return state.filter({column: value for column, value in (equals or {}).items() if value is not None})
+
+def _check_choice(value: Optional[str], allowed: List[str], what: str) -> Optional[str]:
+    """Match ``value`` case-insensitively against ``allowed``, rejecting anything else with a 400"""
+    if value is None:
+        return None
+    for option in allowed:
+        if option.upper() == value.upper():
+            return option
+    raise HTTPException(
+        status_code=400,
+        detail={
+            "status": "error",
+            "message": f"Invalid {what} {value!r}",
+            "error": f"Expected one of: {', '.join(allowed)}"
+        }
+    )
+
+def _fields(sport: str, fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated ?fields= list of table columns, rejecting unknown ones with a 400"""
+    try:
+        return parse_fields(sport, fields)
+    except InvalidFieldsError as e:
+        raise HTTPException(
+            status_code=400,
             detail={
                 "status": "error",
-                "message": "Failed to connect to database",
+                "message": "Invalid fields parameter",
                 "error": str(e)
             }
         )
 
+def _frame_columns(frame: "pd.DataFrame", columns: Optional[List[str]]) -> "pd.DataFrame":
+    """Only ``columns`` of ``frame`` (all of them for None)"""
+    if columns is None:
+        return frame
+    return frame[[find_column(frame.columns, column) for column in columns]]
+
+async def leaderboard(
+    sport: str, column: str, k: int, order: str, per_group: Optional[str], fields: Optional[str], **filters
+) -> Dict:
+    """Cached top-``k`` rows by ``column``, overall or per group, limited to ``fields`` columns if given"""
+    columns = _fields(sport, fields)
+    column = _check_choice(column, NUMERIC_COLUMNS[sport], "column")
+    per_group = _check_choice(per_group, GROUP_BY_COLUMNS[sport], "per_group column")
+    descending = order == "desc"
+    
+    async def compute():
+        frame = await _player_frame(sport, filters)
+        if frame.empty:
+            return {} if per_group else []
+        if per_group:
+            return {
+                str(group): records(_frame_columns(rows, columns))
+                for group, rows in top_k_per_group(frame, per_group, column, k, descending).items()
+            }
+        return records(_frame_columns(top_k(frame, column, k, descending), columns))
+    
+    key = make_key(
+        f"{sport}/leaderboard", column=column, k=k, order=order, per_group=per_group,
+        fields=",".join(columns or ()), **filters
+    )
+    data = await player_cache.get_or_load(sport, key, compute)
+    return {
+        "status": "success",
+        "column": column,
+        "order": order,
+        "per_group": per_group,
+        "count": len(data),
+        "data": data
+    }
+
+def _feature_names(sport: str, features: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated ?features= list, rejecting unknown names"""
+    _check_sport(sport)
+    if not features:
+        return None
+    names = [name.strip() for name in features.split(",") if name.strip()]
+    unknown = [name for name in names if name not in FEATURES[sport]]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "status": "error",
+                "message": f"Unknown {sport} features: {', '.join(unknown)}",
+                "error": f"Available features: {', '.join(FEATURES[sport])}"
+            }
+        )
+    return names
+
+def _not_acceptable(e: UnsupportedFormat) -> HTTPException:
+    return HTTPException(
+        status_code=406,
+        detail={
+            "status": "error",
+            "message": "Unsupported response format",
+            "error": str(e)
+        }
+    )
+
+@app.get("/snapshot/stats")
+async def get_snapshot_stats():
+    """Report in-memory player snapshot sizes and freshness"""
+    return {
+        "status": "success",
+        "snapshots": snapshots.stats()
+    }
+
+@app.get("/healthz")
+async def get_health():
+    """Liveness: the worker is up and serving its event loop"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def get_readiness():
+    """Readiness: 200 once the connection pool, models, snapshots and player
+    directory are warm, 503 while starting or stopping"""
+    ready, checks = readiness.status()
+    stats = readiness.stats()
+    if ready:
+        status = "ready"
+    else:
+        status = "stopping" if readiness.stopping else "starting"
+    return TimedJSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": status,
+            "checks": checks,
+            "startup_seconds": stats["startup_seconds"],
+            "uptime_seconds": stats["uptime_seconds"],
+        }
+    )
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Report player cache hit/miss/eviction counters and player directory lookups"""
+    return {
+        "status": "success",
+        "cache": player_cache.stats(),
+        "shared": shared_cache.stats() if shared_cache is not None else None,
+        "directory": directory.stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics: request and per-stage latency histograms, rows
+    returned, response sizes, and pool/executor/cache gauges"""
+    # Collectors such as the write-behind queue's query SQLite: keep them off the event loop
+    body = await asyncio.get_running_loop().run_in_executor(None, registry.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/profiler/stats")
+async def get_profiler_stats():
+    """Report sampling profiler settings and how many slow-request profiles were written"""
+    return {
+        "status": "success",
+        "profiler": profiler.stats()
+    }
+
+@app.get("/pool/metrics")
+async def get_pool_metrics():
+    """Report connection pool and query executor usage"""
+    return {
+        "status": "success",
+        **db.backend.describe(),
+        "pool_open": db.pool_open(),
+        "pool": db.pool_metrics(),
+        "executor": query_executor.metrics()
+    }
+
+def _check_write_queue():
+    if write_queue is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "status": "error",
+                "message": "Write-behind mode is off",
+                "error": "Set WRITE_BEHIND_ENABLED=1 to queue inserts"
+            }
+        )
+
+@app.get("/writes/status")
+async def get_write_queue_status():
+    """Report write-behind queue depth, lag and flush counters"""
+    stats = None
+    if write_queue is not None:
+        stats = await asyncio.get_running_loop().run_in_executor(None, write_queue.stats)
+    return {
+        "status": "success",
+        "enabled": write_queue is not None,
+        "queue": stats
+    }
+
+@app.post("/writes/retry")
+async def retry_failed_writes():
+    """Queue writes that exhausted their attempts again"""
+    _check_write_queue()
+    count = await asyncio.get_running_loop().run_in_executor(None, write_queue.retry_failed)
+    if count:
+        for sport in TABLES:
+            queue_changed(sport)
+    return {
+        "status": "success",
+        "count": count
+    }
+
+@app.get("/writes/{write_id}")
+async def get_write_status(write_id: int):
+    """Report whether a queued write is still queued, has failed or was written"""
+    _check_write_queue()
+    state = await asyncio.get_running_loop().run_in_executor(None, write_queue.status, write_id)
+    if state is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "status": "error",
+                "message": f"Unknown write ID {write_id}",
+                "error": "Write not found"
+            }
+        )
+    return {
+        "status": "success",
+        "write": state
+    }
+
+async def bulk_insert(request: Request, sport: str, model) -> Dict:
+    """Parse, validate and insert (or, in write-behind mode, queue) an uploaded
+    batch of players for ``sport``"""
+    loop = asyncio.get_running_loop()
+    body = await request.body()
+    try:
+        # Parsing and validating up to BULK_MAX_ROWS rows is CPU-bound; keep it off the event loop
+        raw_rows = await loop.run_in_executor(None, parse_payload, body, request.headers.get("content-type", ""))
+    except BulkPayloadError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "status": "error",
+                "message": "Could not parse upload",
+                "error": str(e)
+            }
+        )
+    if len(raw_rows) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail={
+                "status": "error",
+                "message": f"Upload exceeds {BULK_MAX_ROWS} rows; split it into smaller requests",
+                "error": f"{len(raw_rows)} rows received"
+            }
+        )
+    
+    valid, errors = await loop.run_in_executor(None, validate_rows, sport, model, raw_rows)
+    if valid and write_queue is not None:
+        write_ids = await queue_players(sport, [row for _, row in valid])
+        return TimedJSONResponse(
+            status_code=202,
+            content={
+                "status": "queued" if not errors else "partial",
+                "count": len(write_ids),
+                "received": len(raw_rows),
+                "failed": len(errors),
+                "errors": errors,
+                "write_ids": write_ids
+            }
+        )
+    
+    inserted = []
+    if valid:
+        logger.info(f"Bulk inserting {len(valid)} {sport} players")
+
+        def committed(rows: List[Dict]):
+            # On the worker thread, after each batch commits: publish the rows
+            # even if this request has already timed out
+            loop.call_soon_threadsafe(players_added, sport, rows)
+
+        # Not cancelled when the client disconnects: batches commit one by one,
+        # so an abort midway would leave part of the upload written anyway
+        inserted, insert_errors = await _await_query(
+            query_executor.run(insert_rows, sport, valid, BULK_BATCH_SIZE, committed, timeout=BULK_INSERT_TIMEOUT)
+        )
+        errors = sorted(errors + insert_errors, key=lambda error: error["row"])
+    
+    return {
+        "status": "success" if not errors else ("partial" if inserted else "error"),
+        "count": len(inserted),
+        "received": len(raw_rows),
+        "failed": len(errors),
+        "errors": errors
+    }
+
 # Cricket Endpoints
 @app.get("/cricket/players/all", response_model=PlayerResponse)
-async def get_all_cricket_players():
-    """Get ALL cricket players data without any filters or limits"""
+async def get_all_cricket_players(
+    request: Request,
+    stream: bool = Query(False, description="Stream rows as NDJSON instead of a single JSON body"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: all)"),
+    response_format: Optional[str] = Query(None, description="json, columnar, msgpack or arrow (default: from the Accept header)")
+):
+    """Get ALL cricket players data without any filters or limits.
+
+    With ?stream=true or Accept: application/x-ndjson the rows are streamed as
+    newline-delimited JSON in batches instead of being buffered.
+    """
     try:
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
+        columns = _fields("cricket", fields)
+        query = all_players("cricket", columns).sql
         
-        query = """
-        SELECT *
-        FROM CRICKETPLAYERS.PUBLIC.CRICKETPLAYER
-        """
+        if wants_ndjson(request, stream):
+            not_modified, validators = table_versions.check(request, "cricket", variant_key(request, "ndjson"))
+            if not_modified:
+                return not_modified
+            logger.info("Streaming all cricket players data")
+            return await stream_query(query, headers={**validators, "Vary": VARY_HEADER})
         
-        logger.info("Executing query to fetch all cricket players data")
-        cursor.execute(query)
-        
-        columns = [col[0] for col in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        fmt = negotiate(request, response_format)
+        not_modified, validators = table_versions.check(request, "cricket", variant_key(request, fmt))
+        if not_modified:
+            return not_modified
+        results = await player_cache.get_or_load(
+            "cricket",
+            make_key("cricket/players/all", fields=",".join(columns or ())),
+            lambda: _load_players("cricket", "Executing query to fetch all cricket players data", query, columns=columns)
+        )
         
-        return {
-            "status": "success",
-            "count": len(results),
-            "data": results
-        }
+        return await encoded_response(request, fmt, {"status": "success", "count": len(results)}, results, headers=validators)
         
+    except UnsupportedFormat as e:
+        raise _not_acceptable(e)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching all cricket players: {str(e)}")
         raise HTTPException(
@@ -172,53 +839,79 @@ async def get_all_cricket_players():
                 "error": str(e)
             }
         )
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @app.get("/cricket/players", response_model=PlayerResponse)
 async def get_filtered_cricket_players(
+    request: Request,
     team: Optional[str] = Query(None),
     format: Optional[str] = Query(None),
     gender: Optional[str] = Query(None),
-    limit: int = Query(100, gt=0, le=1000)
+    limit: int = Query(100, gt=0, le=1000, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    sort: Optional[str] = Query(None, description="Column to sort by"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: all)"),
+    response_format: Optional[str] = Query(None, description="json, columnar, msgpack or arrow (default: from the Accept header)")
 ):
-    """Get filtered cricket players data with optional parameters"""
+    """Get filtered cricket players data with optional parameters.
+
+    Results are ordered and paged with keyset cursors: pass the returned
+    next_cursor (with the same filters and sort) to fetch the following page.
+    """
     try:
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-        
-        query = """
-        SELECT *
-        FROM CRICKETPLAYERS.PUBLIC.CRICKETPLAYER
-        WHERE 1=1
-        """
-        
-        params = []
-        if team:
-            query += " AND Team = %s"
-            params.append(team)
-        if format:
-            query += " AND Format = %s"
-            params.append(format)
-        if gender:
-            query += " AND Gender = %s"
-            params.append(gender)
-            
-        query += f" LIMIT {limit}"
-        
-        logger.info(f"Executing filtered cricket query: {query}")
-        cursor.execute(query, params)
+        fmt = negotiate(request, response_format)
+        ordering = resolve_sort("cricket", sort, order)
+        columns = _fields("cricket", fields)
+        # The cursor is built from the ordering columns, so they are fetched even if not requested
+        selected = with_columns(columns, [column for column, _ in ordering])
+        statement, params = filtered_players(
+            "cricket", {"team": team, "format": format, "gender": gender}, ordering, cursor, limit, selected
+        )
+        selection = {
+            "equals": {
+                column: value
+                for column, value in (("Team", team), ("Format", format), ("Gender", gender))
+                if value
+            },
+            "ordering": ordering,
+            "after": decode_cursor(ordering, cursor) if cursor else None,
+            "limit": limit + 1,
+            "columns": selected
+        }
+        # Only once the parameters are known to be valid: a malformed request gets its 400, never a 304
+        not_modified, validators = table_versions.check(request, "cricket", variant_key(request, fmt))
+        if not_modified:
+            return not_modified
         
-        columns = [col[0] for col in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        rows = await player_cache.get_or_load(
+            "cricket",
+            make_key(
+                "cricket/players", team=team, format=format, gender=gender, limit=limit,
+                cursor=cursor, sort=sort, order=order, fields=",".join(columns or ())
+            ),
+            lambda: _load_players("cricket", f"Executing {statement.name}", statement.sql, params, **selection)
+        )
+        results, next_cursor = split_page(rows, ordering, limit)
+        results = project(results, columns) if selected != columns else results
         
-        return {
-            "status": "success",
-            "count": len(results),
-            "data": results
-        }
+        return await encoded_response(
+            request, fmt, {"status": "success", "count": len(results), "next_cursor": next_cursor}, results,
+            headers=validators
+        )
         
+    except UnsupportedFormat as e:
+        raise _not_acceptable(e)
+    except InvalidPageRequest as e:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "status": "error",
+                "message": "Invalid pagination parameters",
+                "error": str(e)
+            }
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching filtered cricket players: {str(e)}")
         raise HTTPException(
@@ -229,34 +922,22 @@ async def get_filtered_cricket_players(
                 "error": str(e)
             }
         )
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @app.post("/cricket/players", response_model=PlayerResponse)
-async def create_cricket_player(player: CricketPlayerCreate):
+async def create_cricket_player(request: Request, player: CricketPlayerCreate):
     """Add a new cricket player to the database"""
     try:
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
+        row = player_row("cricket", player)
         
-        query = """
-        INSERT INTO CRICKETPLAYERS.PUBLIC.CRICKETPLAYER
-        (Team, Format, Gender, No, Name, First, Last, Mat, Runs, HS, 
-         Avg, 50, 100, Balls, Wkt, BBI, Ave, 5WI, Ca, St)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
+        if write_queue is not None:
+            write_ids = await queue_players("cricket", [row])
+            return TimedJSONResponse(
+                status_code=202,
+                content={"status": "queued", "count": 1, "data": [player.dict()], "write_ids": write_ids}
+            )
         
-        params = (
-            player.Team, player.Format, player.Gender, player.No, player.Name,
-            player.First, player.Last, player.Mat, player.Runs, player.HS,
-            player.Avg, player.Fifty, player.Hundred, player.Balls, player.Wkt,
-            player.BBI, player.Ave, player.FiveWI, player.Ca, player.St
-        )
-        
-        cursor.execute(query, params)
-        conn.commit()
+        await run_query(request, execute_write, insert_statement("cricket"), insert_params("cricket", row))
+        players_added("cricket", [row])
         
         return {
             "status": "success",
@@ -264,6 +945,8 @@ async def create_cricket_player(player: CricketPlayerCreate):
             "data": [player.dict()]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error adding cricket player: {str(e)}")
         raise HTTPException(
@@ -274,35 +957,99 @@ async def create_cricket_player(player: CricketPlayerCreate):
                 "error": str(e)
             }
         )
-    finally:
-        if 'conn' in locals():
-            conn.close()
+
+@app.post("/cricket/players/bulk", response_model=Dict)
+async def create_cricket_players_bulk(request: Request):
+    """Add many cricket players in one call.
+
+    Accepts a JSON array, NDJSON (application/x-ndjson) or CSV (text/csv) body.
+    Rows are validated individually and inserted in batches, one transaction
+    per batch; the response lists every rejected row with its error.
+    """
+    try:
+        return await bulk_insert(request, "cricket", CricketPlayerCreate)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error bulk adding cricket players: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": "Failed to add cricket players",
+                "error": str(e)
+            }
+        )
+
+@app.get("/cricket/leaderboard", response_model=Dict)
+async def get_cricket_leaderboard(
+    column: str = Query("Runs", description="Numeric column to rank by"),
+    k: int = Query(10, ge=1, le=1000, description="Number of players (per group with per_group)"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="desc for highest first"),
+    per_group: Optional[str] = Query(None, description="Rank within each Team, Format or Gender"),
+    team: Optional[str] = Query(None, description="Filter by team"),
+    format: Optional[str] = Query(None, description="Filter by format"),
+    gender: Optional[str] = Query(None, description="Filter by gender"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: all)")
+):
+    """Top cricket players by any numeric column, computed server-side"""
+    try:
+        return await leaderboard("cricket", column, k, order, per_group, fields, Team=team, Format=format, Gender=gender)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing cricket leaderboard: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": "Failed to compute cricket leaderboard",
+                "error": str(e)
+            }
+        )
 
 # Football Endpoints
 @app.get("/football/players/all", response_model=PlayerResponse)
-async def get_all_football_players():
-    """Get ALL football players data without any filters or limits"""
+async def get_all_football_players(
+    request: Request,
+    stream: bool = Query(False, description="Stream rows as NDJSON instead of a single JSON body"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: all)"),
+    response_format: Optional[str] = Query(None, description="json, columnar, msgpack or arrow (default: from the Accept header)")
+):
+    """Get ALL football players data without any filters or limits.
+
+    With ?stream=true or Accept: application/x-ndjson the rows are streamed as
+    newline-delimited JSON in batches instead of being buffered.
+    """
     try:
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
+        columns = _fields("football", fields)
+        query = all_players("football", columns).sql
         
-        query = """
-        SELECT *
-        FROM PLAYERFOOTBALL.PUBLIC.PLAYERFOOTBALL
-        """
+        if wants_ndjson(request, stream):
+            not_modified, validators = table_versions.check(request, "football", variant_key(request, "ndjson"))
+            if not_modified:
+                return not_modified
+            logger.info("Streaming all football players data")
+            return await stream_query(query, headers={**validators, "Vary": VARY_HEADER})
         
-        logger.info("Executing query to fetch all football players data")
-        cursor.execute(query)
+        fmt = negotiate(request, response_format)
+        not_modified, validators = table_versions.check(request, "football", variant_key(request, fmt))
+        if not_modified:
+            return not_modified
+        results = await player_cache.get_or_load(
+            "football",
+            make_key("football/players/all", fields=",".join(columns or ())),
+            lambda: _load_players("football", "Executing query to fetch all football players data", query, columns=columns)
+        )
         
-        columns = [col[0] for col in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        
-        return {
-            "status": "success",
-            "count": len(results),
-            "data": results
-        }
+        return await encoded_response(request, fmt, {"status": "success", "count": len(results)}, results, headers=validators)
         
+    except UnsupportedFormat as e:
+        raise _not_acceptable(e)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching all football players: {str(e)}")
         raise HTTPException(
@@ -313,61 +1060,88 @@ async def get_all_football_players():
                 "error": str(e)
             }
         )
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @app.get("/football/players", response_model=PlayerResponse)
 async def get_filtered_football_players(
+    request: Request,
     club: Optional[str] = Query(None),
     nationality: Optional[str] = Query(None),
     position: Optional[str] = Query(None),
     min_rating: Optional[int] = Query(None, ge=0, le=100),
     max_rating: Optional[int] = Query(None, ge=0, le=100),
-    limit: int = Query(100, gt=0, le=1000)
+    limit: int = Query(100, gt=0, le=1000, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    sort: Optional[str] = Query(None, description="Column to sort by"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: all)"),
+    response_format: Optional[str] = Query(None, description="json, columnar, msgpack or arrow (default: from the Accept header)")
 ):
-    """Get filtered football players data with optional parameters"""
+    """Get filtered football players data with optional parameters.
+
+    Results are ordered and paged with keyset cursors: pass the returned
+    next_cursor (with the same filters and sort) to fetch the following page.
+    """
     try:
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-        
-        query = """
-        SELECT *
-        FROM PLAYERFOOTBALL.PUBLIC.PLAYERFOOTBALL
-        WHERE 1=1
-        """
-        
-        params = []
-        if club:
-            query += " AND Club = %s"
-            params.append(club)
-        if nationality:
-            query += " AND Nationality = %s"
-            params.append(nationality)
-        if position:
-            query += " AND Position = %s"
-            params.append(position)
-        if min_rating:
-            query += " AND Overall >= %s"
-            params.append(min_rating)
-        if max_rating:
-            query += " AND Overall <= %s"
-            params.append(max_rating)
-            
-        query += f" LIMIT {limit}"
-        
-        logger.info(f"Executing filtered football query: {query}")
-        cursor.execute(query, params)
+        fmt = negotiate(request, response_format)
+        ordering = resolve_sort("football", sort, order)
+        columns = _fields("football", fields)
+        # The cursor is built from the ordering columns, so they are fetched even if not requested
+        selected = with_columns(columns, [column for column, _ in ordering])
+        statement, params = filtered_players(
+            "football",
+            {
+                "club": club, "nationality": nationality, "position": position,
+                "min_rating": min_rating, "max_rating": max_rating
+            },
+            ordering, cursor, limit, selected
+        )
+        selection = {
+            "equals": {
+                column: value
+                for column, value in (("Club", club), ("Nationality", nationality), ("Position", position))
+                if value
+            },
+            "ranges": {"Overall": (min_rating or None, max_rating or None)},
+            "ordering": ordering,
+            "after": decode_cursor(ordering, cursor) if cursor else None,
+            "limit": limit + 1,
+            "columns": selected
+        }
+        # Only once the parameters are known to be valid: a malformed request gets its 400, never a 304
+        not_modified, validators = table_versions.check(request, "football", variant_key(request, fmt))
+        if not_modified:
+            return not_modified
         
-        columns = [col[0] for col in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        rows = await player_cache.get_or_load(
+            "football",
+            make_key(
+                "football/players", club=club, nationality=nationality, position=position,
+                min_rating=min_rating, max_rating=max_rating, limit=limit,
+                cursor=cursor, sort=sort, order=order, fields=",".join(columns or ())
+            ),
+            lambda: _load_players("football", f"Executing {statement.name}", statement.sql, params, **selection)
+        )
+        results, next_cursor = split_page(rows, ordering, limit)
+        results = project(results, columns) if selected != columns else results
         
-        return {
-            "status": "success",
-            "count": len(results),
-            "data": results
-        }
+        return await encoded_response(
+            request, fmt, {"status": "success", "count": len(results), "next_cursor": next_cursor}, results,
+            headers=validators
+        )
         
+    except UnsupportedFormat as e:
+        raise _not_acceptable(e)
+    except InvalidPageRequest as e:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "status": "error",
+                "message": "Invalid pagination parameters",
+                "error": str(e)
+            }
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching filtered football players: {str(e)}")
         raise HTTPException(
@@ -378,51 +1152,22 @@ async def get_filtered_football_players(
                 "error": str(e)
             }
         )
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 @app.post("/football/players", response_model=PlayerResponse)
-async def create_football_player(player: FootballPlayerCreate):
+async def create_football_player(request: Request, player: FootballPlayerCreate):
     """Add a new football player to the database"""
     try:
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-        
-        query = """
-        INSERT INTO PLAYERFOOTBALL.PUBLIC.PLAYERFOOTBALL
-        (PlayerID, Name, Age, Nationality, Overall, Club, Value, Wage, PreferredFoot,
-         InternationalReputation, WeakFoot, SkillMoves, Position, JerseyNumber, Height,
-         Weight, Crossing, Finishing, HeadingAccuracy, ShortPassing, Volleys, Dribbling,
-         Curve, FKAccuracy, LongPassing, BallControl, Acceleration, SprintSpeed, Agility,
-         Reactions, Balance, ShotPower, Jumping, Stamina, Strength, LongShots, Aggression,
-         Interceptions, Positioning, Vision, Penalties, Composure, Marking, StandingTackle,
-         SlidingTackle, GKDiving, GKHandling, GKKicking, GKPositioning, GKReflexes)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        params = (
-            player.PlayerID, player.Name, player.Age, player.Nationality, player.Overall,
-            player.Club, player.Value, player.Wage, player.PreferredFoot,
-            player.InternationalReputation, player.WeakFoot, player.SkillMoves,
-            player.Position, player.JerseyNumber, player.Height, player.Weight,
-            player.Crossing, player.Finishing, player.HeadingAccuracy, player.ShortPassing,
-            player.Volleys, player.Dribbling, player.Curve, player.FKAccuracy,
-            player.LongPassing, player.BallControl, player.Acceleration, player.SprintSpeed,
-            player.Agility, player.Reactions, player.Balance, player.ShotPower,
-            player.Jumping, player.Stamina, player.Strength, player.LongShots,
-            player.Aggression, player.Interceptions, player.Positioning, player.Vision,
-            player.Penalties, player.Composure, player.Marking, player.StandingTackle,
-            player.SlidingTackle, player.GKDiving, player.GKHandling, player.GKKicking,
-            player.GKPositioning, player.GKReflexes
-        )
-        
-        cursor.execute(query, params)
-        conn.commit()
+        row = player_row("football", player)
+        
+        if write_queue is not None:
+            write_ids = await queue_players("football", [row])
+            return TimedJSONResponse(
+                status_code=202,
+                content={"status": "queued", "count": 1, "data": [player.dict()], "write_ids": write_ids}
+            )
+        
+        await run_query(request, execute_write, insert_statement("football"), insert_params("football", row))
+        players_added("football", [row])
         
         return {
             "status": "success",
@@ -430,6 +1175,8 @@ async def create_football_player(player: FootballPlayerCreate):
             "data": [player.dict()]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error adding football player: {str(e)}")
         raise HTTPException(
@@ -440,70 +1187,270 @@ async def create_football_player(player: FootballPlayerCreate):
                 "error": str(e)
             }
         )
-    finally:
-        if 'conn' in locals():
-            conn.close()
+
+@app.post("/football/players/bulk", response_model=Dict)
+async def create_football_players_bulk(request: Request):
+    """Add many football players in one call.
+
+    Accepts a JSON array, NDJSON (application/x-ndjson) or CSV (text/csv) body.
+    Rows are validated individually and inserted in batches, one transaction
+    per batch; the response lists every rejected row with its error.
+    """
+    try:
+        return await bulk_insert(request, "football", FootballPlayerCreate)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error bulk adding football players: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": "Failed to add football players",
+                "error": str(e)
+            }
+        )
+
+@app.get("/football/leaderboard", response_model=Dict)
+async def get_football_leaderboard(
+    column: str = Query("Overall", description="Numeric column to rank by"),
+    k: int = Query(10, ge=1, le=1000, description="Number of players (per group with per_group)"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="desc for highest first"),
+    per_group: Optional[str] = Query(None, description="Rank within each Club, Nationality, Position or PreferredFoot"),
+    club: Optional[str] = Query(None, description="Filter by club"),
+    nationality: Optional[str] = Query(None, description="Filter by nationality"),
+    position: Optional[str] = Query(None, description="Filter by position"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: all)")
+):
+    """Top football players by any numeric column, computed server-side"""
+    try:
+        return await leaderboard(
+            "football", column, k, order, per_group, fields, Club=club, Nationality=nationality, Position=position
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing football leaderboard: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": "Failed to compute football leaderboard",
+                "error": str(e)
+            }
+        )
+
+@app.get("/football/players/{player_id}/similar", response_model=Dict)
+async def get_similar_football_players(
+    player_id: int,
+    k: int = Query(10, ge=1, le=100, description="Number of similar players"),
+    club: Optional[str] = Query(None, description="Only players from this club"),
+    position: Optional[str] = Query(None, description="Only players in this position"),
+    max_value: Optional[float] = Query(None, ge=0, description="Maximum market value in euros"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: all)")
+):
+    """Players whose skill attributes are most similar (cosine) to the given player's"""
+    try:
+        columns = _fields("football", fields)
+        snapshot = await _table_snapshot("football")
+        with snapshot.reading() as state:
+            matches = state.positions_in("PlayerID", [player_id]) if not state.frame.empty else []
+            if not len(matches):
+                raise HTTPException(
+                    status_code=404,
+                    detail={
+                        "status": "error",
+                        "message": f"No football player with ID {player_id}",
+                        "error": "Player not found"
+                    }
+                )
+            
+            filters = {column: value for column, value in {"Club": club, "Position": position}.items() if value is not None}
+            allowed = state.positions(filters) if filters else None
+            positions, scores, method = state.similarity.search(int(matches[0]), k, allowed, max_value)
+            players = state.records_at(positions, columns)
+            name = row_value(state.records_at(matches[:1], ["Name"])[0], "Name")
+        for player, score in zip(players, scores):
+            player["similarity"] = round(float(score), 4)
+        
+        return {
+            "status": "success",
+            "player": name,
+            "method": method,
+            "count": len(players),
+            "data": players
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error finding players similar to {player_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": "Failed to find similar football players",
+                "error": str(e)
+            }
+        )
+
+def fetch_players_by_ids(conn, ids_by_sport: Dict[str, List[int]]) -> Dict[str, List[Dict]]:
+    """Fetch the model columns of each sport's rows for its IDs, one query per
+    table that has any"""
+    found = {}
+    for sport, player_ids in ids_by_sport.items():
+        found[sport] = []
+        if player_ids:
+            statement, params = players_by_id(sport, player_ids, MODEL_COLUMNS[sport])
+            found[sport] = fetch_rows(conn, statement.sql, params)
+    return found
+
+def probe_player_ids(conn, sports: List[str], player_ids: List[int]) -> Dict[str, List]:
+    """The IDs among ``player_ids`` present in each of the ``sports`` tables"""
+    found = {}
+    for sport in sports:
+        statement, params = players_by_id(sport, player_ids, [ID_COLUMNS[sport]])
+        found[sport] = [row_value(row, ID_COLUMNS[sport]) for row in fetch_rows(conn, statement.sql, params)]
+    return found
+
+def snapshot_players(sport: str, player_ids: List[int]):
+    """Snapshot rows (model columns only) matching ``player_ids`` and their precomputed feature rows"""
+    with snapshots[sport].reading() as state:
+        positions = state.positions_in(ID_COLUMNS[sport], player_ids)
+        return state.records_at(positions, MODEL_COLUMNS[sport]), state.features.matrix[positions]
+
+async def locate_players(request: Request, player_ids: List[int], sports: List[str]) -> Dict[str, List[int]]:
+    """The distinct ``player_ids`` held by each of the ``sports`` tables.
+
+    IDs come from the player directory. IDs it does not know are not in the
+    tables it holds completely; for the other tables they are looked for in
+    the snapshots or the warehouse and added to it.
+    """
+    located, unknown = directory.locate(player_ids)
+    incomplete = [sport for sport in sports if not directory.complete(sport)]
+    if unknown and incomplete:
+        if all(snapshots.ready(sport) for sport in incomplete):
+            found = {}
+            for sport in incomplete:
+                with snapshots[sport].reading() as state:
+                    values = state.frame[state.column(ID_COLUMNS[sport])].to_numpy()
+                    found[sport] = values[state.positions_in(ID_COLUMNS[sport], unknown)].tolist()
+        else:
+            found = await run_query(request, probe_player_ids, incomplete, unknown)
+        for sport, ids in found.items():
+            directory.add(sport, ids)
+            known = set(map(int, ids))
+            located[sport].extend(player_id for player_id in unknown if player_id in known)
+    return {sport: located[sport] for sport in sports}
+
+async def resolve_players_by_ids(request: Request, player_ids: List[int]):
+    """Rows of both sports matching any of ``player_ids``, plus their feature rows
+    when served from the snapshots (None when fetched from the warehouse)"""
+    if not player_ids:
+        return {"cricket": [], "football": []}, {"cricket": None, "football": None}
+    located = await locate_players(request, player_ids, list(TABLES))
+    if snapshots.ready("cricket") and snapshots.ready("football"):
+        found, features = {}, {}
+        for sport in ("cricket", "football"):
+            found[sport], features[sport] = snapshot_players(sport, located[sport])
+        return found, features
+    found = await run_query(request, fetch_players_by_ids, located)
+    return found, {"cricket": None, "football": None}
+
+async def resolve_prediction_players(request: Request, player_ids: List[int], sport: Optional[str] = None):
+    """Find the players to score, from the snapshots when loaded, else the warehouse.
+
+    Only the table of ``sport`` is read; when it is None that is cricket if
+    any ID is a cricket player, else football. Returns (sport, rows, feature
+    rows or None).
+    """
+    if not player_ids:
+        return None, [], None
+    located = await locate_players(request, player_ids, [sport] if sport else list(TABLES))
+    if sport is None:
+        sport = next((name for name, ids in located.items() if ids), None)
+    if sport is None or not located[sport]:
+        return None, [], None
+    if snapshots.ready(sport):
+        players, features = snapshot_players(sport, located[sport])
+    else:
+        players = (await run_query(request, fetch_players_by_ids, {sport: located[sport]}))[sport]
+        features = None
+    if not players:
+        return None, [], None
+    return sport, players, features
+
+# Search Endpoint
+@app.get("/search", response_model=Dict)
+async def search_players(
+    q: str = Query(..., min_length=1, max_length=100, description="Name, name prefix or misspelled name"),
+    sport: Optional[str] = Query(None, pattern="^(cricket|football)$", description="Restrict to one sport"),
+    limit: int = Query(10, ge=1, le=MAX_SEARCH_LIMIT, description="Maximum number of results"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (must exist in every sport searched)")
+):
+    """Search players of both sports by name, ranked best match first.
+
+    Matching ignores case and accents, treats the last word as a prefix and
+    tolerates a typo or two in longer words.
+    """
+    try:
+        sports = [sport] if sport else ["cricket", "football"]
+        columns = {name: _fields(name, fields) for name in sports}
+        results = []
+        for name in sports:
+            snapshot = await _table_snapshot(name)
+            with snapshot.reading() as state:
+                if state.frame.empty:
+                    continue
+                hits = state.search_index.search(q, limit)
+                rows = state.records_at([position for position, _ in hits], columns[name])
+            results.extend(
+                {"sport": name, "score": round(score, 4), "player": row}
+                for (_, score), row in zip(hits, rows)
+            )
+        results.sort(key=lambda result: -result["score"])
+        
+        return {
+            "status": "success",
+            "query": q,
+            "count": len(results[:limit]),
+            "data": results[:limit]
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching players for {q!r}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": "Player search failed",
+                "error": str(e)
+            }
+        )
 
 # Combined Prediction Endpoint
 @app.post("/predict", response_model=Dict)
-async def predict_performance(request: PredictionRequest):
-    """Predict performance for selected players (works for both cricket and football)"""
+async def predict_performance(request: Request, prediction: PredictionRequest):
+    """Predict performance for selected players (works for both cricket and football).
+
+    Pass ``sport`` to score only that sport's players; otherwise the squad is
+    cricket if any ID is a cricket player.
+    """
     try:
-        # Your prediction logic here
-        # This is a placeholder - implement your actual prediction algorithm
-        
-        # First try cricket players
-        conn = get_snowflake_connection()
-        cursor = conn.cursor()
-        
-        cricket_query = """
-        SELECT * FROM CRICKETPLAYERS.PUBLIC.CRICKETPLAYER
-        WHERE No IN (%s)
-        """ % ','.join(['%s']*len(request.player_ids))
-        
-        cursor.execute(cricket_query, request.player_ids)
-        cricket_players = [dict(zip([col[0] for col in cursor.description], row)) 
-                         for row in cursor.fetchall()]
-        
-        # Then try football players if no cricket players found
-        if not cricket_players:
-            football_query = """
-            SELECT * FROM PLAYERFOOTBALL.PUBLIC.PLAYERFOOTBALL
-            WHERE PlayerID IN (%s)
-            """ % ','.join(['%s']*len(request.player_ids))
-            
-            cursor.execute(football_query, request.player_ids)
-            football_players = [dict(zip([col[0] for col in cursor.description], row)) 
-                              for row in cursor.fetchall()]
-            
-            if football_players:
-                # Football prediction logic
-                avg_rating = sum(p['Overall'] for p in football_players) / len(football_players)
-                win_probability = min(100, avg_rating * 0.9)
-                
-                return {
-                    "status": "success",
-                    "sport": "football",
-                    "prediction": {
-                        "average_rating": avg_rating,
-                        "win_probability": win_probability,
-                        "key_players": [p['Name'] for p in football_players[:3]]
-                    }
-                }
+        sport = _check_choice(prediction.sport, list(TABLES), "sport")
+        sport, players, features = await resolve_prediction_players(request, prediction.player_ids, sport)
         
-        # Cricket prediction logic (if cricket players found)
-        if cricket_players:
-            avg_score = sum(p['Runs'] for p in cricket_players) / len(cricket_players) if cricket_players else 0
-            win_probability = min(100, avg_score * 0.8)
-            
+        if sport:
+            with timed("predict"):
+                result = predictor.predict(sport, players, features)
             return {
                 "status": "success",
-                "sport": "cricket",
-                "prediction": {
-                    "average_score": avg_score,
-                    "win_probability": win_probability,
-                    "key_players": [p['Name'] for p in cricket_players[:3]]
-                }
+                "sport": sport,
+                "prediction": result
             }
         
         # No players found
@@ -513,6 +1460,8 @@ async def predict_performance(request: PredictionRequest):
             "prediction": None
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}")
         raise HTTPException(
@@ -523,9 +1472,205 @@ async def predict_performance(request: PredictionRequest):
                 "error": str(e)
             }
         )
-    finally:
-        if 'conn' in locals():
-            conn.close()
+
+@app.post("/predict/batch", response_model=Dict)
+async def predict_performance_batch(request: Request, batch: BatchPredictionRequest):
+    """Predict performance for many squads in one call.
+
+    The union of all player IDs is resolved once, players shared between
+    squads are scored once, and each sport's squads are scored in a single
+    model call. Results are returned in the order of the input squads.
+    """
+    try:
+        if len(batch.squads) > PREDICT_BATCH_MAX_SQUADS:
+            raise HTTPException(
+                status_code=413,
+                detail={
+                    "status": "error",
+                    "message": f"At most {PREDICT_BATCH_MAX_SQUADS} squads per batch",
+                    "error": f"{len(batch.squads)} squads received"
+                }
+            )
+        
+        player_ids = sorted({player_id for squad in batch.squads for player_id in squad})
+        found, features = await resolve_players_by_ids(request, player_ids)
+        
+        # Distinct rows per sport, and the row positions each ID maps to
+        rows_by_id = {sport: {} for sport in found}
+        for sport, rows in found.items():
+            for position, row in enumerate(rows):
+                rows_by_id[sport].setdefault(row_value(row, ID_COLUMNS[sport]), []).append(position)
+        
+        # Same rule as /predict: a squad is cricket if any ID is a cricket player
+        assignments = {"cricket": [], "football": []}
+        for squad_number, squad in enumerate(batch.squads):
+            for sport in ("cricket", "football"):
+                positions = [p for player_id in dict.fromkeys(squad) for p in rows_by_id[sport].get(player_id, [])]
+                if positions:
+                    assignments[sport].append((squad_number, positions))
+                    break
+        
+        results = [
+            {"status": "success", "message": "No players found with the given IDs", "prediction": None}
+            for _ in batch.squads
+        ]
+        for sport, squads in assignments.items():
+            if not squads:
+                continue
+            with timed("predict"):
+                predictions = predictor.predict_many(
+                    sport, found[sport], [positions for _, positions in squads], features[sport]
+                )
+            for (squad_number, _), prediction in zip(squads, predictions):
+                results[squad_number] = {"status": "success", "sport": sport, "prediction": prediction}
+        
+        return {
+            "status": "success",
+            "count": len(results),
+            "players_resolved": sum(len(rows) for rows in found.values()),
+            "results": results
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": "Batch prediction failed",
+                "error": str(e)
+            }
+        )
+
+# Aggregate Endpoints
+@app.get("/{sport}/aggregates", response_model=Dict)
+async def get_aggregates(
+    sport: str,
+    column: Optional[str] = Query(None, description="Numeric column to summarize (default Runs / Overall)"),
+    group_by: Optional[str] = Query(None, description="Column to group by, e.g. Team, Club, Nationality, Position"),
+    sort: str = Query("count", description="Statistic to order groups by: count, mean, min, max or sum"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of groups"),
+    histogram_column: Optional[str] = Query(None, alias="histogram", description="Numeric column to bin, e.g. Overall"),
+    bins: int = Query(10, ge=1, le=MAX_HISTOGRAM_BINS, description="Number of histogram bins")
+):
+    """Summary statistics, per-group statistics and histograms computed server-side"""
+    try:
+        _check_sport(sport)
+        column = _check_choice(column or ("Runs" if sport == "cricket" else "Overall"), NUMERIC_COLUMNS[sport], "column")
+        group_by = _check_choice(group_by, GROUP_BY_COLUMNS[sport], "group_by column")
+        sort = _check_choice(sort, AGGREGATE_STATS, "sort statistic")
+        histogram_column = _check_choice(histogram_column, NUMERIC_COLUMNS[sport], "histogram column")
+        
+        async def compute():
+            frame = await _player_frame(sport)
+            result = {"column": column, "rows": len(frame)}
+            if frame.empty:
+                return result
+            result["summary"] = summary(frame, column)
+            if group_by:
+                result["group_by"] = group_by
+                result["groups"] = group_stats(frame, group_by, column, sort, limit)
+            if histogram_column:
+                result["histogram"] = histogram(frame, histogram_column, bins)
+            return result
+        
+        key = make_key(
+            f"{sport}/aggregates", column=column, group_by=group_by, sort=sort,
+            limit=limit, histogram=histogram_column, bins=bins
+        )
+        result = await player_cache.get_or_load(sport, key, compute)
+        return {"status": "success", **result}
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing {sport} aggregates: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": f"Failed to compute {sport} aggregates",
+                "error": str(e)
+            }
+        )
+
+# Feature Store Endpoints
+@app.get("/{sport}/teams/features", response_model=Dict)
+async def get_team_features(
+    sport: str,
+    features: Optional[str] = Query(None, description="Comma-separated feature names (default: all)")
+):
+    """Per-team (cricket) or per-club (football) averages of the precomputed player features"""
+    try:
+        names = _feature_names(sport, features)
+        with (await _table_snapshot(sport)).reading() as state:
+            teams = state.features.team_aggregates(names)
+        return {
+            "status": "success",
+            "group_by": GROUP_COLUMNS[sport],
+            "count": len(teams),
+            "data": teams
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing {sport} team features: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": f"Failed to compute {sport} team features",
+                "error": str(e)
+            }
+        )
+
+@app.get("/{sport}/players/{player_id}/features", response_model=Dict)
+async def get_player_features(sport: str, player_id: int):
+    """Precomputed raw and derived features of one player"""
+    try:
+        _check_sport(sport)
+        if snapshots.ready(sport):
+            players, vectors = snapshot_players(sport, [player_id])
+        else:
+            statement, params = players_by_id(sport, [player_id], MODEL_COLUMNS[sport])
+            players, vectors = await _load_rows(
+                sport, f"Executing {statement.name} for player {player_id}", statement.sql, params
+            ), None
+        if not players:
+            raise HTTPException(
+                status_code=404,
+                detail={
+                    "status": "error",
+                    "message": f"No {sport} player with ID {player_id}",
+                    "error": "Player not found"
+                }
+            )
+        if vectors is None:
+            vectors = feature_matrix(sport, players)
+        return {
+            "status": "success",
+            "count": len(players),
+            "data": [
+                {"name": row_value(row, "Name"), "features": dict(zip(FEATURES[sport], map(float, vector)))}
+                for row, vector in zip(players, vectors)
+            ]
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching {sport} player features: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status": "error",
+                "message": f"Failed to fetch {sport} player features",
+                "error": str(e)
+            }
+        )
 
 @app.get("/")
 async def root():
@@ -535,13 +1680,32 @@ async def root():
             "cricket": {
                 "/cricket/players/all": "GET all cricket player data",
                 "/cricket/players": "GET filtered cricket player data",
-                "/cricket/players [POST]": "Add new cricket player"
+                "/cricket/players [POST]": "Add new cricket player",
+                "/cricket/players/bulk [POST]": "Add many cricket players (JSON array, NDJSON or CSV)",
+                "/cricket/leaderboard": "GET top cricket players by any numeric column"
             },
             "football": {
                 "/football/players/all": "GET all football player data",
                 "/football/players": "GET filtered football player data",
-                "/football/players [POST]": "Add new football player"
+                "/football/players [POST]": "Add new football player",
+                "/football/players/bulk [POST]": "Add many football players (JSON array, NDJSON or CSV)",
+                "/football/leaderboard": "GET top football players by any numeric column",
+                "/football/players/{player_id}/similar": "GET players with the most similar skill profile"
             },
-            "/predict [POST]": "Predict performance for selected players (both sports)"
+            "/search": "GET players of both sports by name (prefix and typo tolerant)",
+            "/predict [POST]": "Predict performance for selected players (both sports, or pass sport)",
+            "/predict/batch [POST]": "Predict performance for many squads in one call",
+            "/{sport}/aggregates": "GET per-group statistics and histograms of a numeric column",
+            "/{sport}/teams/features": "GET per-team averages of precomputed player features",
+            "/{sport}/players/{player_id}/features": "GET precomputed features of one player",
+            "/healthz": "GET liveness probe",
+            "/readyz": "GET readiness probe (503 until pool, models, snapshots and directory are warm)",
+            "/metrics": "GET Prometheus metrics (latency per stage, rows, bytes sent)",
+            "/profiler/stats": "GET slow-request sampling profiler status",
+            "/pool/metrics": "GET database connection pool metrics",
+            "/cache/stats": "GET player cache (and shared cross-worker cache) counters",
+            "/snapshot/stats": "GET in-memory player snapshot status",
+            "/writes/status": "GET write-behind queue depth and lag",
+            "/writes/{write_id}": "GET state of a queued insert"
         }
     }
\ No newline at end of file
@@ -0,0 +1,115 @@
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+import database
+
+logger = logging.getLogger(__name__)
+
+
+class Backend:
+    """Storage engine behind the player tables.
+
+    connect() returns a DB-API connection that accepts the warehouse's SQL:
+    %s placeholders and the DATABASE.SCHEMA.TABLE names in schema.TABLES.
+    Everything above db.py (pool, executor, snapshots, inserts) only sees
+    such connections.
+    """
+
+    name = ""
+
+    def connect(self):
+        raise NotImplementedError
+
+    def ping(self, conn) -> bool:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            return cursor.fetchone() is not None
+        finally:
+            cursor.close()
+
+    def cancel(self, conn):
+        """Abort whatever ``conn`` is currently executing; called from another thread"""
+
+    def describe(self) -> Dict:
+        return {"backend": self.name}
+
+
+class SnowflakeBackend(Backend):
+    name = "snowflake"
+
+    def connect(self):
+        import snowflake.connector
+
+        return snowflake.connector.connect(
+            user=os.getenv("SNOWFLAKE_USER"),
+            password=os.getenv("SNOWFLAKE_PASSWORD"),
+            account=os.getenv("SNOWFLAKE_ACCOUNT"),
+            warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
+            database=os.getenv("SNOWFLAKE_DATABASE", os.getenv("SNOWFLAKE_DATABASE1")),
+            schema=os.getenv("SNOWFLAKE_SCHEMA"),
+            role=os.getenv("SNOWFLAKE_ROLE", "PUBLIC"),
+            client_session_keep_alive=True,
+            session_parameters={
+                # Repeated statements (query_builder keeps their text stable)
+                # are answered from the result cache while the table is unchanged
+                "USE_CACHED_RESULT": True,
+                "QUERY_TAG": os.getenv("SNOWFLAKE_QUERY_TAG", "sportsanalytics-api"),
+            }
+        )
+
+    def cancel(self, conn):
+        session_id = getattr(conn, "session_id", None)
+        if session_id is None:
+            return
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT SYSTEM$CANCEL_ALL_QUERIES(%s)", (session_id,))
+            cursor.close()
+        except Exception as e:
+            logger.warning(f"Failed to cancel queries for session {session_id}: {str(e)}")
+
+
+class SQLiteBackend(Backend):
+    """Embedded SQLite file in WAL mode (concurrent readers alongside one writer).
+
+    The player tables are created on first connect, so an empty file serves
+    the API straight away.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("SQLITE_DATABASE", database.SQLITE_DATABASE)
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def connect(self):
+        with self._lock:
+            if not self._initialized:
+                database.init_db(self.path)
+                self._initialized = True
+        return database.get_db(self.path)
+
+    def cancel(self, conn):
+        conn.interrupt()
+
+    def describe(self) -> Dict:
+        return {"backend": self.name, "path": os.path.abspath(self.path)}
+
+
+BACKENDS = {
+    "snowflake": SnowflakeBackend,
+    "sqlite": SQLiteBackend,
+}
+
+
+def create_backend(name: Optional[str] = None) -> Backend:
+    """Backend called ``name``, by default the one set in DB_BACKEND (snowflake or sqlite)"""
+    name = name or os.getenv("DB_BACKEND", "snowflake")
+    backend = BACKENDS.get(name.lower())
+    if backend is None:
+        raise ValueError(f"Unknown DB_BACKEND {name!r}; use one of {', '.join(BACKENDS)}")
+    return backend()
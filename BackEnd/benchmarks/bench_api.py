@@ -0,0 +1,306 @@
+"""Offline end-to-end benchmark of every API endpoint.
+
+Seeds a SQLite database (the sqlite backend, see benchmarks/warehouse.py)
+with synthetic cricket and football tables, serves the app in-process
+through httpx's ASGI transport, and runs each endpoint scenario at several
+concurrency levels. Reports throughput, p50/p99 latency, errors and RSS per
+scenario and level as JSON, tagged with the git commit, so runs on
+different commits can be compared directly. Client and server share one
+event loop, so absolute numbers include client overhead; compare runs made
+with the same options.
+
+    python benchmarks/bench_api.py --rows 100000 --concurrency 1,8,32 --output bench.json
+    python benchmarks/bench_api.py --rows 1000000 --scenarios search,predict --reuse-db
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import warehouse  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    # rng -> (path, request kwargs)
+    build: Callable[[random.Random], tuple]
+    # Full-table reads and writes run --heavy-requests times instead of --requests
+    heavy: bool = False
+    # Writes run after every read scenario so they do not disturb the caches mid-run
+    write: bool = False
+
+
+def scenarios(rows: Dict[str, int]) -> List[Scenario]:
+    cricket_ids = max(rows["cricket"], 1)
+    football_ids = max(rows["football"], 1)
+    new_ids = itertools.count(10 ** 9)
+    names = warehouse.FIRST_NAMES + warehouse.LAST_NAMES
+
+    def club(rng):
+        return f"Club {rng.randrange(warehouse.CLUB_COUNT)}"
+
+    def cricket_player(rng, number):
+        return {
+            "Team": rng.choice(warehouse.CRICKET_TEAMS), "Format": "ODI", "Gender": "Men", "No": number,
+            "Name": "Bench Player", "First": "Bench", "Last": "Player", "Mat": 10, "Runs": 300, "HS": 80,
+            "Avg": 30.0, "Fifty": 2, "Hundred": 0, "Balls": 120, "Wkt": 4, "BBI": "2/20", "Ave": 25.0,
+            "FiveWI": 0, "Ca": 3, "St": 0,
+        }
+
+    def football_player(rng, number):
+        player = {column: rng.randint(40, 90) for column in warehouse.FOOTBALL_COLUMNS}
+        player.update(
+            PlayerID=number, Name="Bench Player", Nationality="Nation 1", Club=club(rng), Value="€1.0M",
+            Wage="€5K", PreferredFoot="Right", Position=rng.choice(warehouse.FOOTBALL_POSITIONS),
+            Height="6'0", Weight="170lbs",
+        )
+        return player
+
+    return [
+        Scenario("cricket_all", "GET", lambda rng: ("/cricket/players/all", {}), heavy=True),
+        Scenario("cricket_all_stream", "GET", lambda rng: ("/cricket/players/all?stream=true", {}), heavy=True),
+        Scenario("cricket_filtered", "GET", lambda rng: (
+            f"/cricket/players?team={rng.choice(warehouse.CRICKET_TEAMS)}&format=ODI&limit=100", {})),
+        Scenario("cricket_sorted_page", "GET", lambda rng: (
+            f"/cricket/players?sort=Runs&order=desc&limit={rng.choice([10, 50, 100])}", {})),
+        Scenario("cricket_leaderboard", "GET", lambda rng: (
+            f"/cricket/leaderboard?column={rng.choice(['Runs', 'Wkt', 'Avg'])}&k=10", {})),
+        Scenario("football_all", "GET", lambda rng: ("/football/players/all", {}), heavy=True),
+        Scenario("football_all_msgpack", "GET", lambda rng: ("/football/players/all?response_format=msgpack", {}), heavy=True),
+        Scenario("football_all_fields", "GET", lambda rng: ("/football/players/all?fields=PlayerID,Name,Club,Overall", {}), heavy=True),
+        Scenario("football_filtered", "GET", lambda rng: (
+            f"/football/players?club={club(rng)}&min_rating={rng.randint(50, 80)}&limit=100", {})),
+        Scenario("football_position_page", "GET", lambda rng: (
+            f"/football/players?position={rng.choice(warehouse.FOOTBALL_POSITIONS)}&sort=Overall&order=desc&limit=50", {})),
+        Scenario("football_leaderboard", "GET", lambda rng: (
+            "/football/leaderboard?column=Overall&k=5&per_group=Position", {})),
+        Scenario("football_similar", "GET", lambda rng: (
+            f"/football/players/{rng.randrange(football_ids)}/similar?k=10", {})),
+        Scenario("search", "GET", lambda rng: (
+            f"/search?q={rng.choice(names)[:rng.randint(3, 6)]}&limit=10", {})),
+        Scenario("aggregates", "GET", lambda rng: (
+            f"/football/aggregates?column=Overall&group_by={rng.choice(['Club', 'Position', 'Nationality'])}&limit=20", {})),
+        Scenario("team_features", "GET", lambda rng: ("/cricket/teams/features", {})),
+        Scenario("player_features", "GET", lambda rng: (
+            f"/football/players/{rng.randrange(football_ids)}/features", {})),
+        Scenario("predict", "POST", lambda rng: (
+            "/predict", {"json": {"player_ids": [rng.randrange(football_ids) for _ in range(11)]}})),
+        Scenario("predict_batch", "POST", lambda rng: (
+            "/predict/batch",
+            {"json": {"squads": [[rng.randrange(cricket_ids) for _ in range(11)] for _ in range(20)]}})),
+        Scenario("metrics", "GET", lambda rng: ("/metrics", {})),
+        Scenario("root", "GET", lambda rng: ("/", {})),
+        Scenario("pool_metrics", "GET", lambda rng: ("/pool/metrics", {})),
+        Scenario("cache_stats", "GET", lambda rng: ("/cache/stats", {})),
+        Scenario("snapshot_stats", "GET", lambda rng: ("/snapshot/stats", {})),
+        Scenario("profiler_stats", "GET", lambda rng: ("/profiler/stats", {})),
+        Scenario("cricket_insert", "POST", lambda rng: (
+            "/cricket/players", {"json": cricket_player(rng, next(new_ids))}), write=True),
+        Scenario("football_insert", "POST", lambda rng: (
+            "/football/players", {"json": football_player(rng, next(new_ids))}), write=True),
+        Scenario("football_bulk", "POST", lambda rng: (
+            "/football/players/bulk", {"json": [football_player(rng, next(new_ids)) for _ in range(100)]}),
+            heavy=True, write=True),
+    ]
+
+
+def rss_mb() -> Dict[str, Optional[float]]:
+    """Current and peak resident set size of this process"""
+    current = peak = None
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+    return {
+        "rss_mb": round(current, 1) if current is not None else None,
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+    }
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def run_level(client, scenario: Scenario, concurrency: int, requests: int, rng: random.Random) -> Dict:
+    # Build every request up front so generating them is not timed
+    calls = [scenario.build(rng) for _ in range(requests)]
+    pending = iter(calls)
+    latencies, errors = [], []
+
+    async def worker():
+        for path, kwargs in pending:
+            started = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, path, **kwargs)
+                if response.status_code >= 400:
+                    errors.append(response.status_code)
+            except Exception as e:
+                errors.append(type(e).__name__)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": scenario.name,
+        "method": scenario.method,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "error_codes": sorted({str(error) for error in errors}),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        **rss_mb(),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def wait_until_ready(app, timeout: float) -> bool:
+    """Wait for the app's warm-up (pool, models, snapshots, player directory; see /readyz)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if app.readiness.status()[0]:
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def run(args) -> Dict:
+    import httpx
+
+    rows = {"cricket": args.cricket_rows or args.rows, "football": args.football_rows or args.rows}
+    seed_s = None
+    if not (args.reuse_db and os.path.exists(args.db)):
+        print(f"Seeding {args.db} with {rows['cricket']:,} cricket and {rows['football']:,} football rows", file=sys.stderr)
+        seed_s = {sport: round(seconds, 2) for sport, seconds in warehouse.seed(args.db, rows).items()}
+
+    warehouse.install(args.db)
+    started = time.perf_counter()
+    import app
+    await app.open_connection_pool()
+    snapshots_ready = await wait_until_ready(app, args.startup_timeout) and app.snapshots.enabled
+    startup_s = time.perf_counter() - started
+
+    selected = set(args.scenarios.split(",")) if args.scenarios else None
+    plan = [scenario for scenario in scenarios(rows) if selected is None or scenario.name in selected]
+    plan.sort(key=lambda scenario: scenario.write)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    rng = random.Random(args.seed)
+
+    results = []
+    transport = httpx.ASGITransport(app=app.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for scenario in plan:
+                requests = args.heavy_requests if scenario.heavy else args.requests
+                if not args.no_warmup:
+                    await run_level(client, scenario, 1, 1, rng)
+                for level in levels:
+                    result = await run_level(client, scenario, level, requests, rng)
+                    results.append(result)
+                    print(
+                        f"{scenario.name:<24} c={level:<3} {result['throughput_rps']:>9} req/s  "
+                        f"p50={result['p50_ms']:>9}ms  p99={result['p99_ms']:>9}ms  errors={result['errors']}",
+                        file=sys.stderr,
+                    )
+    finally:
+        await app.close_connection_pool()
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "rows": rows,
+            "concurrency": levels,
+            "requests": args.requests,
+            "heavy_requests": args.heavy_requests,
+            "snapshots": not args.no_snapshots,
+            "cache": not args.no_cache,
+            "seed": args.seed,
+        },
+        "seed_s": seed_s,
+        "startup_s": round(startup_s, 3),
+        "snapshots_ready": snapshots_ready,
+        "results": results,
+        **rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000, help="rows per table")
+    parser.add_argument("--cricket-rows", type=int, help="override --rows for the cricket table")
+    parser.add_argument("--football-rows", type=int, help="override --rows for the football table")
+    parser.add_argument("--db", help="SQLite file to seed and serve (default: one per row count in the temp dir)")
+    parser.add_argument("--reuse-db", action="store_true", help="keep an existing --db instead of reseeding it")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and level")
+    parser.add_argument("--heavy-requests", type=int, default=10, help="requests for full-table and bulk scenarios")
+    parser.add_argument("--scenarios", help="comma-separated scenario names (default: all)")
+    parser.add_argument("--no-snapshots", action="store_true", help="serve every read from the database instead of memory")
+    parser.add_argument("--no-cache", action="store_true", help="disable the player result cache")
+    parser.add_argument("--no-warmup", action="store_true", help="do not send one untimed request per scenario first")
+    parser.add_argument("--startup-timeout", type=float, default=600, help="seconds to wait for snapshots and the player directory to load")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    rows = {"cricket": args.cricket_rows or args.rows, "football": args.football_rows or args.rows}
+    args.db = args.db or os.path.join(tempfile.gettempdir(), f"sportsanalytics-bench-{rows['cricket']}-{rows['football']}.db")
+    # Read by the app's modules at import time
+    os.environ["SNAPSHOT_ENABLED"] = "0" if args.no_snapshots else "1"
+    os.environ["SNAPSHOT_DIR"] = tempfile.mkdtemp(prefix="sportsanalytics-bench-snapshots-")
+    os.environ["SNAPSHOT_REFRESH_INTERVAL"] = "86400"
+    if args.no_cache:
+        os.environ["PLAYER_CACHE_MAX_ENTRIES"] = "0"
+    logging.disable(logging.WARNING)
+
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(os.environ["SNAPSHOT_DIR"], ignore_errors=True)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
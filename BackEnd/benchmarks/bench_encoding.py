@@ -0,0 +1,98 @@
+"""Benchmark response encodings for the player endpoints.
+
+Serializes a synthetic football table (18k rows by default, the size of the
+FIFA dataset) in each format served by encoding.py, and compares it with the
+previous path: PlayerResponse validation followed by FastAPI's JSON encoding.
+Reports body size, gzip/brotli sizes and encode times.
+
+    python benchmarks/bench_encoding.py --rows 18000
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from encoding import FORMATS, available, encode  # noqa: E402
+from schema import FOOTBALL_COLUMNS  # noqa: E402
+
+TEXT_COLUMNS = {"Name", "Nationality", "Club", "Value", "Wage", "PreferredFoot", "Position", "Height", "Weight"}
+
+
+def synthetic_rows(count: int, seed: int = 5):
+    rng = np.random.default_rng(seed)
+    numbers = rng.integers(1, 99, (count, len(FOOTBALL_COLUMNS))).tolist()
+    rows = []
+    for i, values in enumerate(numbers):
+        row = dict(zip(FOOTBALL_COLUMNS, values))
+        for column in TEXT_COLUMNS:
+            row[column] = f"{column} {values[0]}"
+        row["PlayerID"] = i
+        rows.append(row)
+    return rows
+
+
+def best_of(fn, repeat: int):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return result, min(timings) * 1000
+
+
+def validated_json(envelope, rows) -> bytes:
+    """The pre-negotiation path: response_model validation and JSON-mode dump, then JSONResponse's json.dumps"""
+    from app import PlayerResponse
+    model = PlayerResponse.model_validate({**envelope, "data": rows})
+    return json.dumps(model.model_dump(mode="json"), separators=(",", ":")).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=18_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-baseline", action="store_true", help="Do not import app for the validated-JSON baseline")
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    envelope = {"status": "success", "count": len(rows)}
+    candidates = {fmt: (lambda fmt=fmt: encode(fmt, envelope, rows)) for fmt in FORMATS if available(fmt)}
+    if not args.skip_baseline:
+        candidates = {"validated json (before)": lambda: validated_json(envelope, rows), **candidates}
+
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    results = []
+    for name, fn in candidates.items():
+        body, encode_ms = best_of(fn, args.repeat)
+        gzipped, gzip_ms = best_of(lambda: gzip.compress(body, compresslevel=5), 1)
+        result = {
+            "format": name,
+            "bytes": len(body),
+            "encode_ms": round(encode_ms, 1),
+            "gzip_bytes": len(gzipped),
+            "gzip_ms": round(gzip_ms, 1),
+        }
+        if brotli is not None:
+            compressed, brotli_ms = best_of(lambda: brotli.compress(body, quality=4), 1)
+            result.update(brotli_bytes=len(compressed), brotli_ms=round(brotli_ms, 1))
+        results.append(result)
+        print(
+            f"{name:<24} {len(body):>10,} B  encode={encode_ms:8.1f}ms  gzip={len(gzipped):>9,} B"
+            + (f"  br={result['brotli_bytes']:>9,} B" if brotli is not None else "")
+        )
+
+    print(json.dumps({"rows": args.rows, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
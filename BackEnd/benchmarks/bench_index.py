@@ -0,0 +1,83 @@
+"""Benchmark indexed player lookups against a linear scan.
+
+Builds a synthetic football table (1M rows by default) and times each
+filter combination with TableIndex.lookup and with a full-scan mask.
+
+    python benchmarks/bench_index.py --rows 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from index import TableIndex, linear_scan  # noqa: E402
+
+POSITIONS = ["GK", "CB", "LB", "RB", "CDM", "CM", "CAM", "LM", "RM", "LW", "RW", "ST", "CF"]
+
+
+def synthetic_football(rows: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "PlayerID": np.arange(rows, dtype=np.int64),
+        "Club": rng.choice([f"Club {i}" for i in range(700)], rows),
+        "Nationality": rng.choice([f"Nation {i}" for i in range(160)], rows),
+        "Position": rng.choice(POSITIONS, rows),
+        "Overall": np.clip(rng.normal(66, 7, rows).round(), 40, 99).astype(np.int16),
+    })
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    frame = synthetic_football(args.rows)
+    started = time.perf_counter()
+    index = TableIndex(frame, hash_columns=["Club", "Nationality", "Position"], sorted_columns=["Overall"])
+    build_ms = (time.perf_counter() - started) * 1000
+
+    scenarios = {
+        "club": ({"Club": "Club 7"}, {}),
+        "club+position": ({"Club": "Club 7", "Position": "ST"}, {}),
+        "nationality+position+rating": ({"Nationality": "Nation 3", "Position": "CB"}, {"Overall": (70, 85)}),
+        "rating>=90": ({}, {"Overall": (90, None)}),
+        "club+rating": ({"Club": "Club 42"}, {"Overall": (60, 75)}),
+    }
+
+    results = []
+    for name, (equals, ranges) in scenarios.items():
+        indexed = index.lookup(equals, ranges)
+        scanned = linear_scan(frame, equals, ranges)
+        assert np.array_equal(indexed, scanned), name
+        indexed_ms = best_of(lambda: index.lookup(equals, ranges), args.repeat) * 1000
+        scan_ms = best_of(lambda: linear_scan(frame, equals, ranges), args.repeat) * 1000
+        results.append({
+            "scenario": name,
+            "matches": int(len(indexed)),
+            "indexed_ms": round(indexed_ms, 4),
+            "scan_ms": round(scan_ms, 4),
+            "speedup": round(scan_ms / indexed_ms, 1) if indexed_ms else None,
+        })
+        print(f"{name:<30} matches={len(indexed):>7}  indexed={indexed_ms:9.4f}ms  scan={scan_ms:9.4f}ms")
+
+    print(json.dumps({"rows": args.rows, "index_build_ms": round(build_ms, 1), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
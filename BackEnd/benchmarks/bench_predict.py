@@ -0,0 +1,83 @@
+"""Benchmark /predict scoring latency.
+
+Times Predictor.predict for a single squad (POST /predict), and
+Predictor.predict_many for many squads drawn from one pool of players
+(POST /predict/batch) against calling predict once per squad, using
+synthetic football players. Uses the model in PREDICTION_MODEL_DIR if
+present, the baseline otherwise.
+
+    python benchmarks/bench_predict.py --squad-size 22 --squads 100 --pool 1000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import FOOTBALL_RAW, feature_matrix  # noqa: E402
+from predictor import LATENCY_BUDGET_MS, predictor  # noqa: E402
+
+
+def synthetic_players(count: int, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    players = []
+    for i in range(count):
+        row = {feature: int(rng.integers(20, 99)) for feature in FOOTBALL_RAW}
+        row.update(PlayerID=i, Name=f"Player {i}")
+        players.append(row)
+    return players
+
+
+def timed(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return float(np.percentile(timings, 99)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--squad-size", type=int, default=22)
+    parser.add_argument("--squads", type=int, default=100)
+    parser.add_argument("--pool", type=int, default=1000, help="distinct players the squads are drawn from")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    predictor.load()
+    squad = synthetic_players(args.squad_size)
+    single_ms = timed(lambda: predictor.predict("football", squad), args.repeat)
+
+    # As /predict/batch calls it: distinct players featurized once, squads as indexes into them
+    pool = synthetic_players(max(args.pool, args.squad_size))
+    X = feature_matrix("football", pool)
+    rng = np.random.default_rng(4)
+    squads = [rng.choice(len(pool), args.squad_size, replace=False).tolist() for _ in range(args.squads)]
+    batch_ms = timed(lambda: predictor.predict_many("football", pool, squads, X), args.repeat)
+    per_squad_ms = timed(
+        lambda: [predictor.predict("football", [pool[i] for i in squad], X[squad]) for squad in squads],
+        args.repeat,
+    )
+
+    result = {
+        "model": predictor.sources["football"],
+        "squad_size": args.squad_size,
+        "single_squad_p99_ms": round(single_ms, 3),
+        "budget_ms": LATENCY_BUDGET_MS,
+        "within_budget": single_ms <= LATENCY_BUDGET_MS,
+        "squads": args.squads,
+        "pool": len(pool),
+        "predict_many_p99_ms": round(batch_ms, 3),
+        "predict_per_squad_p99_ms": round(per_squad_ms, 3),
+        "speedup": round(per_squad_ms / batch_ms, 2) if batch_ms else None,
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
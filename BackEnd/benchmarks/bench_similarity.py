@@ -0,0 +1,78 @@
+"""Benchmark similar-player search: exact ranking against the LSH index.
+
+Builds synthetic football skill vectors (100k players by default, drawn
+around a few dozen archetypes) and, for a sample of query players, times
+SimilarityIndex.search with the LSH and with an exact scan, reporting
+latency and recall@k of the LSH results.
+
+    python benchmarks/bench_similarity.py --rows 100000 --k 10
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import similarity  # noqa: E402
+from features import FOOTBALL_SKILLS  # noqa: E402
+from similarity import SimilarityIndex  # noqa: E402
+
+
+def synthetic_skills(rows: int, archetypes: int = 40, seed: int = 11) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.uniform(25, 90, (archetypes, len(FOOTBALL_SKILLS)))
+    assigned = rng.integers(0, archetypes, rows)
+    skills = centres[assigned] + rng.normal(0, 8, (rows, len(FOOTBALL_SKILLS)))
+    return np.clip(skills, 1, 99).round().astype(np.float32)
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    skills = synthetic_skills(args.rows)
+    values = np.random.default_rng(5).uniform(1e5, 1e8, args.rows)
+    index, build_ms = timed(lambda: SimilarityIndex("football", skills, values))
+
+    queries = np.random.default_rng(3).choice(args.rows, args.queries, replace=False)
+    lsh_ms, exact_ms, recalls, methods = [], [], [], set()
+    for position in queries:
+        similarity.EXACT_SEARCH_MAX = 0
+        (found, _, method), elapsed = timed(lambda: index.search(int(position), args.k))
+        lsh_ms.append(elapsed)
+        methods.add(method)
+        similarity.EXACT_SEARCH_MAX = args.rows + 1
+        (truth, _, _), elapsed = timed(lambda: index.search(int(position), args.k))
+        exact_ms.append(elapsed)
+        recalls.append(len(np.intersect1d(found, truth)) / args.k)
+
+    summary = {
+        "rows": args.rows,
+        "k": args.k,
+        "queries": args.queries,
+        "build_ms": round(build_ms, 1),
+        "lsh_p50_ms": round(float(np.percentile(lsh_ms, 50)), 3),
+        "lsh_p95_ms": round(float(np.percentile(lsh_ms, 95)), 3),
+        "exact_p50_ms": round(float(np.percentile(exact_ms, 50)), 3),
+        "exact_p95_ms": round(float(np.percentile(exact_ms, 95)), 3),
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "lsh_methods": sorted(methods),
+    }
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
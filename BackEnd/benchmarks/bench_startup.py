@@ -0,0 +1,199 @@
+"""Cold-start benchmark: how long a fresh worker takes to import, start and become ready.
+
+Seeds a SQLite database (the sqlite backend, see benchmarks/warehouse.py)
+and starts the app in a fresh interpreter per run, measuring:
+
+* import_s   ``import app`` (the process's own interpreter start excluded)
+* startup_s  the startup handler, i.e. until the worker answers /healthz
+* ready_s    from the start of the startup handler until /readyz reports ready
+* process_s  from spawning the interpreter until it is ready
+
+and which heavy optional modules (warehouse driver, ML libraries) were
+imported on the way; they should only be imported when they are used.
+"cold" runs start with an empty snapshot directory, so snapshots are read
+from the database; "warm" runs reuse the snapshot files the cold runs
+wrote, like a restarted worker. Reports medians per mode as JSON, tagged
+with the git commit. With --budget-import-ms / --budget-ready-ms the run
+exits with status 1 when a median exceeds its budget, so CI can track the
+cold-start budget.
+
+    python benchmarks/bench_startup.py --rows 100000 --runs 5 --output startup.json
+    python benchmarks/bench_startup.py --budget-import-ms 1500 --budget-ready-ms 3000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Optional modules the app must not import before it needs them
+HEAVY_MODULES = (
+    "snowflake.connector", "numpy", "pandas", "joblib", "sklearn", "xgboost", "msgpack", "brotli"
+)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def measure(timeout: float) -> Dict:
+    """Run in the child process: import and start the app, then wait until it is ready"""
+    started = time.perf_counter()
+    import app
+    imported = time.perf_counter()
+    heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    await app.open_connection_pool()
+    serving = time.perf_counter()
+    ready = False
+    while time.perf_counter() - serving < timeout:
+        ready, checks = app.readiness.status()
+        if ready:
+            break
+        await asyncio.sleep(0.01)
+    ready_at = time.perf_counter()
+    await app.close_connection_pool()
+    return {
+        "import_s": round(imported - started, 3),
+        "startup_s": round(serving - imported, 3),
+        "ready_s": round(ready_at - imported, 3),
+        "ready": ready,
+        "checks": checks,
+        "heavy_modules": heavy,
+    }
+
+
+def run_child(args, snapshot_dir: str) -> Dict:
+    env = dict(os.environ, SNAPSHOT_DIR=snapshot_dir)
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--startup-timeout", str(args.startup_timeout)],
+        capture_output=True, text=True, env=env,
+    )
+    elapsed = time.perf_counter() - started
+    if process.returncode != 0:
+        raise RuntimeError(f"Startup run failed:\n{process.stderr}")
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    # Also counts the interpreter start and the shutdown; see process_s below
+    result["process_s"] = round(elapsed, 3)
+    return result
+
+
+def summarize(runs: List[Dict]) -> Dict:
+    summary = {
+        key: round(statistics.median(run[key] for run in runs), 3)
+        for key in ("import_s", "startup_s", "ready_s", "process_s")
+    }
+    summary["ready"] = all(run["ready"] for run in runs)
+    summary["heavy_modules"] = sorted({name for run in runs for name in run["heavy_modules"]})
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000, help="rows per table")
+    parser.add_argument("--db", help="SQLite file to seed and serve (default: one per row count in the temp dir)")
+    parser.add_argument("--reuse-db", action="store_true", help="keep an existing --db instead of reseeding it")
+    parser.add_argument("--runs", type=int, default=3, help="runs per mode (the median is reported)")
+    parser.add_argument("--no-snapshots", action="store_true", help="serve every read from the database instead of memory")
+    parser.add_argument("--startup-timeout", type=float, default=600, help="seconds to wait for the app to become ready")
+    parser.add_argument("--budget-import-ms", type=float, help="fail if the median import time exceeds this")
+    parser.add_argument("--budget-ready-ms", type=float, help="fail if the median time to ready (warm start) exceeds this")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        logging.disable(logging.WARNING)
+        print(json.dumps(asyncio.run(measure(args.startup_timeout))))
+        return
+
+    # Not in the child: the seeding imports numpy, which the app itself defers
+    import warehouse
+
+    rows = {"cricket": args.rows, "football": args.rows}
+    args.db = args.db or os.path.join(tempfile.gettempdir(), f"sportsanalytics-bench-{rows['cricket']}-{rows['football']}.db")
+    seed_s = None
+    if not (args.reuse_db and os.path.exists(args.db)):
+        print(f"Seeding {args.db} with {args.rows:,} rows per table", file=sys.stderr)
+        seed_s = {sport: round(seconds, 2) for sport, seconds in warehouse.seed(args.db, rows).items()}
+    # Read by the app's modules at import time, in the child processes
+    warehouse.install(args.db)
+    os.environ["SNAPSHOT_ENABLED"] = "0" if args.no_snapshots else "1"
+    os.environ["SNAPSHOT_REFRESH_INTERVAL"] = "86400"
+    os.environ.pop("WRITE_BEHIND_ENABLED", None)
+    os.environ.pop("SHARED_CACHE_PATH", None)
+
+    snapshot_dir = tempfile.mkdtemp(prefix="sportsanalytics-bench-snapshots-")
+    modes = {"cold": [], "warm": []}
+    try:
+        for _ in range(args.runs):
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+            os.makedirs(snapshot_dir)
+            modes["cold"].append(run_child(args, snapshot_dir))
+        if not args.no_snapshots:
+            # Left behind by the last cold run
+            for _ in range(args.runs):
+                modes["warm"].append(run_child(args, snapshot_dir))
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+    results = {mode: summarize(runs) for mode, runs in modes.items() if runs}
+    for mode, summary in results.items():
+        print(
+            f"{mode:<5} import={summary['import_s'] * 1000:>7.0f}ms  startup={summary['startup_s'] * 1000:>6.0f}ms  "
+            f"ready={summary['ready_s'] * 1000:>7.0f}ms  process={summary['process_s'] * 1000:>7.0f}ms  "
+            f"heavy={','.join(summary['heavy_modules']) or '-'}",
+            file=sys.stderr,
+        )
+
+    budget_mode = "warm" if "warm" in results else "cold"
+    over_budget = []
+    if args.budget_import_ms is not None and results["cold"]["import_s"] * 1000 > args.budget_import_ms:
+        over_budget.append(f"import {results['cold']['import_s'] * 1000:.0f}ms > {args.budget_import_ms:.0f}ms")
+    if args.budget_ready_ms is not None and results[budget_mode]["ready_s"] * 1000 > args.budget_ready_ms:
+        over_budget.append(f"ready ({budget_mode}) {results[budget_mode]['ready_s'] * 1000:.0f}ms > {args.budget_ready_ms:.0f}ms")
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "rows": rows,
+            "runs": args.runs,
+            "snapshots": not args.no_snapshots,
+            "budget_import_ms": args.budget_import_ms,
+            "budget_ready_ms": args.budget_ready_ms,
+        },
+        "seed_s": seed_s,
+        "results": results,
+        "runs": modes,
+        "over_budget": over_budget,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    if over_budget:
+        print("Over the startup budget: " + "; ".join(over_budget), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
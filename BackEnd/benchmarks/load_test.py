@@ -0,0 +1,83 @@
+"""Concurrent load test for the player API.
+
+Runs a fixed number of requests against a running server at increasing
+concurrency levels and reports throughput and latency for each level. With
+database calls on the query executor, throughput should grow with
+concurrency (up to the executor/pool size) instead of staying flat.
+
+    uvicorn app:app --port 8000
+    python benchmarks/load_test.py --url http://localhost:8000 --path /cricket/players?limit=50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+
+async def _worker(client, path, queue, latencies, errors):
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_level(url, path, concurrency, requests):
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*[_worker(client, path, queue, latencies, errors) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/cricket/players?limit=50")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per level")
+    args = parser.parse_args()
+
+    results = []
+    for level in [int(x) for x in args.levels.split(",")]:
+        result = await run_level(args.url, args.path, level, args.requests)
+        results.append(result)
+        print(
+            f"concurrency={result['concurrency']:>3}  {result['throughput_rps']:>8} req/s  "
+            f"p50={result['p50_ms']}ms  p99={result['p99_ms']}ms  errors={result['errors']}"
+        )
+
+    baseline = results[0]["throughput_rps"]
+    for result in results:
+        result["speedup"] = round(result["throughput_rps"] / baseline, 2) if baseline else None
+    print(json.dumps({"url": args.url, "path": args.path, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+"""Synthetic player tables for offline benchmarks.
+
+seed() fills a SQLite file (the sqlite backend's layout, see database.py)
+with synthetic cricket and football players, and install() selects the
+sqlite backend for it, so every code path of the API (pool, executor,
+snapshots, inserts) runs against local data without a warehouse.
+"""
+import os
+import sqlite3
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import init_db, table_name  # noqa: E402
+from schema import CRICKET_COLUMNS, FOOTBALL_COLUMNS  # noqa: E402
+
+SEED_BATCH_ROWS = 50_000
+
+FIRST_NAMES = [
+    "Aaron", "Adam", "Alex", "Ali", "Andre", "Ben", "Bruno", "Carlos", "Chris", "Daniel", "David", "Diego",
+    "Eden", "Emil", "Felix", "Hugo", "Ivan", "Jack", "James", "Joao", "Jordan", "Karim", "Kevin", "Kylian",
+    "Luis", "Luka", "Marco", "Mohamed", "Nathan", "Oliver", "Pablo", "Pedro", "Rahul", "Rohit", "Sadio",
+    "Sergio", "Steve", "Thomas", "Virat", "Yuki",
+]
+LAST_NAMES = [
+    "Silva", "Santos", "Smith", "Jones", "Williams", "Brown", "Taylor", "Muller", "Schmidt", "Rossi", "Bianchi",
+    "Garcia", "Martinez", "Lopez", "Fernandes", "Kane", "Sharma", "Kohli", "Patel", "Singh", "Khan", "Ahmed",
+    "Dubois", "Martin", "Bernard", "Jansen", "De Jong", "Novak", "Kovac", "Ivanov", "Tanaka", "Suzuki",
+    "Kim", "Park", "Mbappe", "Salah", "Modric", "Neuer", "Pogba", "Agüero",
+]
+CRICKET_TEAMS = [
+    "India", "Australia", "England", "Pakistan", "South Africa", "New Zealand", "Sri Lanka", "West Indies",
+    "Bangladesh", "Afghanistan", "Ireland", "Zimbabwe",
+]
+FOOTBALL_POSITIONS = ["GK", "CB", "LB", "RB", "CDM", "CM", "CAM", "LM", "RM", "LW", "RW", "ST", "CF"]
+CLUB_COUNT = 700
+NATION_COUNT = 160
+
+
+def _names(rng, rows: int):
+    first = rng.choice(FIRST_NAMES, rows)
+    last = rng.choice(LAST_NAMES, rows)
+    return first, last, np.char.add(np.char.add(first, " "), last)
+
+
+def synthetic_cricket(rows: int, start: int = 0, seed: int = 1) -> Dict[str, List]:
+    """Column -> values for ``rows`` cricket players numbered from ``start``"""
+    rng = np.random.default_rng(seed + start)
+    first, last, name = _names(rng, rows)
+    matches = rng.integers(1, 400, rows)
+    balls = rng.integers(0, 15_000, rows)
+    wickets = (balls * rng.uniform(0, 0.04, rows)).astype(int)
+    runs = (matches * rng.uniform(0, 45, rows)).astype(int)
+    return {
+        "Team": rng.choice(CRICKET_TEAMS, rows).tolist(),
+        "Format": rng.choice(["ODI", "T20I", "Test"], rows).tolist(),
+        "Gender": rng.choice(["Men", "Women"], rows).tolist(),
+        "No": np.arange(start, start + rows).tolist(),
+        "Name": name.tolist(),
+        "First": first.tolist(),
+        "Last": last.tolist(),
+        "Mat": matches.tolist(),
+        "Runs": runs.tolist(),
+        "HS": rng.integers(0, 250, rows).tolist(),
+        "Avg": np.round(rng.uniform(0, 60, rows), 2).tolist(),
+        "50": rng.integers(0, 60, rows).tolist(),
+        "100": rng.integers(0, 40, rows).tolist(),
+        "Balls": balls.tolist(),
+        "Wkt": wickets.tolist(),
+        "BBI": [f"{w}/{r}" for w, r in zip(rng.integers(0, 8, rows), rng.integers(5, 80, rows))],
+        "Ave": np.round(rng.uniform(15, 60, rows), 2).tolist(),
+        "5WI": rng.integers(0, 20, rows).tolist(),
+        "Ca": rng.integers(0, 200, rows).tolist(),
+        "St": rng.integers(0, 30, rows).tolist(),
+    }
+
+
+def synthetic_football(rows: int, start: int = 0, seed: int = 2) -> Dict[str, List]:
+    """Column -> values for ``rows`` football players numbered from ``start``"""
+    rng = np.random.default_rng(seed + start)
+    _, _, name = _names(rng, rows)
+    columns = {
+        "PlayerID": np.arange(start, start + rows).tolist(),
+        "Name": name.tolist(),
+        "Age": rng.integers(16, 41, rows).tolist(),
+        "Nationality": [f"Nation {i}" for i in rng.integers(0, NATION_COUNT, rows)],
+        "Overall": rng.integers(45, 95, rows).tolist(),
+        "Club": [f"Club {i}" for i in rng.integers(0, CLUB_COUNT, rows)],
+        "Value": [f"€{v:.1f}M" for v in rng.uniform(0.1, 120, rows)],
+        "Wage": [f"€{w}K" for w in rng.integers(1, 500, rows)],
+        "PreferredFoot": rng.choice(["Left", "Right"], rows, p=[0.25, 0.75]).tolist(),
+        "InternationalReputation": rng.integers(1, 6, rows).tolist(),
+        "WeakFoot": rng.integers(1, 6, rows).tolist(),
+        "SkillMoves": rng.integers(1, 6, rows).tolist(),
+        "Position": rng.choice(FOOTBALL_POSITIONS, rows).tolist(),
+        "JerseyNumber": rng.integers(1, 100, rows).tolist(),
+        "Height": [f"{f}'{i}" for f, i in zip(rng.integers(5, 7, rows), rng.integers(0, 12, rows))],
+        "Weight": [f"{w}lbs" for w in rng.integers(130, 220, rows)],
+    }
+    skills = np.clip(rng.normal(60, 15, (rows, len(FOOTBALL_COLUMNS) - len(columns))), 1, 99).astype(int)
+    for i, column in enumerate(FOOTBALL_COLUMNS[len(columns):]):
+        columns[column] = skills[:, i].tolist()
+    return columns
+
+
+GENERATORS = {
+    "cricket": (CRICKET_COLUMNS, synthetic_cricket),
+    "football": (FOOTBALL_COLUMNS, synthetic_football),
+}
+
+
+def seed(path: str, rows: Dict[str, int]) -> Dict[str, float]:
+    """(Re)create ``path`` with ``rows[sport]`` synthetic players per sport.
+
+    Returns the seconds spent seeding each table.
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    init_db(path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    timings = {}
+    try:
+        for sport, count in rows.items():
+            started = time.perf_counter()
+            columns, generate = GENERATORS[sport]
+            insert = f"INSERT INTO {table_name(sport)} VALUES ({', '.join(['?'] * len(columns))})"
+            for start in range(0, count, SEED_BATCH_ROWS):
+                data = generate(min(SEED_BATCH_ROWS, count - start), start)
+                conn.executemany(insert, zip(*(data[column] for column in columns)))
+            conn.commit()
+            timings[sport] = time.perf_counter() - started
+    finally:
+        conn.close()
+    return timings
+
+
+def install(path: str):
+    """Serve the API from the SQLite file at ``path``; call before importing app"""
+    os.environ["DB_BACKEND"] = "sqlite"
+    os.environ["SQLITE_DATABASE"] = path
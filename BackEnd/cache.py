@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(endpoint: str, **params) -> Tuple:
+    """Build a cache key from query parameters, ignoring unset ones and their order"""
+    return (endpoint,) + tuple(sorted((k, v) for k, v in params.items() if v is not None and v != ""))
+
+
+class QueryCache:
+    """TTL + size-bounded LRU cache for query results, grouped by table.
+
+    Concurrent misses for the same key share a single load (single-flight), and
+    invalidate(table) drops every entry of that table. A load that was already
+    running when its table was invalidated is returned to its callers but not
+    stored, so a write is never masked by a stale read.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, table, value)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._generations: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def generation(self, table: str) -> int:
+        return self._generations.get(table, 0)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, table: str, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, table, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(self, table: str, key, loader: Callable[[], Awaitable]):
+        """Return the cached value for ``key`` or load it once for all concurrent callers"""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        generation = self.generation(table)
+
+        async def load():
+            try:
+                result = await loader()
+                if self.generation(table) == generation:
+                    self.set(table, key, result)
+                return result
+            finally:
+                self._inflight.pop(key, None)
+
+        # The load runs as its own task so one caller going away does not
+        # cancel it for everyone else waiting on the same key
+        task = asyncio.ensure_future(load())
+        self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    def invalidate(self, table: str):
+        """Drop all cached results for ``table``"""
+        self._generations[table] = self.generation(table) + 1
+        stale = [key for key, (_, entry_table, _) in self._entries.items() if entry_table == table]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += 1
+        logger.info(f"Invalidated {len(stale)} cached {table} results")
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+player_cache = QueryCache(
+    max_entries=int(os.getenv("PLAYER_CACHE_MAX_ENTRIES", "256")),
+    ttl=float(os.getenv("PLAYER_CACHE_TTL", "60")),
+)
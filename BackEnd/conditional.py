@@ -0,0 +1,138 @@
+import asyncio
+import email.utils
+import hashlib
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi.responses import Response
+
+from encoding import VARY_HEADER
+from schema import TABLES
+from shared_cache import SharedCache, shared_cache
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))
+
+
+def variant_key(request, representation: str) -> str:
+    """Identify one representation of a resource: path, query parameters and negotiated format"""
+    query = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}#{representation}"
+
+
+def _opaque(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(_opaque(candidate) == _opaque(etag) for candidate in if_none_match.split(","))
+
+
+class TableVersions:
+    """Data version and last-modified time per table, for HTTP validators.
+
+    Versions are bumped whenever a table's data changes (inserts through the
+    API, or a snapshot refresh that found new rows). The epoch (process start
+    time) keeps ETags from a restarted or different worker from matching, so
+    a stale validator can only cost a full response, never a wrong 304.
+
+    With a shared cache (several workers, see server.py) the versions, times
+    and epoch are the shared per-table generations instead, so every worker
+    issues the same validators for the same data.
+
+    Versions only track changes that reach the snapshots. When reads go to
+    the warehouse instead (snapshots off), a write made outside the API
+    would leave the version unchanged, so no validators are issued at all
+    (``enabled`` False).
+    """
+
+    def __init__(self, tables: Iterable[str] = TABLES, shared: Optional[SharedCache] = None, enabled: bool = True):
+        self.shared = shared
+        self.enabled = enabled
+        self.epoch = shared.epoch if shared is not None else format(int(time.time() * 1000), "x")
+        now = time.time()
+        self._versions: Dict[str, int] = {table: 0 for table in tables}
+        self._modified: Dict[str, float] = {table: now for table in tables}
+        # Shared bumps still being written, per table (see bump)
+        self._bumping: Dict[str, int] = {}
+
+    def bump(self, table: str, rows: Optional[List[Dict]] = None):
+        """Note a change to ``table``; ``rows`` when it only added those rows
+        (passed on to the other workers, see SharedCache.bump)"""
+        if self.shared is not None:
+            # The shared file is written off the event loop; until that lands
+            # the version has not moved, so no 304 is answered for the table
+            self._bumping[table] = self._bumping.get(table, 0) + 1
+            written = asyncio.get_running_loop().run_in_executor(None, self.shared.bump, table, rows)
+            written.add_done_callback(lambda future: self._bumped(table, future))
+            return
+        self._versions[table] = self._versions.get(table, 0) + 1
+        # Last-Modified has one-second resolution: move to a later second so a
+        # second change within the same second is still visible to clients
+        self._modified[table] = max(time.time(), int(self._modified.get(table, 0)) + 1)
+
+    def _bumped(self, table: str, future):
+        self._bumping[table] -= 1
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Failed to record a change to {table} in the shared cache: {str(future.exception())}")
+
+    def version(self, table: str) -> int:
+        if self.shared is not None:
+            return self.shared.generation(table)
+        return self._versions.get(table, 0)
+
+    def last_modified(self, table: str) -> float:
+        if self.shared is not None:
+            return self.shared.modified(table)
+        return self._modified.get(table, 0.0)
+
+    def etag(self, table: str, variant: str) -> str:
+        digest = hashlib.blake2b(variant.encode("utf-8"), digest_size=6).hexdigest()
+        return f'W/"{self.epoch}-{self.version(table)}-{digest}"'
+
+    def headers(self, table: str, variant: str) -> Dict[str, str]:
+        return {
+            "ETag": self.etag(table, variant),
+            "Last-Modified": email.utils.formatdate(self.last_modified(table), usegmt=True),
+            "Cache-Control": f"public, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate",
+        }
+
+    def check(self, request, table: str, variant: str) -> Tuple[Optional[Response], Dict[str, str]]:
+        """Validate a conditional GET before doing any work.
+
+        Returns (a 304 response if the client's copy is current else None,
+        the validator headers to send with a full response; none when
+        disabled). Read the headers before loading the data, so a write racing
+        the load can only make the ETag older than the body, never newer.
+        """
+        if not self.enabled:
+            return None, {}
+        headers = self.headers(table, variant)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since
+            fresh = _etag_matches(if_none_match, headers["ETag"])
+        else:
+            fresh = self._not_modified_since(request.headers.get("if-modified-since"), table)
+        if fresh and not self._bumping.get(table):
+            return Response(status_code=304, headers={**headers, "Vary": VARY_HEADER}), headers
+        return None, headers
+
+    def _not_modified_since(self, if_modified_since: Optional[str], table: str) -> bool:
+        if not if_modified_since:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(self.last_modified(table)) <= since
+
+
+table_versions = TableVersions(shared=shared_cache)
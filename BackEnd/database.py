@@ -1,43 +1,159 @@
+import logging
+import os
 import sqlite3
 
-def get_db():
-    conn = sqlite3.connect('predictsquad.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def init_db():
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS cricket_players (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            role TEXT NOT NULL,
-            batting_avg REAL,
-            bowling_avg REAL,
-            strike_rate REAL,
-            economy_rate REAL,
-            fitness_score INTEGER,
-            form_score INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS football_players (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            position TEXT NOT NULL,
-            goals INTEGER,
-            assists INTEGER,
-            tackles INTEGER,
-            interceptions INTEGER,
-            fitness_score INTEGER,
-            form_score INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+from schema import COLUMN_FIELDS, TABLES, quote_column
+
+logger = logging.getLogger(__name__)
+
+SQLITE_DATABASE = os.getenv("SQLITE_DATABASE", "predictsquad.db")
+# Prepared statements kept per connection, keyed by SQL text; query_builder
+# keeps the number of distinct statements small enough to stay in it
+STATEMENT_CACHE_SIZE = int(os.getenv("SQLITE_STATEMENT_CACHE_SIZE", "256"))
+
+# Column types of the embedded tables; columns not listed are INTEGER
+TEXT_COLUMNS = {
+    "cricket": {"Team", "Format", "Gender", "Name", "First", "Last", "BBI"},
+    "football": {"Name", "Nationality", "Club", "Value", "Wage", "PreferredFoot", "Position", "Height", "Weight"},
+}
+REAL_COLUMNS = {
+    "cricket": {"Avg", "Ave"},
+    "football": set(),
+}
+
+# Columns the API filters or looks players up by
+INDEXED_COLUMNS = {
+    "cricket": ["No", "Team", "Format", "Gender"],
+    "football": ["PlayerID", "Club", "Nationality", "Position", "Overall"],
+}
+
+
+def table_name(sport: str) -> str:
+    """SQLite name of the sport's table (the last part of DATABASE.SCHEMA.TABLE)"""
+    return TABLES[sport].rsplit(".", 1)[-1]
+
+
+def translate(query: str) -> str:
+    """Rewrite a warehouse query for SQLite: qualified table names and %s placeholders"""
+    for sport, table in TABLES.items():
+        query = query.replace(table, table_name(sport))
+    return query.replace("%s", "?")
+
+
+class HashAgg:
+    """SQLite stand-in for the warehouse's HASH_AGG(expr, ...): an
+    order-independent hash of the aggregated rows. Used to detect changes
+    only; values are stable within a process, not across processes."""
+
+    def __init__(self):
+        self.value = 0
+
+    def step(self, *values):
+        self.value = (self.value + hash(values)) & 0xFFFFFFFFFFFFFFFF
+
+    def finalize(self):
+        # SQLite integers are signed 64-bit
+        return self.value - (1 << 64) if self.value >= 1 << 63 else self.value
+
+
+def _column_type(sport: str, column: str) -> str:
+    if column in TEXT_COLUMNS[sport]:
+        return "TEXT"
+    return "REAL" if column in REAL_COLUMNS[sport] else "INTEGER"
+
+
+class SQLiteCursor:
+    """Cursor accepting the warehouse's SQL (see translate)"""
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, query: str, params=None):
+        self._cursor.execute(translate(query), tuple(params or ()))
+        return self
+
+    def executemany(self, query: str, params):
+        self._cursor.executemany(translate(query), [tuple(p) for p in params])
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size: int = 1):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """SQLite connection in WAL mode with the parts of the Snowflake connector the API uses.
+
+    Runs in autocommit mode: single writes commit immediately and bulk
+    inserts open their own transaction with BEGIN.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE
         )
-    ''')
-    
-    conn.commit()
-    conn.close()    
\ No newline at end of file
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.create_aggregate("HASH_AGG", -1, HashAgg)
+        self._closed = False
+
+    def cursor(self) -> SQLiteCursor:
+        return SQLiteCursor(self._conn.cursor())
+
+    def commit(self):
+        if self._conn.in_transaction:
+            self._conn.commit()
+
+    def rollback(self):
+        if self._conn.in_transaction:
+            self._conn.rollback()
+
+    def interrupt(self):
+        """Abort the statement running on this connection (safe from any thread)"""
+        self._conn.interrupt()
+
+    def close(self):
+        self._closed = True
+        self._conn.close()
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+
+def get_db(path: str = SQLITE_DATABASE) -> SQLiteConnection:
+    return SQLiteConnection(path)
+
+
+def init_db(path: str = SQLITE_DATABASE):
+    """Create the player tables (same columns as the warehouse) and their indexes if missing"""
+    conn = get_db(path)
+    try:
+        cursor = conn.cursor()
+        for sport in TABLES:
+            table = table_name(sport)
+            columns = ", ".join(f"{quote_column(c)} {_column_type(sport, c)}" for c in COLUMN_FIELDS[sport])
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+            for column in INDEXED_COLUMNS[sport]:
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table}_{column.lower()} ON {table} ({quote_column(column)})"
+                )
+        conn.commit()
+    finally:
+        conn.close()
+    logger.info(f"SQLite player tables ready in {path}")
@@ -1,17 +1,76 @@
-import snowflake.connector
 from dotenv import load_dotenv
 import os
+import logging
+import threading
 
+# Before the project imports: backends and database read their settings
+# when they are imported
 load_dotenv()
 
-def get_snowflake_connection():
-    return snowflake.connector.connect(
-        user=os.getenv("SNOWFLAKE_USER"),
-        password=os.getenv("SNOWFLAKE_PASSWORD"),
-        account=os.getenv("SNOWFLAKE_ACCOUNT"),
-        warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
-        database=os.getenv("SNOWFLAKE_DATABASE1"),
-        database2=os.getenv("SNOWFLAKE_DATABASE2"),
-        schema=os.getenv("SNOWFLAKE_SCHEMA"),
-        role=os.getenv("SNOWFLAKE_ROLE")
-    )
\ No newline at end of file
+from backends import create_backend
+from metrics import timed
+from pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Storage engine chosen by DB_BACKEND (snowflake or sqlite)
+backend = create_backend()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def create_connection():
+    """Open a new, unpooled connection to the configured backend"""
+    return backend.connect()
+
+def _ping(conn):
+    return backend.ping(conn)
+
+def open_pool():
+    """Create the shared connection pool from SNOWFLAKE_POOL_* settings (used for every backend)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            pool = ConnectionPool(
+                create_connection,
+                min_size=int(os.getenv("SNOWFLAKE_POOL_MIN_SIZE", "1")),
+                max_size=int(os.getenv("SNOWFLAKE_POOL_MAX_SIZE", "10")),
+                idle_timeout=float(os.getenv("SNOWFLAKE_POOL_IDLE_TIMEOUT", "300")),
+                acquire_timeout=float(os.getenv("SNOWFLAKE_POOL_ACQUIRE_TIMEOUT", "30")),
+                health_check=_ping,
+                health_check_after=float(os.getenv("SNOWFLAKE_POOL_HEALTH_CHECK_AFTER", "30")),
+            )
+            pool.open()
+            _pool = pool
+        return _pool
+
+def close_pool():
+    """Drain and close the shared connection pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+def pool_open() -> bool:
+    return _pool is not None
+
+def pool_metrics() -> dict:
+    """Metrics of the shared pool, or {} while it is not open (never opens it)"""
+    pool = _pool
+    return pool.metrics() if pool is not None else {}
+
+def get_pool():
+    return _pool if _pool is not None else open_pool()
+
+def cancel_running_queries(conn):
+    """Abort whatever the session behind ``conn`` is currently executing"""
+    backend.cancel(conn)
+
+def get_connection():
+    """Borrow a pooled connection; close() returns it to the pool"""
+    with timed("connect"):
+        return get_pool().acquire()
+
+# main.py's Snowflake connectivity check predates the backend setting
+get_snowflake_connection = get_connection
@@ -0,0 +1,142 @@
+import logging
+import threading
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+from query_builder import player_ids
+from schema import ID_COLUMNS, TABLES
+
+logger = logging.getLogger(__name__)
+
+
+class PlayerDirectory:
+    """Maps every player ID to the sports whose table holds it.
+
+    /predict resolves IDs here with one dict lookup each and then reads only
+    the table they belong to, instead of probing the cricket table and then
+    the football one. The directory is filled at startup from the snapshots
+    (or the tables' ID columns) and extended on every insert through the API.
+
+    Once a sport is complete, an ID it does not list is taken not to be in
+    its table, with no query: inserts through the API add() their IDs, and
+    snapshot reloads (or, with snapshots off, periodic reloads of the ID
+    column) pick up rows written outside it. A write whose IDs are not known
+    here (e.g. reported by another worker without its rows) must
+    invalidate() the sport; until it is complete again, callers probe the
+    table for unknown IDs and add() what they find.
+    """
+
+    def __init__(self, sports: Sequence[str] = tuple(TABLES)):
+        self.sports = tuple(sports)
+        self._ids: Dict[int, Tuple[str, ...]] = {}
+        # One shared tuple per combination of sports, in self.sports order
+        self._memberships: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self._complete = set()
+        # IDs added while a full listing of the sport is being read (see listing)
+        self._listing: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def complete(self, sport: str) -> bool:
+        """True once every ID of ``sport``'s table has been added"""
+        return sport in self._complete
+
+    def invalidate(self, sport: str):
+        """Rows of ``sport`` may have been written without their IDs being added"""
+        with self._lock:
+            self._complete.discard(sport)
+
+    def _membership(self, current: Tuple[str, ...], sport: str) -> Tuple[str, ...]:
+        key = tuple(name for name in self.sports if name in current or name == sport)
+        return self._memberships.setdefault(key, key)
+
+    def _without(self, current: Tuple[str, ...], sport: str) -> Tuple[str, ...]:
+        key = tuple(name for name in current if name != sport)
+        return self._memberships.setdefault(key, key)
+
+    def listing(self, sport: str):
+        """Call before reading every ID of ``sport``'s table for add(complete=True): IDs
+        added meanwhile are kept even if the listing was read before they were written"""
+        with self._lock:
+            self._listing.setdefault(sport, set())
+
+    def add(self, sport: str, ids: Iterable, complete: bool = False):
+        """Record that ``sport``'s table holds ``ids``; ``complete`` if they are all of
+        its IDs, in which case IDs no longer in the table stop being listed under it"""
+        with self._lock:
+            entries = self._ids
+            added = self._listing.get(sport)
+            if complete:
+                ids = list(ids) + list(self._listing.pop(sport, ()))
+                added = None
+                # Built aside and swapped in, so locate() never sees it half done
+                entries = {}
+                for key, current in self._ids.items():
+                    if sport in current:
+                        current = self._without(current, sport)
+                        if not current:
+                            continue
+                    entries[key] = current
+            for value in ids:
+                if value is None:
+                    continue
+                key = int(value)
+                if added is not None:
+                    added.add(key)
+                current = entries.get(key, ())
+                if sport not in current:
+                    entries[key] = self._membership(current, sport)
+            if complete:
+                self._ids = entries
+                self._complete.add(sport)
+
+    def add_snapshot(self, snapshot):
+        """Add every ID of a loaded snapshot"""
+        self.listing(snapshot.sport)
+        state = snapshot.state
+        column = state.frame[state.column(ID_COLUMNS[snapshot.sport])]
+        self.add(snapshot.sport, column.dropna().tolist(), complete=True)
+
+    def load(self, conn, sport: str):
+        """Add every ID of ``sport``'s table, read from the warehouse"""
+        self.listing(sport)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(player_ids(sport).sql)
+            ids = [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+        self.add(sport, ids, complete=True)
+        logger.info(f"Loaded {len(ids)} {sport} player IDs into the directory")
+
+    def locate(self, ids: Iterable[int]) -> Tuple[Dict[str, List[int]], List[int]]:
+        """Split distinct ``ids`` by sport, in first-seen order.
+
+        Returns ({sport: ids in that sport's table}, ids not in the directory).
+        An ID held by both tables is listed under both.
+        """
+        found = {sport: [] for sport in self.sports}
+        unknown = []
+        entries = self._ids
+        for player_id in dict.fromkeys(ids):
+            sports = entries.get(player_id)
+            if sports is None:
+                unknown.append(player_id)
+                continue
+            for sport in sports:
+                found[sport].append(player_id)
+        self.hits += sum(len(ids) for ids in found.values())
+        self.misses += len(unknown)
+        return found, unknown
+
+    def stats(self) -> Dict:
+        return {
+            "ids": len(self._ids),
+            "complete": {sport: sport in self._complete for sport in self.sports},
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+directory = PlayerDirectory()
@@ -0,0 +1,188 @@
+import gzip
+import importlib.util
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from metrics import timed
+from streaming import json_default
+
+logger = logging.getLogger(__name__)
+
+JSON_MEDIA_TYPE = "application/json"
+COLUMNAR_MEDIA_TYPE = "application/vnd.sportsanalytics.columnar+json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+FORMATS = {
+    "json": JSON_MEDIA_TYPE,
+    "columnar": COLUMNAR_MEDIA_TYPE,
+    "msgpack": MSGPACK_MEDIA_TYPE,
+    "arrow": ARROW_MEDIA_TYPE,
+}
+# Media types clients may send in Accept, by format
+ACCEPTED_MEDIA_TYPES = {
+    JSON_MEDIA_TYPE: "json",
+    COLUMNAR_MEDIA_TYPE: "columnar",
+    MSGPACK_MEDIA_TYPE: "msgpack",
+    "application/x-msgpack": "msgpack",
+    ARROW_MEDIA_TYPE: "arrow",
+    "application/vnd.apache.arrow.file": "arrow",
+}
+# Optional packages each format needs
+FORMAT_DEPENDENCIES = {
+    "msgpack": "msgpack",
+    "arrow": "pyarrow",
+}
+
+COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+# Larger responses are encoded (by row count) and compressed (by body size) in a
+# worker thread, so a big msgpack/Arrow body or brotli pass does not stall the event loop
+OFFLOAD_MIN_ROWS = int(os.getenv("RESPONSE_OFFLOAD_MIN_ROWS", "1000"))
+OFFLOAD_MIN_BYTES = int(os.getenv("RESPONSE_OFFLOAD_MIN_BYTES", "262144"))
+
+# Request headers that select the representation
+VARY_HEADER = "Accept, Accept-Encoding"
+
+
+class UnsupportedFormat(ValueError):
+    """Raised when the requested response format is unknown or not installed"""
+
+
+def available(fmt: str) -> bool:
+    dependency = FORMAT_DEPENDENCIES.get(fmt)
+    return dependency is None or importlib.util.find_spec(dependency) is not None
+
+
+def _accepted(header: str) -> List[Tuple[str, float]]:
+    """Parse an Accept / Accept-Encoding header into (value, q) pairs, best first"""
+    accepted = []
+    for position, part in enumerate(header.split(",")):
+        value, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, number = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        if value:
+            accepted.append((value.strip().lower(), quality, position))
+    accepted.sort(key=lambda item: (-item[1], item[2]))
+    return [(value, quality) for value, quality, _ in accepted if quality > 0]
+
+
+def negotiate(request, fmt: Optional[str] = None) -> str:
+    """Pick the response format from ``fmt`` (a query parameter) or the Accept header.
+
+    Defaults to JSON, which is also used when the Accept header names no
+    format we serve (e.g. */* or text/html).
+    """
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in FORMATS:
+            raise UnsupportedFormat(f"Unknown response format {fmt!r}; use one of {', '.join(FORMATS)}")
+        if not available(fmt):
+            raise UnsupportedFormat(f"{fmt} responses need the {FORMAT_DEPENDENCIES[fmt]} package")
+        return fmt
+    for media_type, _ in _accepted(request.headers.get("accept", "")):
+        candidate = ACCEPTED_MEDIA_TYPES.get(media_type)
+        if candidate and available(candidate):
+            return candidate
+    return "json"
+
+
+def columnar(rows: List[Dict]) -> Tuple[List[str], List[List]]:
+    """Column names (from the first row) and one value list per column"""
+    if not rows:
+        return [], []
+    columns = list(rows[0])
+    return columns, [[row.get(column) for row in rows] for column in columns]
+
+
+def _msgpack_default(value):
+    # Same conversions as JSON (DECIMAL -> float, dates -> ISO strings)
+    return json_default(value)
+
+
+def encode(fmt: str, envelope: Dict, rows: List[Dict]) -> bytes:
+    """Serialize ``envelope`` (status, count, cursor...) plus ``rows`` in ``fmt``.
+
+    json keeps the existing list-of-objects layout; columnar and msgpack send
+    {"columns": [...], "data": [[column values], ...]} so names appear once;
+    arrow sends an IPC stream of the rows with the envelope as schema metadata.
+    """
+    if fmt == "json":
+        return json.dumps({**envelope, "data": rows}, default=json_default, separators=(",", ":")).encode("utf-8")
+
+    columns, values = columnar(rows)
+    if fmt == "columnar":
+        body = {**envelope, "columns": columns, "data": values}
+        return json.dumps(body, default=json_default, separators=(",", ":")).encode("utf-8")
+    if fmt == "msgpack":
+        import msgpack
+        return msgpack.packb({**envelope, "columns": columns, "data": values}, default=_msgpack_default)
+    if fmt == "arrow":
+        import pyarrow as pa
+        table = pa.table({column: pa.array(column_values) for column, column_values in zip(columns, values)})
+        table = table.replace_schema_metadata({"envelope": json.dumps(envelope, default=json_default)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    raise UnsupportedFormat(f"Unknown response format {fmt!r}")
+
+
+def compress(body: bytes, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+    """Compress with brotli or gzip if the client accepts it and the body is worth it"""
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    for coding, _ in _accepted(accept_encoding):
+        if coding == "br" and importlib.util.find_spec("brotli") is not None:
+            import brotli
+            return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+        if coding in ("gzip", "x-gzip"):
+            return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+    return body, None
+
+
+def _render(fmt: str, envelope: Dict, rows: List[Dict]) -> bytes:
+    with timed("render"):
+        return encode(fmt, envelope, rows)
+
+
+def _compress(body: bytes, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+    with timed("compress"):
+        return compress(body, accept_encoding)
+
+
+async def encoded_response(request, fmt: str, envelope: Dict, rows: List[Dict], headers: Optional[Dict] = None) -> Response:
+    """Encoded (and possibly compressed) response, skipping response-model validation"""
+    if len(rows) >= OFFLOAD_MIN_ROWS:
+        body = await run_in_threadpool(_render, fmt, envelope, rows)
+    else:
+        body = _render(fmt, envelope, rows)
+    accept_encoding = request.headers.get("accept-encoding", "")
+    if len(body) >= OFFLOAD_MIN_BYTES:
+        body, coding = await run_in_threadpool(_compress, body, accept_encoding)
+    else:
+        body, coding = _compress(body, accept_encoding)
+    headers = {**(headers or {}), "Vary": VARY_HEADER}
+    if coding:
+        headers["Content-Encoding"] = coding
+    return Response(content=body, media_type=FORMATS[fmt], headers=headers)
+
+
+class TimedJSONResponse(JSONResponse):
+    """Default JSON response that records its serialization as the render stage"""
+
+    def render(self, content) -> bytes:
+        with timed("render"):
+            return super().render(content)
@@ -0,0 +1,204 @@
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import db
+from metrics import bound_thread, observe_stage
+
+logger = logging.getLogger(__name__)
+
+
+class QueryTimeoutError(Exception):
+    """Raised when a query does not finish within its timeout"""
+
+
+class QueryCancelledError(Exception):
+    """Raised when the client disconnected before the query finished"""
+
+
+class ExecutorBusyError(Exception):
+    """Raised when too many queries are already running or queued"""
+
+
+class _QueryHandle:
+    """Tracks the connection a queued query runs on so it can be cancelled.
+
+    The worker detach()es the connection under the same lock before giving it
+    back to the pool, and the cancel is issued under that lock only while the
+    connection is still attached, so it can never hit a query another request
+    runs on the same connection afterwards.
+    """
+
+    def __init__(self):
+        self.conn = None
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def attach(self, conn) -> bool:
+        with self._lock:
+            if self.cancelled:
+                return False
+            self.conn = conn
+            return True
+
+    def detach(self):
+        """The query is done with its connection: no cancel may be issued on it any more"""
+        with self._lock:
+            self.conn = None
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            conn = self.conn
+        if conn is not None:
+            # The worker thread is blocked inside cursor.execute on this
+            # connection, so the cancel has to be issued from another thread
+            threading.Thread(target=self._cancel, args=(conn,), daemon=True).start()
+
+    def _cancel(self, conn):
+        with self._lock:
+            # Released by the worker since: the connection may be running someone else's query
+            if self.conn is not conn:
+                return
+            db.cancel_running_queries(conn)
+
+
+class QueryExecutor:
+    """Bounded thread pool that runs blocking database work off the event loop.
+
+    At most ``max_workers`` queries run at once and at most ``max_queue`` more
+    wait for a worker; anything beyond that is rejected with ExecutorBusyError
+    instead of piling up. Each query borrows a pooled connection for its
+    duration and is cancelled on timeout or client disconnect.
+    """
+
+    def __init__(self, max_workers: int = 10, max_queue: int = 100, default_timeout: float = 30.0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self._executor = None
+        self._pending = 0
+        self._completed = 0
+        self._timeouts = 0
+        self._cancelled = 0
+        self._rejected = 0
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db-query")
+            logger.info(f"Query executor started (workers={self.max_workers}, queue={self.max_queue})")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            logger.info("Query executor shut down")
+
+    def _call(self, handle: _QueryHandle, fn: Callable, args):
+        if handle.cancelled:
+            raise QueryCancelledError("Query cancelled before it started")
+        conn = db.get_connection()
+        try:
+            if not handle.attach(conn):
+                raise QueryCancelledError("Query cancelled before it started")
+            return fn(conn, *args)
+        finally:
+            handle.detach()
+            conn.close()
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, request=None):
+        """Run ``fn(conn, *args)`` on a worker thread with a pooled connection.
+
+        If ``request`` is given the query is cancelled as soon as the client
+        disconnects.
+        """
+        handle = _QueryHandle()
+        return await self._submit(self._call, (handle, fn, args), handle, timeout, request)
+
+    async def call(self, fn: Callable, *args, timeout: Optional[float] = None):
+        """Run a blocking ``fn(*args)`` that manages its own connection on a worker thread"""
+        return await self._submit(fn, args, None, timeout, None)
+
+    async def _submit(self, target: Callable, args, handle: Optional[_QueryHandle], timeout, request):
+        if self._executor is None:
+            self.start()
+        if self._pending >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            raise ExecutorBusyError(f"{self._pending} queries already running or queued")
+
+        timeout = self.default_timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        try:
+            # Run in a copy of the request's context so stage timings and the
+            # profiler attribute the worker thread's time to the request
+            context = contextvars.copy_context()
+            future = loop.run_in_executor(self._executor, context.run, _start, time.perf_counter(), target, args)
+            waiters = {future}
+            watcher = None
+            if request is not None:
+                watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+                waiters.add(watcher)
+            try:
+                done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                if watcher is not None:
+                    watcher.cancel()
+
+            if future in done:
+                self._completed += 1
+                return future.result()
+
+            if handle is not None:
+                handle.cancel()
+            future.add_done_callback(_discard_abandoned)
+            if watcher is not None and watcher in done:
+                self._cancelled += 1
+                raise QueryCancelledError("Client disconnected, query cancelled")
+            self._timeouts += 1
+            raise QueryTimeoutError(f"Query exceeded {timeout:.1f}s timeout")
+        finally:
+            self._pending -= 1
+
+    def metrics(self):
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self._completed,
+            "timeouts": self._timeouts,
+            "cancelled": self._cancelled,
+            "rejected": self._rejected,
+        }
+
+
+def _start(submitted: float, target: Callable, args):
+    observe_stage("queue", time.perf_counter() - submitted)
+    with bound_thread():
+        return target(*args)
+
+
+def _discard_abandoned(future):
+    """Swallow the error of an abandoned job, or release what it returned late"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    close = getattr(future.result(), "close", None)
+    if close is not None:
+        close()
+
+
+async def _wait_for_disconnect(request, interval: float = 0.1):
+    while not await request.is_disconnected():
+        await asyncio.sleep(interval)
+
+
+query_executor = QueryExecutor(
+    max_workers=int(os.getenv("DB_EXECUTOR_MAX_WORKERS", os.getenv("SNOWFLAKE_POOL_MAX_SIZE", "10"))),
+    max_queue=int(os.getenv("DB_EXECUTOR_MAX_QUEUE", "100")),
+    default_timeout=float(os.getenv("DB_QUERY_TIMEOUT", "30")),
+)
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import logging
+from typing import Dict, List, Optional, Sequence
+
+from lazy import np, pd
+from schema import find_column, row_value
+
+logger = logging.getLogger(__name__)
+
+CRICKET_RAW = ["Mat", "Runs", "HS", "Avg", "50", "100", "Balls", "Wkt", "Ave", "5WI", "Ca", "St"]
+FOOTBALL_SKILLS = [
+    "Crossing", "Finishing", "HeadingAccuracy", "ShortPassing", "Volleys", "Dribbling", "Curve",
+    "FKAccuracy", "LongPassing", "BallControl", "Acceleration", "SprintSpeed", "Agility", "Reactions",
+    "Balance", "ShotPower", "Jumping", "Stamina", "Strength", "LongShots", "Aggression", "Interceptions",
+    "Positioning", "Vision", "Penalties", "Composure", "Marking", "StandingTackle", "SlidingTackle",
+    "GKDiving", "GKHandling", "GKKicking", "GKPositioning", "GKReflexes",
+]
+FOOTBALL_RAW = ["Overall", "Age", "InternationalReputation", "WeakFoot", "SkillMoves"] + FOOTBALL_SKILLS
+
+RAW_FEATURES = {
+    "cricket": CRICKET_RAW,
+    "football": FOOTBALL_RAW,
+}
+
+# Skill composites: the mean of each group of football attributes
+FOOTBALL_COMPOSITES = {
+    "attack": ["Finishing", "ShotPower", "LongShots", "Positioning", "Volleys", "Penalties"],
+    "playmaking": ["ShortPassing", "LongPassing", "Vision", "BallControl", "Dribbling", "Crossing", "Curve"],
+    "defence": ["Marking", "StandingTackle", "SlidingTackle", "Interceptions", "HeadingAccuracy", "Aggression"],
+    "physical": ["Acceleration", "SprintSpeed", "Stamina", "Strength", "Jumping", "Agility", "Balance"],
+    "goalkeeping": ["GKDiving", "GKHandling", "GKKicking", "GKPositioning", "GKReflexes"],
+}
+# Which composite measures how well a player fits their listed position
+POSITION_COMPOSITE = {
+    "GK": "goalkeeping",
+    "CB": "defence", "LCB": "defence", "RCB": "defence", "LB": "defence", "RB": "defence",
+    "LWB": "defence", "RWB": "defence", "CDM": "defence", "LDM": "defence", "RDM": "defence",
+    "CM": "playmaking", "LCM": "playmaking", "RCM": "playmaking", "CAM": "playmaking",
+    "LAM": "playmaking", "RAM": "playmaking", "LM": "playmaking", "RM": "playmaking",
+    "LW": "attack", "RW": "attack", "ST": "attack", "LS": "attack", "RS": "attack",
+    "CF": "attack", "LF": "attack", "RF": "attack",
+}
+
+DERIVED_FEATURES = {
+    "cricket": [
+        "runs_per_match", "strike_rate", "bowling_strike_rate", "wickets_per_match",
+        "conversion_rate", "dismissals_per_match",
+    ],
+    "football": list(FOOTBALL_COMPOSITES) + ["position_fit"],
+}
+
+FEATURES = {sport: RAW_FEATURES[sport] + DERIVED_FEATURES[sport] for sport in RAW_FEATURES}
+
+# Table columns the predictor reads: the player ID, Name (for key players),
+# the raw features and, for football, the Position that position_fit uses
+MODEL_COLUMNS = {
+    "cricket": ["No", "Name"] + CRICKET_RAW,
+    "football": ["PlayerID", "Name", "Position"] + FOOTBALL_RAW,
+}
+
+# Column players are grouped by for team aggregates
+GROUP_COLUMNS = {
+    "cricket": "Team",
+    "football": "Club",
+}
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    return np.divide(numerator * scale, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+def raw_matrix(sport: str, rows: Sequence[Dict]) -> np.ndarray:
+    """(players x raw features) float32 matrix from result rows; NULLs become 0"""
+    columns = RAW_FEATURES[sport]
+    matrix = np.zeros((len(rows), len(columns)), dtype=np.float32)
+    for i, row in enumerate(rows):
+        for j, column in enumerate(columns):
+            value = row_value(row, column)
+            if value is not None:
+                try:
+                    matrix[i, j] = float(value)
+                except (TypeError, ValueError):
+                    pass
+    return matrix
+
+
+def frame_raw_matrix(sport: str, frame: pd.DataFrame) -> np.ndarray:
+    """Vectorized raw_matrix for a whole snapshot frame"""
+    by_upper = {column.upper(): column for column in frame.columns}
+    columns = []
+    for column in RAW_FEATURES[sport]:
+        name = by_upper.get(column.upper())
+        if name is None:
+            columns.append(np.zeros(len(frame), dtype=np.float32))
+        else:
+            columns.append(pd.to_numeric(frame[name], errors="coerce").fillna(0).to_numpy(dtype=np.float32))
+    if not columns:
+        return np.zeros((len(frame), 0), dtype=np.float32)
+    return np.column_stack(columns).astype(np.float32, copy=False)
+
+
+def derive(sport: str, raw: np.ndarray, positions: Optional[Sequence] = None) -> np.ndarray:
+    """Derived features for a raw feature matrix (rows aligned with ``positions`` for football)"""
+    col = {name: raw[:, i] for i, name in enumerate(RAW_FEATURES[sport])}
+    if sport == "cricket":
+        derived = [
+            _ratio(col["Runs"], col["Mat"]),
+            _ratio(col["Runs"], col["Balls"], 100.0),
+            _ratio(col["Balls"], col["Wkt"]),
+            _ratio(col["Wkt"], col["Mat"]),
+            _ratio(col["100"], col["50"] + col["100"], 100.0),
+            _ratio(col["Ca"] + col["St"], col["Mat"]),
+        ]
+        return np.column_stack(derived).astype(np.float32)
+
+    composites = {
+        name: np.mean(np.column_stack([col[skill] for skill in skills]), axis=1)
+        for name, skills in FOOTBALL_COMPOSITES.items()
+    }
+    fit = np.zeros(len(raw), dtype=np.float32)
+    if positions is not None:
+        for i, position in enumerate(positions):
+            composite = POSITION_COMPOSITE.get(str(position).upper()) if position is not None else None
+            if composite is not None:
+                fit[i] = composites[composite][i]
+    derived = [composites[name] for name in FOOTBALL_COMPOSITES] + [fit]
+    return np.column_stack(derived).astype(np.float32)
+
+
+def feature_matrix(sport: str, rows: Sequence[Dict]) -> np.ndarray:
+    """Full (raw + derived) feature matrix for result rows"""
+    raw = raw_matrix(sport, rows)
+    positions = [row_value(row, "Position") for row in rows] if sport == "football" else None
+    return np.hstack([raw, derive(sport, raw, positions)])
+
+
+class FeatureStore:
+    """Precomputed per-player features and per-team aggregates for one sport.
+
+    Rows are aligned with the snapshot frame they were built from (row i of
+    ``matrix`` is row i of the frame). Team aggregates are kept as running
+    sums and counts so inserts update them without a rebuild.
+    """
+
+    def __init__(self, sport: str, frame: pd.DataFrame):
+        self.sport = sport
+        self.names = FEATURES[sport]
+        raw = frame_raw_matrix(sport, frame)
+        group_column = find_column(frame.columns, GROUP_COLUMNS[sport])
+        position_column = find_column(frame.columns, "Position")
+        positions = frame[position_column].tolist() if sport == "football" and position_column else None
+
+        self._matrix = np.hstack([raw, derive(sport, raw, positions)])
+        self._size = len(frame)
+        self.groups: List = frame[group_column].tolist() if group_column else [None] * len(frame)
+
+        self._group_sums: Dict[object, np.ndarray] = {}
+        self._group_counts: Dict[object, int] = {}
+        if self._size:
+            codes, uniques = pd.factorize(pd.Series(self.groups, dtype=object), use_na_sentinel=True)
+            valid = codes >= 0
+            sums = np.zeros((len(uniques), len(self.names)), dtype=np.float64)
+            np.add.at(sums, codes[valid], self._matrix[valid])
+            counts = np.bincount(codes[valid], minlength=len(uniques))
+            for code, group in enumerate(uniques):
+                self._group_sums[group] = sums[code]
+                self._group_counts[group] = int(counts[code])
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix[:self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, rows: Sequence[Dict]):
+        """Featurize newly inserted rows and fold them into the team aggregates"""
+        if not rows:
+            return
+        new = feature_matrix(self.sport, rows)
+        needed = self._size + len(new)
+        if needed > len(self._matrix):
+            # Grow geometrically so repeated single inserts stay amortized O(1)
+            grown = np.zeros((max(needed, 2 * len(self._matrix)), len(self.names)), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+        self._matrix[self._size:needed] = new
+        self._size = needed
+        for row, vector in zip(rows, new):
+            group = row_value(row, GROUP_COLUMNS[self.sport])
+            self.groups.append(group)
+            if group is None:
+                continue
+            self._group_sums[group] = self._group_sums.get(group, np.zeros(len(self.names))) + vector
+            self._group_counts[group] = self._group_counts.get(group, 0) + 1
+
+    def team_aggregates(self, features: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Mean of each feature per team/club, largest squads first"""
+        names = list(features) if features else self.names
+        columns = [self.names.index(name) for name in names]
+        teams = []
+        for group, count in sorted(self._group_counts.items(), key=lambda item: (-item[1], str(item[0]))):
+            means = self._group_sums[group][columns] / count
+            teams.append({
+                GROUP_COLUMNS[self.sport].lower(): group,
+                "players": count,
+                "features": {name: round(float(value), 4) for name, value in zip(names, means)},
+            })
+        return teams
+
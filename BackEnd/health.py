@@ -0,0 +1,65 @@
+import logging
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Whether a worker is warm enough to take traffic (/readyz).
+
+    The worker is ready once its warm-up (connection pool, models, data
+    libraries, snapshots, player directory) calls warmed(), not when a probe
+    happens to find every part up. Each check reports whether its part is
+    warm, for /readyz. Readiness is latched: the worker stays ready until
+    stop() at shutdown, so a snapshot reload or a pool reconnect does not
+    pull it out of the load balancer.
+    """
+
+    def __init__(self):
+        self._checks: Dict[str, Callable[[], bool]] = {}
+        self.started = time.time()
+        self.ready_at: Optional[float] = None
+        self.stopping = False
+
+    def add(self, name: str, check: Callable[[], bool]):
+        self._checks[name] = check
+
+    def start(self):
+        """Start timing a (re)start of the worker"""
+        self.started = time.time()
+        self.ready_at = None
+        self.stopping = False
+
+    def warmed(self):
+        """Called when the warm-up is done: report ready from now on"""
+        if self.ready_at is None:
+            self.ready_at = time.time()
+            logger.info(f"Ready to serve after {self.ready_at - self.started:.2f}s")
+
+    def stop(self):
+        """Report not ready from now on, so traffic drains away before shutdown"""
+        self.stopping = True
+
+    def status(self) -> Tuple[bool, Dict[str, bool]]:
+        """(ready, {check: passed})"""
+        checks = {}
+        for name, check in self._checks.items():
+            try:
+                checks[name] = bool(check())
+            except Exception as e:
+                logger.warning(f"Readiness check {name} failed: {str(e)}")
+                checks[name] = False
+        return self.ready_at is not None and not self.stopping, checks
+
+    def stats(self) -> Dict:
+        ready, _ = self.status()
+        return {
+            "ready": int(ready),
+            # Time from startup until the warm-up was done
+            "startup_seconds": round(self.ready_at - self.started, 3) if self.ready_at is not None else None,
+            "uptime_seconds": round(time.time() - self.started, 3),
+        }
+
+
+readiness = Readiness()
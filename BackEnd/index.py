@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import functools
+import logging
+import math
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from lazy import np, pd
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def _empty() -> np.ndarray:
+    # Built on first use: numpy is imported lazily
+    return np.empty(0, dtype=np.int64)
+
+
+def _as_key(values: np.ndarray, bound, rounding):
+    """Convert a search bound to the array's dtype so searchsorted does not
+    upcast (and copy) the whole array; fractional bounds on integer columns
+    are rounded inwards"""
+    if np.issubdtype(values.dtype, np.integer):
+        info = np.iinfo(values.dtype)
+        return values.dtype.type(min(max(rounding(bound), info.min), info.max))
+    if np.issubdtype(values.dtype, np.floating):
+        return values.dtype.type(bound)
+    return bound
+
+
+def intersect(small: np.ndarray, large: np.ndarray) -> np.ndarray:
+    """Intersect two sorted, duplicate-free position arrays.
+
+    Probes the larger array with binary search for each element of the
+    smaller one, so the cost is O(len(small) * log(len(large))) rather than
+    proportional to the larger list.
+    """
+    if len(small) > len(large):
+        small, large = large, small
+    if not len(small) or not len(large):
+        return _empty()
+    at = np.searchsorted(large, small)
+    at[at == len(large)] = len(large) - 1
+    return small[large[at] == small]
+
+
+class HashIndex:
+    """Maps each distinct value of a column to the sorted row positions holding it"""
+
+    def __init__(self, values: pd.Series):
+        self.postings: Dict[object, np.ndarray] = {
+            key: positions.astype(np.int64)
+            for key, positions in values.groupby(values, sort=False).indices.items()
+        }
+
+    def lookup(self, value) -> np.ndarray:
+        posting = self.postings.get(value)
+        return posting if posting is not None else _empty()
+
+    def add(self, value, position: int):
+        # New rows are appended at the end, so posting lists stay sorted
+        self.postings[value] = np.append(self.postings.get(value, _empty()), position)
+
+
+class SortedIndex:
+    """Row positions ordered by a numeric column, for range lookups by binary search"""
+
+    def __init__(self, values: pd.Series):
+        # NULLs never satisfy a range filter, same as in SQL, so they are left out:
+        # argsort would put NaN last, inside every range open at the top
+        present = values.notna().to_numpy()
+        raw = values.to_numpy()[present]
+        order = np.argsort(raw, kind="stable")
+        self.order = np.flatnonzero(present).astype(np.int64)[order]
+        self.sorted_values = raw[order]
+
+    def _bounds(self, low, high) -> Tuple[int, int]:
+        values = self.sorted_values
+        start = 0 if low is None else np.searchsorted(values, _as_key(values, low, math.ceil), side="left")
+        stop = len(values) if high is None else np.searchsorted(values, _as_key(values, high, math.floor), side="right")
+        return start, stop
+
+    def range(self, low=None, high=None) -> np.ndarray:
+        """Sorted positions of rows with low <= value <= high (None = unbounded)"""
+        start, stop = self._bounds(low, high)
+        return np.sort(self.order[start:stop])
+
+    def lookup(self, values: Sequence) -> np.ndarray:
+        """Sorted positions of rows whose value is one of ``values``"""
+        keys = np.unique(np.asarray(values))
+        if np.issubdtype(self.sorted_values.dtype, np.integer) and np.issubdtype(keys.dtype, np.integer):
+            # Keys the column cannot hold match nothing; the rest are cast so
+            # searchsorted does not upcast the whole array
+            info = np.iinfo(self.sorted_values.dtype)
+            keys = keys[(keys >= info.min) & (keys <= info.max)].astype(self.sorted_values.dtype)
+        starts = np.searchsorted(self.sorted_values, keys, side="left")
+        stops = np.searchsorted(self.sorted_values, keys, side="right")
+        runs = [self.order[start:stop] for start, stop in zip(starts, stops) if stop > start]
+        return np.sort(np.concatenate(runs)) if runs else _empty()
+
+    def count(self, low=None, high=None) -> int:
+        start, stop = self._bounds(low, high)
+        return int(max(stop - start, 0))
+
+    def add(self, value, position: int):
+        if pd.isna(value):
+            return
+        dtype = np.result_type(self.sorted_values.dtype, np.min_scalar_type(value))
+        if dtype != self.sorted_values.dtype:
+            # The column was downcast on load and the new value does not fit
+            self.sorted_values = self.sorted_values.astype(dtype)
+        at = np.searchsorted(self.sorted_values, value, side="right")
+        self.sorted_values = np.insert(self.sorted_values, at, value)
+        self.order = np.insert(self.order, at, position)
+
+
+class TableIndex:
+    """Secondary indexes over a player DataFrame.
+
+    Equality filters are answered from hash indexes and range filters from a
+    sorted index. Combined filters start from the smallest candidate set and
+    narrow it, so a query costs O(matches) instead of a scan over every row.
+    """
+
+    def __init__(self, frame: pd.DataFrame, hash_columns: Iterable[str] = (), sorted_columns: Iterable[str] = ()):
+        self.frame = frame
+        self.hash = {column: HashIndex(frame[column]) for column in hash_columns if column in frame.columns}
+        self.sorted = {column: SortedIndex(frame[column]) for column in sorted_columns if column in frame.columns}
+
+    def covers(self, equals: Dict, ranges: Dict) -> bool:
+        return all(column in self.hash for column in equals) and all(column in self.sorted for column in ranges)
+
+    def lookup(self, equals: Dict, ranges: Optional[Dict[str, Tuple]] = None) -> Optional[np.ndarray]:
+        """Sorted row positions matching every filter, or None to mean all rows"""
+        ranges = {column: bounds for column, bounds in (ranges or {}).items() if bounds != (None, None)}
+        postings = sorted(
+            (self.hash[column].lookup(value) for column, value in equals.items()),
+            key=len,
+        )
+        if postings:
+            candidates = postings[0]
+            for posting in postings[1:]:
+                if not len(candidates):
+                    break
+                candidates = intersect(candidates, posting)
+            # Checking the few candidates' values beats materializing a wide range
+            for column, (low, high) in ranges.items():
+                values = self.frame[column].to_numpy()[candidates]
+                keep = np.ones(len(candidates), dtype=bool)
+                if low is not None:
+                    keep &= values >= low
+                if high is not None:
+                    keep &= values <= high
+                candidates = candidates[keep]
+            return candidates
+
+        if not ranges:
+            return None
+        columns = sorted(ranges, key=lambda column: self.sorted[column].count(*ranges[column]))
+        candidates = self.sorted[columns[0]].range(*ranges[columns[0]])
+        for column in columns[1:]:
+            candidates = intersect(candidates, self.sorted[column].range(*ranges[column]))
+        return candidates
+
+    def add(self, row: Dict, position: int):
+        """Index a row appended at ``position``"""
+        for column, index in self.hash.items():
+            index.add(row.get(column), position)
+        for column, index in self.sorted.items():
+            index.add(row.get(column), position)
+
+
+def linear_scan(frame: pd.DataFrame, equals: Dict, ranges: Optional[Dict[str, Tuple]] = None) -> np.ndarray:
+    """Reference full-scan filter, used as the fallback and benchmark baseline"""
+    mask = np.ones(len(frame), dtype=bool)
+    for column, value in equals.items():
+        mask &= (frame[column] == value).to_numpy()
+    for column, (low, high) in (ranges or {}).items():
+        values = frame[column].to_numpy()
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+    return np.flatnonzero(mask)
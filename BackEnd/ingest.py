@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+import logging
+import os
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from metrics import timed
+from schema import COLUMN_FIELDS, insert_params, insert_statement, player_row
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "50000"))
+# Bulk inserts are not cancelled when the client leaves and get longer than a query
+BULK_INSERT_TIMEOUT = float(os.getenv("BULK_INSERT_TIMEOUT", "600"))
+
+
+class BulkPayloadError(ValueError):
+    """Raised when a bulk upload cannot be parsed at all"""
+
+
+def parse_payload(body: bytes, content_type: str) -> List[Dict]:
+    """Parse a JSON array, NDJSON or CSV upload into raw row dicts"""
+    media_type = (content_type or "application/json").split(";")[0].strip().lower()
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise BulkPayloadError("Upload must be UTF-8 encoded")
+
+    if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        rows = []
+        for line_number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as e:
+                raise BulkPayloadError(f"Invalid JSON on line {line_number}: {str(e)}")
+        return rows
+
+    if media_type in ("text/csv", "application/csv"):
+        reader = csv.DictReader(io.StringIO(text))
+        # Empty cells become missing fields so validation reports them clearly
+        return [{k: v for k, v in row.items() if k is not None and v != ""} for row in reader]
+
+    if media_type == "application/json":
+        try:
+            rows = json.loads(text)
+        except ValueError as e:
+            raise BulkPayloadError(f"Invalid JSON: {str(e)}")
+        if not isinstance(rows, list):
+            raise BulkPayloadError("JSON upload must be an array of player objects")
+        return rows
+
+    raise BulkPayloadError(
+        f"Unsupported content type {media_type!r}; use application/json, application/x-ndjson or text/csv"
+    )
+
+
+def validate_rows(sport: str, model: Type[BaseModel], raw_rows: List) -> Tuple[List[Tuple[int, Dict]], List[Dict]]:
+    """Validate raw rows against ``model``.
+
+    Returns ([(row index, {table column: value})], [per-row errors]). Table
+    column names (e.g. 50, 5WI) are accepted as aliases of the model fields.
+    """
+    aliases = {column: field for column, field in COLUMN_FIELDS[sport].items() if column != field}
+    valid, errors = [], []
+    for index, raw in enumerate(raw_rows):
+        if not isinstance(raw, dict):
+            errors.append({"row": index, "error": "Row must be an object"})
+            continue
+        data = {aliases.get(key, key): value for key, value in raw.items()}
+        try:
+            player = model(**data)
+        except ValidationError as e:
+            errors.append({
+                "row": index,
+                "error": "; ".join(
+                    f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+                ),
+            })
+            continue
+        valid.append((index, player_row(sport, player)))
+    return valid, errors
+
+
+def insert_rows(
+    conn,
+    sport: str,
+    rows: List[Tuple[int, Dict]],
+    batch_size: int = BULK_BATCH_SIZE,
+    on_commit: Optional[Callable[[List[Dict]], None]] = None,
+) -> Tuple[List[Dict], List[Dict]]:
+    """Insert validated rows with executemany, one transaction per batch.
+
+    A failing batch is rolled back and reported against each of its rows;
+    the remaining batches are still attempted. ``on_commit`` is called with
+    the rows of each committed batch as soon as it commits, so they are
+    published even if the caller stops waiting for the rest. Returns
+    (inserted rows, errors).
+    """
+    query = insert_statement(sport)
+    inserted, errors = [], []
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            try:
+                with timed("execute"):
+                    cursor.execute("BEGIN")
+                    cursor.executemany(query, [insert_params(sport, row) for _, row in batch])
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Bulk {sport} insert batch at row {batch[0][0]} failed: {str(e)}")
+                errors.extend({"row": index, "error": f"Batch rolled back: {str(e)}"} for index, _ in batch)
+                continue
+            committed = [row for _, row in batch]
+            inserted.extend(committed)
+            if on_commit is not None:
+                on_commit(committed)
+    finally:
+        cursor.close()
+    return inserted, errors
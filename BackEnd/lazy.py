@@ -0,0 +1,42 @@
+import importlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Imported on first use, or by load() during warm-up
+DATA_LIBRARIES = ("numpy", "pandas")
+
+
+class LazyModule:
+    """Stands in for a module that is imported on first attribute access.
+
+    numpy and pandas take longer to import than the rest of the app, and a
+    worker needs neither to start or answer /healthz. Modules bind ``np`` and
+    ``pd`` to these instead, with ``from __future__ import annotations`` so
+    type hints do not touch them. Attributes are cached on the stand-in, so
+    after the first access a lookup costs about as much as on the module.
+    """
+
+    def __init__(self, name: str):
+        self._lazy_name = name
+
+    def __getattr__(self, attr: str):
+        value = getattr(importlib.import_module(self._lazy_name), attr)
+        setattr(self, attr, value)
+        return value
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._lazy_name!r}>"
+
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+
+def load():
+    """Import the deferred libraries; blocking, so warm-up runs it on the executor"""
+    started = time.perf_counter()
+    for name in DATA_LIBRARIES:
+        importlib.import_module(name)
+    logger.info(f"Imported {', '.join(DATA_LIBRARIES)} in {time.perf_counter() - started:.2f}s")
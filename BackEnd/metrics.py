@@ -0,0 +1,262 @@
+import contextvars
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from profiler import profiler
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "sportsanalytics"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+BYTE_BUCKETS = (256, 1_024, 4_096, 16_384, 65_536, 262_144, 1_048_576, 4_194_304, 16_777_216)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, as Prometheus expects"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.labels = tuple(labels)
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][slot] += 1
+            series[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics exposed on /metrics in the Prometheus text format.
+
+    Besides histograms, ``collect(prefix, fn)`` registers a
+    callback returning a dict of numbers (e.g. pool.metrics()) that is read
+    at scrape time and exposed as gauges.
+    """
+
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Tuple[str, Callable[[], Dict]]] = []
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float], labels: Sequence[str] = ()) -> Histogram:
+        metric = Histogram(f"{NAMESPACE}_{name}", help, buckets, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def collect(self, prefix: str, fn: Callable[[], Dict]):
+        self._collectors.append((f"{NAMESPACE}_{prefix}", fn))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for prefix, fn in self._collectors:
+            try:
+                values = fn()
+            except Exception as e:
+                logger.warning(f"Metrics collector {prefix} failed: {str(e)}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Time from request received to response sent",
+    LATENCY_BUCKETS, ("method", "route", "status"),
+)
+RESPONSE_BYTES = registry.histogram(
+    "http_response_size_bytes", "Response body bytes sent (after compression)",
+    BYTE_BUCKETS, ("method", "route"),
+)
+STAGE_SECONDS = registry.histogram(
+    "stage_duration_seconds",
+    "Time spent per request stage: queue, connect, execute, fetch, build, snapshot, predict, render, compress",
+    LATENCY_BUCKETS, ("stage",),
+)
+ROWS_RETURNED = registry.histogram(
+    "db_rows_returned", "Rows fetched per warehouse query", ROW_BUCKETS,
+)
+
+
+class RequestTimings:
+    """Per-request stage totals, shared with the executor threads working for the request"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.rows = 0
+        self.profile = None
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_rows(self, count: int):
+        with self._lock:
+            self.rows += count
+
+    def server_timing(self, total: float) -> str:
+        """Server-Timing header value (durations in milliseconds)"""
+        with self._lock:
+            stages = list(self.stages.items())
+        parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in stages]
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar("request_timings", default=None)
+
+
+def current() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+def begin_request() -> Tuple[RequestTimings, contextvars.Token]:
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token: contextvars.Token):
+    _current.reset(token)
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def timed(stage: str):
+    """Record the time spent in the block under ``stage``, for the histogram and the current request"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def record_rows(count: int):
+    ROWS_RETURNED.observe(count)
+    timings = _current.get()
+    if timings is not None:
+        timings.add_rows(count)
+
+
+@contextmanager
+def bound_thread():
+    """Mark the calling (executor) thread as working for the current request, so the
+    sampling profiler attributes its stacks to that request"""
+    timings = _current.get()
+    profile = timings.profile if timings is not None else None
+    if profile is None:
+        yield
+        return
+    thread_id = threading.get_ident()
+    profile.threads.add(thread_id)
+    try:
+        yield
+    finally:
+        profile.threads.discard(thread_id)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency, response size and per-stage
+    timings, and adding a Server-Timing header with the stage breakdown.
+
+    Routes are labelled by their path template (/football/players/{player_id})
+    so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings, token = begin_request()
+        timings.profile = profiler.begin(f"{scope['method']} {scope['path']}")
+        status = 500
+        sent = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing(time.perf_counter() - started).encode("latin-1")))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(elapsed, method=scope["method"], route=route, status=status)
+            RESPONSE_BYTES.observe(sent, method=scope["method"], route=route)
+            profiler.end(timings.profile, elapsed)
+            end_request(token)
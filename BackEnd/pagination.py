@@ -0,0 +1,115 @@
+import base64
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from streaming import json_default
+
+# Columns that make a row's position in the ordering unique; appended to every
+# sort as tie-breakers so pages never overlap or skip rows.
+CRICKET_KEY = ["Team", "Format", "Gender", "No", "Name"]
+FOOTBALL_KEY = ["PlayerID"]
+
+CRICKET_SORT_COLUMNS = {
+    "Team", "Format", "Gender", "No", "Name", "Last", "Mat", "Runs", "HS", "Avg",
+    "Balls", "Wkt", "Ave", "Ca", "St",
+}
+FOOTBALL_SORT_COLUMNS = {
+    "PlayerID", "Name", "Age", "Nationality", "Overall", "Club", "Position",
+    "JerseyNumber", "InternationalReputation", "WeakFoot", "SkillMoves",
+}
+
+SORTS = {
+    "cricket": (CRICKET_SORT_COLUMNS, CRICKET_KEY),
+    "football": (FOOTBALL_SORT_COLUMNS, FOOTBALL_KEY),
+}
+
+
+class InvalidPageRequest(ValueError):
+    """Raised for an unknown sort column or a malformed/mismatched cursor"""
+
+
+def resolve_sort(sport: str, sort: Optional[str], order: str = "asc") -> List[Tuple[str, bool]]:
+    """Return the full ordering as (column, descending) pairs, tie-breakers included"""
+    allowed, key = SORTS[sport]
+    if order not in ("asc", "desc"):
+        raise InvalidPageRequest(f"order must be 'asc' or 'desc', got {order!r}")
+    by_name = {column.lower(): column for column in allowed}
+    ordering = []
+    if sort:
+        column = by_name.get(sort.lower())
+        if column is None:
+            raise InvalidPageRequest(f"Cannot sort by {sort!r}; allowed: {', '.join(sorted(allowed))}")
+        ordering.append((column, order == "desc"))
+    for column in key:
+        if column not in [c for c, _ in ordering]:
+            # Tie-breakers follow the requested direction when there is no explicit sort
+            ordering.append((column, order == "desc" and not sort))
+    return ordering
+
+
+def order_by_clause(ordering: Sequence[Tuple[str, bool]]) -> str:
+    # NULLs sort last in either direction, as in the snapshots (pandas' default)
+    return " ORDER BY " + ", ".join(f"{column} {'DESC' if desc else 'ASC'} NULLS LAST" for column, desc in ordering)
+
+
+def keyset_clause(ordering: Sequence[Tuple[str, bool]], values: Sequence) -> Tuple[str, List]:
+    """Build the predicate selecting rows strictly after ``values`` in ``ordering``.
+
+    Expands the row comparison into (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ...
+    so mixed sort directions work. NULLs sort last: a NULL value matches
+    with IS NULL and has nothing after it in its column, and every NULL
+    comes after a non-NULL value. The clause's text depends on which values
+    are NULL, the params on the other values.
+    """
+    branches, params = [], []
+    for i, (column, desc) in enumerate(ordering):
+        value = values[i]
+        if value is None:
+            continue
+        terms, branch_params = [], []
+        for (prev_column, _), prev_value in zip(ordering[:i], values[:i]):
+            if prev_value is None:
+                terms.append(f"{prev_column} IS NULL")
+            else:
+                terms.append(f"{prev_column} = %s")
+                branch_params.append(prev_value)
+        terms.append(f"({column} {'<' if desc else '>'} %s OR {column} IS NULL)")
+        branch_params.append(value)
+        branches.append("(" + " AND ".join(terms) + ")")
+        params.extend(branch_params)
+    # Every key NULL: the cursor is at the very end
+    return " AND (" + (" OR ".join(branches) or "1=0") + ")", params
+
+
+def _signature(ordering: Sequence[Tuple[str, bool]]) -> str:
+    return ",".join(f"{column}{'-' if desc else '+'}" for column, desc in ordering)
+
+
+def encode_cursor(ordering: Sequence[Tuple[str, bool]], row: Dict) -> str:
+    """Opaque token pointing just past ``row`` in ``ordering``"""
+    # Warehouse column names may come back upper-cased
+    by_upper = {name.upper(): value for name, value in row.items()}
+    values = [by_upper.get(column.upper()) for column, _ in ordering]
+    payload = json.dumps({"s": _signature(ordering), "v": values}, default=json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(ordering: Sequence[Tuple[str, bool]], cursor: str) -> List:
+    """Return the key values stored in ``cursor``, checking it matches ``ordering``"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        signature, values = payload["s"], payload["v"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidPageRequest("Malformed cursor")
+    if signature != _signature(ordering) or len(values) != len(ordering):
+        raise InvalidPageRequest("Cursor does not match the requested sort order")
+    return values
+
+
+def split_page(rows: List[Dict], ordering, page_size: int) -> Tuple[List[Dict], Optional[str]]:
+    """Trim the look-ahead row and return (page, next_cursor)"""
+    if len(rows) <= page_size:
+        return rows, None
+    page = rows[:page_size]
+    return page, encode_cursor(ordering, page[-1])
@@ -0,0 +1,272 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be borrowed within the acquire timeout"""
+
+
+class PoolClosedError(Exception):
+    """Raised when borrowing from a pool that has been closed"""
+
+
+class ConnectionReleasedError(Exception):
+    """Raised when a pooled connection is used after it was given back to the pool"""
+
+
+class PooledConnection:
+    """Proxy around a raw connection that returns it to the pool on close().
+
+    Once closed (or discarded) the proxy refuses any further use: by then the
+    raw connection may be lent to another borrower.
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    @property
+    def released(self) -> bool:
+        return self._released
+
+    @property
+    def raw(self):
+        if self._released:
+            raise ConnectionReleasedError("Connection was returned to the pool")
+        return self._raw
+
+    def close(self):
+        """Give the connection back to the pool instead of closing it"""
+        if not self._released:
+            self._released = True
+            self._pool.release(self._raw)
+
+    def discard(self):
+        """Close the underlying connection and drop it from the pool"""
+        if not self._released:
+            self._released = True
+            self._pool.release(self._raw, discard=True)
+
+    def __getattr__(self, name):
+        if self._released:
+            raise ConnectionReleasedError(f"Connection was returned to the pool (accessing {name})")
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe bounded pool of database connections.
+
+    Connections are created lazily by ``factory`` up to ``max_size``; ``min_size``
+    connections are opened eagerly by open() and kept warm. Idle connections
+    older than ``idle_timeout`` seconds are closed (down to ``min_size``), and
+    a connection that sat idle longer than ``health_check_after`` seconds is
+    checked with ``health_check`` before being handed out.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], object],
+        min_size: int = 1,
+        max_size: int = 10,
+        idle_timeout: float = 300.0,
+        acquire_timeout: float = 30.0,
+        health_check: Optional[Callable[[object], bool]] = None,
+        health_check_after: float = 30.0,
+    ):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self._factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self._health_check = health_check
+        self.health_check_after = health_check_after
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (raw connection, returned_at)
+        self._size = 0
+        self._closed = False
+
+        self._borrowed = 0
+        self._waiting = 0
+        self._total_borrows = 0
+        self._total_created = 0
+        self._total_discarded = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+
+    def open(self):
+        """Eagerly create min_size connections"""
+        with self._lock:
+            missing = max(self.min_size - self._size, 0)
+        for _ in range(missing):
+            # Reserve one slot per connection, so a failed create gives back only its own
+            with self._lock:
+                if self._size >= self.min_size:
+                    break
+                self._size += 1
+            try:
+                raw = self._create()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                    self._lock.notify()
+                raise
+            with self._lock:
+                self._idle.append((raw, time.monotonic()))
+                self._lock.notify()
+        logger.info(f"Connection pool opened (min={self.min_size}, max={self.max_size})")
+
+    def _create(self):
+        raw = self._factory()
+        with self._lock:
+            self._total_created += 1
+        return raw
+
+    def _close_raw(self, raw):
+        try:
+            raw.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled connection: {str(e)}")
+
+    def _is_healthy(self, raw, idle_for: float) -> bool:
+        if getattr(raw, "is_closed", None) and raw.is_closed():
+            return False
+        if self._health_check is None or idle_for < self.health_check_after:
+            return True
+        try:
+            return bool(self._health_check(raw))
+        except Exception as e:
+            logger.warning(f"Pooled connection failed health check: {str(e)}")
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Borrow a connection, waiting up to ``timeout`` seconds for one to free up"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            raw = None
+            idle_for = 0.0
+            create = False
+            with self._lock:
+                self._waiting += 1
+                try:
+                    while True:
+                        if self._closed:
+                            raise PoolClosedError("Connection pool is closed")
+                        if self._idle:
+                            raw, returned_at = self._idle.pop()
+                            idle_for = time.monotonic() - returned_at
+                            break
+                        if self._size < self.max_size:
+                            self._size += 1
+                            create = True
+                            break
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            raise PoolTimeoutError(
+                                f"Timed out after {timeout:.1f}s waiting for a pooled connection"
+                            )
+                        self._lock.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            if create:
+                try:
+                    raw = self._create()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+            elif not self._is_healthy(raw, idle_for):
+                self._drop(raw)
+                continue
+
+            waited = time.monotonic() - started
+            with self._lock:
+                self._borrowed += 1
+                self._total_borrows += 1
+                self._total_wait_time += waited
+                self._max_wait_time = max(self._max_wait_time, waited)
+            return PooledConnection(self, raw)
+
+    def _drop(self, raw):
+        self._close_raw(raw)
+        with self._lock:
+            self._size -= 1
+            self._total_discarded += 1
+            self._lock.notify()
+
+    def release(self, raw, discard: bool = False):
+        """Return a borrowed connection; closed or discarded ones free their slot"""
+        with self._lock:
+            self._borrowed -= 1
+            closed = self._closed
+        if discard or closed or (getattr(raw, "is_closed", None) and raw.is_closed()):
+            self._drop(raw)
+            return
+        with self._lock:
+            self._idle.append((raw, time.monotonic()))
+            self._lock.notify()
+        self.prune_idle()
+
+    def prune_idle(self):
+        """Close connections idle longer than idle_timeout, keeping min_size alive"""
+        expired = []
+        now = time.monotonic()
+        with self._lock:
+            # Oldest idle connections sit at the left end of the deque
+            while self._idle and self._size - len(expired) > self.min_size:
+                raw, returned_at = self._idle[0]
+                if now - returned_at < self.idle_timeout:
+                    break
+                self._idle.popleft()
+                expired.append(raw)
+        for raw in expired:
+            self._drop(raw)
+
+    def close(self):
+        """Close all idle connections; borrowed ones are closed when released"""
+        with self._lock:
+            self._closed = True
+            idle = [raw for raw, _ in self._idle]
+            self._idle.clear()
+            self._lock.notify_all()
+        for raw in idle:
+            self._drop(raw)
+        logger.info("Connection pool closed")
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                "size": self._size,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "borrowed": self._borrowed,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "total_borrows": self._total_borrows,
+                "total_created": self._total_created,
+                "total_discarded": self._total_discarded,
+                "acquire_timeouts": self._timeouts,
+                "avg_wait_ms": (self._total_wait_time / self._total_borrows * 1000) if self._total_borrows else 0.0,
+                "max_wait_ms": self._max_wait_time * 1000,
+            }
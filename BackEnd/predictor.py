@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Sequence
+
+from features import FEATURES, feature_matrix
+from lazy import np
+from schema import row_value
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.getenv("PREDICTION_MODEL_DIR", "models")
+LATENCY_BUDGET_MS = float(os.getenv("PREDICTION_LATENCY_BUDGET_MS", "10"))
+
+
+class BaselineModel:
+    """Linear stand-in used when no trained model file is present.
+
+    Scores each player with a single weighted feature, matching the original
+    heuristics (Runs x 0.8 for cricket, Overall x 0.9 for football).
+    """
+
+    def __init__(self, sport: str):
+        features = FEATURES[sport]
+        self.weights = np.zeros(len(features), dtype=np.float32)
+        if sport == "cricket":
+            self.weights[features.index("Runs")] = 0.8
+        else:
+            self.weights[features.index("Overall")] = 0.9
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return X @ self.weights
+
+
+class Predictor:
+    """Scores players and squads with one model per sport.
+
+    Models are loaded once from ``{MODEL_DIR}/{sport}.joblib``: any estimator
+    with a scikit-learn style ``predict(X)`` (e.g. an sklearn pipeline or an
+    XGBRegressor) trained on the features.FEATURES columns (raw columns then
+    derived features), in order, and returning a
+    per-player score on a 0-100 scale. A squad's win probability is the mean
+    of its players' scores, capped at 100.
+    """
+
+    def __init__(self, model_dir: str = MODEL_DIR):
+        self.model_dir = model_dir
+        self.models: Dict[str, object] = {}
+        self.sources: Dict[str, str] = {}
+
+    def load(self):
+        for sport in FEATURES:
+            path = os.path.join(self.model_dir, f"{sport}.joblib")
+            if os.path.exists(path):
+                try:
+                    import joblib
+                    self.models[sport] = joblib.load(path)
+                    self.sources[sport] = path
+                    logger.info(f"Loaded {sport} prediction model from {path}")
+                    continue
+                except Exception as e:
+                    logger.error(f"Failed to load {sport} model from {path}, using baseline: {str(e)}")
+            self.models[sport] = BaselineModel(sport)
+            self.sources[sport] = "baseline"
+
+    @property
+    def loaded(self) -> bool:
+        """True once every sport has a model (trained or baseline)"""
+        return all(sport in self.models for sport in FEATURES)
+
+    def model(self, sport: str):
+        if sport not in self.models:
+            self.load()
+        return self.models[sport]
+
+    def score_players(self, sport: str, X: np.ndarray) -> np.ndarray:
+        """Per-player scores for a feature matrix, in one model call"""
+        if len(X) == 0:
+            return np.zeros(0, dtype=np.float32)
+        return np.asarray(self.model(sport).predict(X), dtype=np.float32).reshape(-1)
+
+    def predict(self, sport: str, players: List[Dict], X: Optional[np.ndarray] = None) -> Dict:
+        """Prediction payload for a single squad; ``X`` is the squad's precomputed feature rows, if known"""
+        started = time.perf_counter()
+        if X is None:
+            X = feature_matrix(sport, players)
+        scores = self.score_players(sport, X)
+        result = self._summarize(sport, players, X, scores)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > LATENCY_BUDGET_MS:
+            logger.warning(f"{sport} prediction for {len(players)} players took {elapsed_ms:.1f}ms")
+        return result
+
+    def predict_many(
+        self,
+        sport: str,
+        players: List[Dict],
+        squads: Sequence[Sequence[int]],
+        X: Optional[np.ndarray] = None,
+    ) -> List[Dict]:
+        """Prediction payloads for many squads drawn from one pool of players.
+
+        ``players`` holds each distinct player once and ``squads`` lists, per
+        squad, indexes into it; every player is featurized and scored once
+        (a single model call) however many squads include them.
+        """
+        started = time.perf_counter()
+        if X is None:
+            X = feature_matrix(sport, players)
+        scores = self.score_players(sport, X)
+        results = self._summarize_many(sport, players, X, scores, squads)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Scored {len(squads)} {sport} squads ({len(players)} distinct players) in {elapsed_ms:.1f}ms")
+        return results
+
+    def _summarize_many(
+        self, sport: str, players: List[Dict], X: np.ndarray, scores: np.ndarray, squads: Sequence[Sequence[int]]
+    ) -> List[Dict]:
+        """_summarize for every squad at once: squads are concatenated and reduced segment-wise"""
+        features = FEATURES[sport]
+        headline = "Runs" if sport == "cricket" else "Overall"
+        sizes = np.fromiter((len(squad) for squad in squads), dtype=np.int64, count=len(squads))
+        idx = np.fromiter((i for squad in squads for i in squad), dtype=np.int64, count=int(sizes.sum()))
+        starts = np.cumsum(sizes) - sizes
+        nonempty = sizes > 0
+        values = X[idx, features.index(headline)].astype(np.float64)
+        squad_scores = scores[idx]
+        averages = np.zeros(len(sizes))
+        means = np.zeros(len(sizes))
+        if nonempty.any():
+            averages[nonempty] = np.add.reduceat(values, starts[nonempty]) / sizes[nonempty]
+            means[nonempty] = np.add.reduceat(squad_scores.astype(np.float64), starts[nonempty]) / sizes[nonempty]
+        # Within each squad, highest score first; lexsort is stable, so ties keep squad order
+        segment = np.repeat(np.arange(len(sizes)), sizes)
+        order = np.lexsort((-squad_scores, segment))
+        rank = np.arange(len(idx)) - np.repeat(starts, sizes)
+        names = [row_value(player, "Name") for player in players]
+        key_players = [[] for _ in sizes]
+        for position in order[rank < 3]:
+            key_players[segment[position]].append(names[idx[position]])
+        source = self.sources.get(sport, "baseline")
+        return [
+            {
+                "average_score" if sport == "cricket" else "average_rating": float(average),
+                "win_probability": min(100.0, float(mean)) if size else 0.0,
+                "key_players": key,
+                "model": source,
+            }
+            for average, mean, size, key in zip(averages, means, sizes, key_players)
+        ]
+
+    def _summarize(self, sport: str, players: List[Dict], X: np.ndarray, scores: np.ndarray) -> Dict:
+        features = FEATURES[sport]
+        headline = "Runs" if sport == "cricket" else "Overall"
+        average = float(X[:, features.index(headline)].astype(np.float64).mean()) if len(X) else 0.0
+        key = np.argsort(-scores, kind="stable")[:3]
+        return {
+            "average_score" if sport == "cricket" else "average_rating": average,
+            "win_probability": min(100.0, float(scores.mean())) if len(scores) else 0.0,
+            "key_players": [row_value(players[i], "Name") for i in key],
+            "model": self.sources.get(sport, "baseline"),
+        }
+
+
+predictor = Predictor()
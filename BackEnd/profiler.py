@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SLOW_REQUEST_MS = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "0"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+PROFILE_MAX_DUMPS = int(os.getenv("PROFILE_MAX_DUMPS", "100"))
+
+_UNSAFE = re.compile(r"[^0-9A-Za-z_.-]+")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame) -> List[str]:
+    """Frame labels from the outermost call to ``frame``"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class RequestProfile:
+    """Stack samples collected while one request was in flight"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.task = asyncio.current_task()
+        # Executor threads currently working for this request
+        self.threads: Set[int] = set()
+        self.samples: Counter = Counter()
+
+
+class SamplingProfiler:
+    """Opt-in wall-clock sampling profiler for slow requests.
+
+    While profiled requests are in flight a background thread samples, every
+    ``interval_ms``, the stack of the event loop thread (when it is running
+    the request's task) and of the executor threads bound to the request.
+    Requests slower than ``threshold_ms`` have their samples written to
+    ``directory`` in the folded-stack format read by flamegraph.pl and
+    speedscope; faster requests are discarded. Disabled when
+    ``threshold_ms`` is 0.
+    """
+
+    def __init__(self, threshold_ms: float = 0, interval_ms: float = 5, directory: str = "profiles", max_dumps: int = 100):
+        self.threshold_ms = threshold_ms
+        self.interval = interval_ms / 1000
+        self.directory = directory
+        self.max_dumps = max_dumps
+        self.dumps = 0
+        self._active: Dict[int, RequestProfile] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def begin(self, label: str) -> Optional[RequestProfile]:
+        """Start sampling the calling request's task; None when profiling is off"""
+        if not self.enabled:
+            return None
+        profile = RequestProfile(label)
+        with self._lock:
+            self._active[id(profile)] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+        return profile
+
+    def end(self, profile: Optional[RequestProfile], elapsed: float) -> Optional[str]:
+        """Stop sampling; dump the samples if the request was slow. Returns the dump path"""
+        if profile is None:
+            return None
+        with self._lock:
+            self._active.pop(id(profile), None)
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms < self.threshold_ms or not profile.samples or self.dumps >= self.max_dumps:
+            return None
+        self.dumps += 1
+        path = os.path.join(
+            self.directory,
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{_UNSAFE.sub('_', profile.label).strip('_')}-{elapsed_ms:.0f}ms.folded",
+        )
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, "w") as f:
+                for stack, count in profile.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            logger.warning(f"Could not write profile {path}: {str(e)}")
+            return None
+        logger.warning(f"Slow request {profile.label} took {elapsed_ms:.0f}ms; profile written to {path}")
+        return path
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._active:
+                    self._wake.wait()
+            time.sleep(self.interval)
+            self._sample()
+
+    def _sample(self):
+        frames = sys._current_frames()
+        with self._lock:
+            profiles = list(self._active.values())
+        for profile in profiles:
+            frame = frames.get(profile.loop_thread)
+            if frame is not None and asyncio.current_task(profile.loop) is profile.task:
+                profile.samples[";".join(["event-loop"] + _stack(frame))] += 1
+            for thread_id in list(profile.threads):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    profile.samples[";".join(["executor"] + _stack(frame))] += 1
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold_ms,
+            "sample_interval_ms": self.interval * 1000,
+            "active": len(self._active),
+            "dumps": self.dumps,
+        }
+
+
+profiler = SamplingProfiler(
+    threshold_ms=PROFILE_SLOW_REQUEST_MS,
+    interval_ms=PROFILE_SAMPLE_INTERVAL_MS,
+    directory=PROFILE_DIR,
+    max_dumps=PROFILE_MAX_DUMPS,
+)
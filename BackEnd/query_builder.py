@@ -0,0 +1,139 @@
+"""Parameterized SELECT statements for the player endpoints.
+
+Every read is normalized to a statement whose text depends only on its
+shape (which filters are set, the projection, the ordering, whether a
+cursor is given, how many IDs are looked up), never on the values, which
+are all bound as parameters, LIMIT included. The same request shape
+therefore always produces the same SQL, so:
+
+* each pooled SQLite connection keeps it prepared in its statement cache
+  (database.STATEMENT_CACHE_SIZE) instead of recompiling it per request,
+* the warehouse sees one statement text per shape, which is what its
+  result cache keys on (USE_CACHED_RESULT is set per session in backends),
+* logs name the statement (Statement.name) instead of dumping the SQL.
+"""
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from pagination import decode_cursor, keyset_clause, order_by_clause
+from schema import COLUMN_FIELDS, ID_COLUMNS, TABLES, quote_column, select_list
+
+# Filter parameter -> (column, operator), in the order predicates are written
+FILTERS = {
+    "cricket": {
+        "team": ("Team", "="),
+        "format": ("Format", "="),
+        "gender": ("Gender", "="),
+    },
+    "football": {
+        "club": ("Club", "="),
+        "nationality": ("Nationality", "="),
+        "position": ("Position", "="),
+        "min_rating": ("Overall", ">="),
+        "max_rating": ("Overall", "<="),
+    },
+}
+
+# ID lookups are padded up to one of these sizes so that a handful of
+# statements cover any number of IDs
+ID_BUCKETS = (1, 4, 16, 64, 256, 1024)
+
+
+class Statement(NamedTuple):
+    name: str
+    sql: str
+
+
+def active_filters(sport: str, filters: Dict) -> Tuple[str, ...]:
+    """The filter parameters that are set, in canonical order (unset, empty and 0 are ignored)"""
+    return tuple(name for name in FILTERS[sport] if filters.get(name))
+
+
+@lru_cache(maxsize=1024)
+def _filtered(
+    sport: str,
+    columns: Optional[Tuple[str, ...]],
+    filters: Tuple[str, ...],
+    ordering: Tuple[Tuple[str, bool], ...],
+    keyset: Optional[Tuple[bool, ...]],
+) -> Statement:
+    sql = f"SELECT {select_list(columns)} FROM {TABLES[sport]}"
+    predicates = [f"{FILTERS[sport][name][0]} {FILTERS[sport][name][1]} %s" for name in filters]
+    sql += " WHERE " + " AND ".join(predicates) if predicates else " WHERE 1=1"
+    if keyset is not None:
+        # The clause's text depends only on the ordering and on which cursor
+        # values are NULL (``keyset``); the values are bound
+        sql += keyset_clause(ordering, [None if null else 0 for null in keyset])[0]
+    sql += order_by_clause(ordering) + " LIMIT %s"
+    name = f"{sport}.players[{','.join(filters) or 'all'}{';cursor' if keyset is not None else ''}]"
+    return Statement(name, sql)
+
+
+def filtered_players(
+    sport: str,
+    filters: Dict,
+    ordering: Sequence[Tuple[str, bool]],
+    cursor: Optional[str],
+    limit: int,
+    columns: Optional[Sequence[str]] = None,
+) -> Tuple[Statement, List]:
+    """One page of filtered, keyset-paginated players (``limit`` + 1 rows, to detect a next page).
+
+    ``filters`` maps FILTERS parameter names to values.
+    """
+    active = active_filters(sport, filters)
+    params = [filters[name] for name in active]
+    keyset = None
+    if cursor:
+        values = decode_cursor(ordering, cursor)
+        params.extend(keyset_clause(ordering, values)[1])
+        keyset = tuple(value is None for value in values)
+    params.append(limit + 1)
+    statement = _filtered(
+        sport, tuple(columns) if columns is not None else None, active, tuple(ordering), keyset
+    )
+    return statement, params
+
+
+@lru_cache(maxsize=256)
+def _all_players(sport: str, columns: Optional[Tuple[str, ...]]) -> Statement:
+    return Statement(f"{sport}.players[all]", f"SELECT {select_list(columns)} FROM {TABLES[sport]}")
+
+
+def all_players(sport: str, columns: Optional[Sequence[str]] = None) -> Statement:
+    """Every row of the sport's table"""
+    return _all_players(sport, tuple(columns) if columns is not None else None)
+
+
+def table_fingerprint(sport: str) -> Statement:
+    """Row count and an order-independent hash of every row (changes with any
+    insert, update or delete; see snapshot.TableSnapshot.refresh)"""
+    columns = ", ".join(quote_column(column) for column in COLUMN_FIELDS[sport])
+    return Statement(f"{sport}.fingerprint", f"SELECT COUNT(*), HASH_AGG({columns}) FROM {TABLES[sport]}")
+
+
+def player_ids(sport: str) -> Statement:
+    """The ID column of every row (see directory.PlayerDirectory)"""
+    return Statement(f"{sport}.player_ids", f"SELECT {ID_COLUMNS[sport]} FROM {TABLES[sport]}")
+
+
+@lru_cache(maxsize=256)
+def _players_by_id(sport: str, columns: Optional[Tuple[str, ...]], size: int) -> Statement:
+    placeholders = ", ".join(["%s"] * size)
+    return Statement(
+        f"{sport}.players_by_id[{size}]",
+        f"SELECT {select_list(columns)} FROM {TABLES[sport]} WHERE {ID_COLUMNS[sport]} IN ({placeholders})"
+    )
+
+
+def players_by_id(sport: str, player_ids: Sequence[int], columns: Optional[Sequence[str]] = None) -> Tuple[Statement, List]:
+    """Rows whose ID column is one of ``player_ids``.
+
+    The IDs are padded (repeating the last one, which leaves the result
+    unchanged) to the next ID_BUCKETS size.
+    """
+    ids = list(player_ids)
+    size = next((bucket for bucket in ID_BUCKETS if bucket >= len(ids)), len(ids))
+    if ids:
+        ids.extend([ids[-1]] * (size - len(ids)))
+    return _players_by_id(sport, tuple(columns) if columns is not None else None, size), ids
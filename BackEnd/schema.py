@@ -0,0 +1,132 @@
+from typing import Dict, List, Optional, Sequence
+
+CRICKET_TABLE = "CRICKETPLAYERS.PUBLIC.CRICKETPLAYER"
+FOOTBALL_TABLE = "PLAYERFOOTBALL.PUBLIC.PLAYERFOOTBALL"
+
+TABLES = {
+    "cricket": CRICKET_TABLE,
+    "football": FOOTBALL_TABLE,
+}
+
+# Table column -> CricketPlayerCreate field, in table order. Three columns
+# have names that are not valid Python identifiers.
+CRICKET_COLUMN_FIELDS = {
+    "Team": "Team", "Format": "Format", "Gender": "Gender", "No": "No", "Name": "Name",
+    "First": "First", "Last": "Last", "Mat": "Mat", "Runs": "Runs", "HS": "HS",
+    "Avg": "Avg", "50": "Fifty", "100": "Hundred", "Balls": "Balls", "Wkt": "Wkt",
+    "BBI": "BBI", "Ave": "Ave", "5WI": "FiveWI", "Ca": "Ca", "St": "St",
+}
+CRICKET_COLUMNS = list(CRICKET_COLUMN_FIELDS)
+
+FOOTBALL_COLUMNS = [
+    "PlayerID", "Name", "Age", "Nationality", "Overall", "Club", "Value", "Wage", "PreferredFoot",
+    "InternationalReputation", "WeakFoot", "SkillMoves", "Position", "JerseyNumber", "Height",
+    "Weight", "Crossing", "Finishing", "HeadingAccuracy", "ShortPassing", "Volleys", "Dribbling",
+    "Curve", "FKAccuracy", "LongPassing", "BallControl", "Acceleration", "SprintSpeed", "Agility",
+    "Reactions", "Balance", "ShotPower", "Jumping", "Stamina", "Strength", "LongShots", "Aggression",
+    "Interceptions", "Positioning", "Vision", "Penalties", "Composure", "Marking", "StandingTackle",
+    "SlidingTackle", "GKDiving", "GKHandling", "GKKicking", "GKPositioning", "GKReflexes",
+]
+FOOTBALL_COLUMN_FIELDS = {column: column for column in FOOTBALL_COLUMNS}
+
+COLUMN_FIELDS = {
+    "cricket": CRICKET_COLUMN_FIELDS,
+    "football": FOOTBALL_COLUMN_FIELDS,
+}
+
+
+# Column holding the ID that /predict looks players up by
+ID_COLUMNS = {
+    "cricket": "No",
+    "football": "PlayerID",
+}
+
+
+def row_value(row: Dict, column: str):
+    """Read ``column`` from a result row whose keys the warehouse may have upper-cased"""
+    if column in row:
+        return row[column]
+    upper = column.upper()
+    for name, value in row.items():
+        if name.upper() == upper:
+            return value
+    return None
+
+
+def find_column(columns, name: str) -> Optional[str]:
+    """The entry of ``columns`` matching ``name`` case-insensitively, or None"""
+    for column in columns:
+        if column.upper() == name.upper():
+            return column
+    return None
+
+
+def quote_column(column: str) -> str:
+    """Quote column names such as 50 or 5WI that are not plain identifiers"""
+    return column if column.isidentifier() else f'"{column}"'
+
+
+class InvalidFieldsError(ValueError):
+    """A ?fields= list naming columns the table does not have"""
+
+
+def parse_fields(sport: str, fields: Optional[str]) -> Optional[List[str]]:
+    """Table columns named in a comma-separated ?fields= list, in the order given.
+
+    Names match case-insensitively; None (all columns) when ``fields`` is empty.
+    """
+    if not fields:
+        return None
+    columns, unknown = [], []
+    for name in (name.strip() for name in fields.split(",")):
+        if not name:
+            continue
+        column = find_column(COLUMN_FIELDS[sport], name)
+        if column is None:
+            unknown.append(name)
+        elif column not in columns:
+            columns.append(column)
+    if unknown:
+        raise InvalidFieldsError(f"Unknown {sport} columns: {', '.join(unknown)}")
+    return columns or None
+
+
+def with_columns(columns: Optional[Sequence[str]], extra: Sequence[str]) -> Optional[List[str]]:
+    """``columns`` plus any of ``extra`` not already in it (None stays all columns)"""
+    if columns is None:
+        return None
+    return list(columns) + [column for column in extra if column not in columns]
+
+
+def select_list(columns: Optional[Sequence[str]]) -> str:
+    """SELECT list for ``columns``, or * for all columns"""
+    return "*" if columns is None else ", ".join(quote_column(c) for c in columns)
+
+
+def project(rows: List[Dict], columns: Optional[Sequence[str]]) -> List[Dict]:
+    """Keep only ``columns`` of each row (rows whose keys the warehouse may have upper-cased)"""
+    if columns is None or not rows:
+        return rows
+    keys = [key for key in (find_column(rows[0], column) for column in columns) if key is not None]
+    if len(keys) == len(rows[0]):
+        return rows
+    return [{key: row[key] for key in keys} for row in rows]
+
+
+def insert_statement(sport: str) -> str:
+    """Parameterized INSERT of one row into the sport's table, in table column order"""
+    columns = list(COLUMN_FIELDS[sport])
+    return (
+        f"INSERT INTO {TABLES[sport]} ({', '.join(quote_column(c) for c in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+
+
+def insert_params(sport: str, row: Dict) -> tuple:
+    """Bind parameters for insert_statement from a {table column: value} row"""
+    return tuple(row[column] for column in COLUMN_FIELDS[sport])
+
+
+def player_row(sport: str, player) -> Dict:
+    """Map a validated *PlayerCreate model to a {table column: value} row"""
+    return {column: getattr(player, field) for column, field in COLUMN_FIELDS[sport].items()}
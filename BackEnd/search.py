@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import logging
+import re
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from lazy import pd
+from schema import find_column, row_value
+
+logger = logging.getLogger(__name__)
+
+# Name columns indexed per sport; the first is the display name
+SEARCH_COLUMNS = {
+    "cricket": ["Name", "First", "Last"],
+    "football": ["Name"],
+}
+
+MAX_SEARCH_LIMIT = 100
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# Score of a query term matching a name token, by kind of match
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.75
+TYPO_SCORE = 0.6
+TYPO_PENALTY = 0.2
+# Added when the whole name starts with the whole query
+LEADING_BONUS = 0.5
+
+
+def normalize(text) -> str:
+    """Lower-case, strip accents (e.g. Agüero -> aguero) and collapse punctuation to spaces"""
+    if text is None:
+        return ""
+    text = str(text)
+    if text.isascii():
+        # Nothing to decompose; most names take this path, which keeps
+        # indexing a snapshot at startup fast
+        return _NON_ALNUM.sub(" ", text.lower()).strip()
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", stripped.casefold()).strip()
+
+
+def _deletes(word: str, depth: int) -> Set[str]:
+    """Every string obtained by deleting up to ``depth`` characters from ``word``"""
+    found, frontier = set(), {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - found
+        found |= frontier
+    return found
+
+
+def max_typos(term: str) -> int:
+    """Edits tolerated for a query term: none for very short terms, two for long ones"""
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+
+def _delete_depth(token: str) -> int:
+    """Deletions indexed per token; enough to meet any query term within its typo budget"""
+    if len(token) < 3:
+        return 0
+    return 1 if len(token) < 8 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (adjacent swaps count as one edit),
+    or ``limit + 1`` as soon as it is known to exceed ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class NameIndex:
+    """Token index over player names for prefix and typo-tolerant search.
+
+    Names are normalized and split into tokens. Each token maps to the row
+    positions containing it; a sorted token list answers prefix queries by
+    binary search, and a symmetric-delete map (each token filed under the
+    strings left by deleting one or two of its characters) finds candidate
+    tokens within a couple of edits of a misspelled term without comparing
+    it to every token. Rows are aligned with the snapshot frame, so appended
+    rows are indexed in place.
+    """
+
+    def __init__(self, sport: str, frame: pd.DataFrame):
+        self.sport = sport
+        self.postings: Dict[str, List[int]] = {}
+        self.tokens: List[str] = []
+        self.deletes: Dict[str, Set[str]] = {}
+        self.names: List[str] = []
+        columns = [find_column(frame.columns, name) for name in SEARCH_COLUMNS[sport]]
+        values = [frame[column].tolist() if column else [None] * len(frame) for column in columns]
+        for position, fields in enumerate(zip(*values)):
+            self._add(position, fields)
+        self.tokens.sort()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _add(self, position: int, fields: Sequence, keep_sorted: bool = False):
+        normalized = [normalize(field) for field in fields]
+        self.names.append(normalized[0] if normalized else "")
+        tokens = {token for field in normalized for token in field.split()}
+        for token in tokens:
+            postings = self.postings.get(token)
+            if postings is None:
+                self.postings[token] = [position]
+                if keep_sorted:
+                    bisect.insort(self.tokens, token)
+                else:
+                    self.tokens.append(token)
+                for variant in _deletes(token, _delete_depth(token)):
+                    self.deletes.setdefault(variant, set()).add(token)
+            else:
+                postings.append(position)
+
+    def append_rows(self, rows: Sequence[Dict]):
+        """Index rows appended to the snapshot"""
+        for row in rows:
+            self._add(len(self.names), [row_value(row, column) for column in SEARCH_COLUMNS[self.sport]], keep_sorted=True)
+
+    def _term_matches(self, term: str, prefix: bool) -> Dict[str, float]:
+        """Tokens matching one query term and the score of each match"""
+        matches = {}
+        if term in self.postings:
+            matches[term] = EXACT_SCORE
+        if prefix:
+            start = bisect.bisect_left(self.tokens, term)
+            for token in self.tokens[start:]:
+                if not token.startswith(term):
+                    break
+                if token != term:
+                    matches[token] = PREFIX_SCORE + (1 - PREFIX_SCORE) * len(term) / len(token)
+        typos = max_typos(term)
+        if typos:
+            # Tokens within ``typos`` edits share a deletion variant with the term
+            candidates = set()
+            for variant in _deletes(term, typos) | {term}:
+                if variant in self.postings:
+                    candidates.add(variant)
+                candidates |= self.deletes.get(variant, set())
+            for token in candidates:
+                if token in matches:
+                    continue
+                distance = edit_distance(term, token, typos)
+                if distance <= typos:
+                    matches[token] = TYPO_SCORE - TYPO_PENALTY * (distance - 1)
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Best (position, score) matches for ``query``, highest score first.
+
+        Every query term must match a token of the row, exactly, as a prefix
+        (the last term only, as the user is still typing it) or within the
+        allowed typos.
+        """
+        terms = normalize(query).split()
+        if not terms:
+            return []
+        unique = list(dict.fromkeys(terms))
+        scores: Optional[Dict[int, float]] = None
+        for i, term in enumerate(unique):
+            term_scores: Dict[int, float] = {}
+            for token, score in self._term_matches(term, prefix=i == len(unique) - 1).items():
+                for position in self.postings[token]:
+                    if term_scores.get(position, 0) < score:
+                        term_scores[position] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    position: score + term_scores[position]
+                    for position, score in scores.items()
+                    if position in term_scores
+                }
+            if not scores:
+                return []
+
+        leading = " ".join(terms)
+        ranked = [
+            (position, score + (LEADING_BONUS if self.names[position].startswith(leading) else 0))
+            for position, score in scores.items()
+        ]
+        return heapq.nsmallest(limit, ranked, key=lambda item: (-item[1], len(self.names[item[0]]), item[0]))
+
@@ -0,0 +1,360 @@
+"""Production entry point: a pre-forking server running the API in several worker processes.
+
+    python server.py --workers 4 --port 8000
+
+The master process imports the app, loads the prediction models and the
+player snapshots once, then forks the workers, which share those pages
+copy-on-write and accept connections on one listening socket. Query
+results and table generations are shared between the workers through a
+SharedCache file on the RAM disk (see shared_cache.py).
+
+Signals to the master:
+    SIGHUP           graceful restart: reload models and snapshots, start a
+                     new set of workers and, once they are serving, stop the
+                     old ones after their in-flight requests complete
+    SIGTERM, SIGINT  graceful shutdown
+
+A new worker counts as serving once its /readyz reports ready (pool open,
+models, snapshots and player directory warm). Workers that exit
+unexpectedly are replaced. The listening socket stays open in the master
+throughout, so connections arriving during a restart wait in the backlog
+instead of being refused. Code changes need a full
+restart; SIGHUP reuses the code the master imported.
+
+Without fork() (Windows) a single worker is run in-process.
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import select
+import signal
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# The settings below, and SHARED_CACHE_PATH, are read before the app is imported
+load_dotenv()
+
+logger = logging.getLogger("server")
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
+# How often the master checks on its workers
+TICK_SECONDS = 0.2
+# Workers that die sooner than this after starting are respawned only after a pause
+MIN_WORKER_LIFETIME = 5.0
+
+
+def _shared_cache_path() -> str:
+    """A new file on the RAM disk when there is one, in a directory only this user
+    can enter (mkdtemp creates it 0700), so no other user can plant or read it"""
+    directory = tempfile.mkdtemp(prefix="sportsanalytics-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    path = os.path.join(directory, "shared.cache")
+    os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o600))
+    return path
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _watch_parent(master_pid: int):
+    """Stop this worker gracefully if the master goes away"""
+    def watch():
+        while os.getppid() == master_pid:
+            time.sleep(1)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    threading.Thread(target=watch, name="parent-watch", daemon=True).start()
+
+
+class DrainingApp:
+    """ASGI wrapper that, once ``draining`` is set, asks clients to close their
+    connection after each response.
+
+    A stopping worker drains this way before closing its connections, so
+    clients are not left sending a request down a keep-alive connection the
+    worker is about to close.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.draining = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_closing(message):
+            if self.draining and message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"connection", b"close")]}
+            await send(message)
+
+        await self.app(scope, receive, send_closing)
+
+
+class Supervisor:
+    """Master process: preloads the app, forks workers and keeps their number up"""
+
+    def __init__(self, workers: int, host: str, port: int, graceful_timeout: float, log_level: str):
+        self.count = max(1, workers)
+        self.host = host
+        self.port = port
+        self.graceful_timeout = graceful_timeout
+        self.log_level = log_level
+        self.generation = 0
+        self.workers: Dict[int, int] = {}  # pid -> generation
+        self.started_at: Dict[int, float] = {}
+        self.ready: set = set()
+        self.stopping: Dict[int, float] = {}  # pid -> kill deadline
+        self.respawn_after = 0.0
+        self.signals: List[int] = []
+        self.master_pid = os.getpid()
+        self.sock: Optional[socket.socket] = None
+        self.application = None
+
+    # Preload
+
+    def preload(self):
+        """Import the app and load models, player data and the player directory before forking"""
+        if self.application is None:
+            import app as application
+            self.application = application
+        gc.unfreeze()
+        started = time.perf_counter()
+        self.application.predictor.load()
+        self.application.snapshots.preload(self.application.db.backend.connect)
+        for snapshot in self.application.snapshots.snapshots.values():
+            if snapshot.ready:
+                self.application.directory.add_snapshot(snapshot)
+        # Keep the collector from touching (and so copying) the preloaded
+        # objects in every worker
+        gc.collect()
+        gc.freeze()
+        logger.info(f"Preloaded models, player snapshots and directory in {time.perf_counter() - started:.2f}s")
+
+    # Workers
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self.workers[pid] = self.generation
+        self.started_at[pid] = time.monotonic()
+        logger.info(f"Started worker {pid} (generation {self.generation})")
+
+    def _run_worker(self):
+        status = 0
+        try:
+            os.close(self.ready_read)
+            for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+                signal.signal(signum, signal.SIG_DFL)
+            _watch_parent(self.master_pid)
+
+            import uvicorn
+
+            ready_write = self.ready_write
+            readiness = self.application.readiness
+            app = DrainingApp(self.application.app)
+            drain_seconds = self.graceful_timeout
+
+            class Worker(uvicorn.Server):
+                async def startup(self, sockets=None):
+                    await super().startup(sockets=sockets)
+                    if self.started:
+                        asyncio.ensure_future(self.report_ready())
+
+                async def report_ready(self):
+                    # Old workers keep serving a restart until this one is warm
+                    while not readiness.status()[0]:
+                        await asyncio.sleep(0.05)
+                    os.write(ready_write, f"{os.getpid()}\n".encode("ascii"))
+
+                async def shutdown(self, sockets=None):
+                    # Stop accepting and let open connections finish their
+                    # requests (or go idle past the keep-alive timeout) first
+                    for server in self.servers:
+                        server.close()
+                    app.draining = True
+                    deadline = time.monotonic() + min(drain_seconds, self.config.timeout_keep_alive + 1)
+                    while self.server_state.connections and time.monotonic() < deadline:
+                        await asyncio.sleep(0.05)
+                    await super().shutdown(sockets=sockets)
+
+            config = uvicorn.Config(
+                app,
+                log_level=self.log_level,
+                timeout_graceful_shutdown=int(self.graceful_timeout),
+            )
+            Worker(config).run(sockets=[self.sock])
+        except BaseException as e:
+            if not isinstance(e, SystemExit) or e.code:
+                logger.exception(f"Worker {os.getpid()} failed")
+                status = 1
+        finally:
+            os._exit(status)
+
+    def _read_ready(self):
+        while select.select([self.ready_read], [], [], 0)[0]:
+            data = os.read(self.ready_read, 4096)
+            if not data:
+                return
+            for line in data.decode("ascii").split():
+                self.ready.add(int(line))
+
+    def _reap(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.workers.pop(pid, None)
+            self.ready.discard(pid)
+            lifetime = time.monotonic() - self.started_at.pop(pid, time.monotonic())
+            if self.stopping.pop(pid, None) is not None:
+                logger.info(f"Worker {pid} stopped")
+                continue
+            logger.error(f"Worker {pid} exited unexpectedly (status {status}) after {lifetime:.1f}s")
+            if lifetime < MIN_WORKER_LIFETIME:
+                self.respawn_after = time.monotonic() + MIN_WORKER_LIFETIME
+
+    def _current(self) -> List[int]:
+        return [pid for pid, generation in self.workers.items() if generation == self.generation]
+
+    def _spawn_missing(self):
+        if time.monotonic() < self.respawn_after:
+            return
+        for _ in range(self.count - len(self._current())):
+            self.spawn()
+
+    def _terminate(self, pids: List[int]):
+        """Ask workers to finish their in-flight requests and exit"""
+        for pid in pids:
+            if pid in self.stopping:
+                continue
+            self.stopping[pid] = time.monotonic() + self.graceful_timeout + 5
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _kill_overdue(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.stopping.items()):
+            if now >= deadline:
+                logger.warning(f"Worker {pid} did not stop within the graceful timeout; killing it")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                self.stopping[pid] = now + self.graceful_timeout
+
+    # Master loop
+
+    def _on_signal(self, signum, frame):
+        self.signals.append(signum)
+
+    def restart(self):
+        """Replace every worker without refusing connections"""
+        logger.info("Graceful restart: reloading models and data")
+        old = self._current()
+        try:
+            self.preload()
+        except Exception as e:
+            logger.error(f"Reload failed, keeping the current workers: {str(e)}")
+            return
+        self.generation += 1
+        self._spawn_missing()
+        # Old workers keep serving until the new ones accept connections
+        deadline = time.monotonic() + self.graceful_timeout
+        while time.monotonic() < deadline:
+            self._read_ready()
+            self._reap()
+            if all(pid in self.ready for pid in self._current()) or not self._current():
+                break
+            time.sleep(TICK_SECONDS)
+        self._terminate(old)
+
+    def stop(self):
+        logger.info("Shutting down: waiting for workers to finish their requests")
+        self._terminate(list(self.workers))
+        while self.workers:
+            self._reap()
+            self._kill_overdue()
+            time.sleep(TICK_SECONDS)
+
+    def run(self):
+        self.sock = _bind(self.host, self.port)
+        self.ready_read, self.ready_write = os.pipe()
+        self.preload()
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._on_signal)
+        logger.info(f"Master {self.master_pid} serving http://{self.host}:{self.port} with {self.count} workers")
+        try:
+            self._spawn_missing()
+            while True:
+                self._read_ready()
+                self._reap()
+                signum = self.signals.pop(0) if self.signals else None
+                if signum in (signal.SIGTERM, signal.SIGINT):
+                    self.stop()
+                    return
+                if signum == signal.SIGHUP:
+                    self.restart()
+                self._spawn_missing()
+                self._kill_overdue()
+                time.sleep(TICK_SECONDS)
+        finally:
+            self.sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY, help="Worker processes (default: CPU count)")
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT,
+                        help="Seconds a stopping worker gets to finish its requests")
+    parser.add_argument("--no-shared-cache", action="store_true", help="Give every worker its own cache only")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper())
+
+    if not hasattr(os, "fork"):
+        import uvicorn
+        logger.warning("fork() is not available: running a single worker")
+        uvicorn.run("app:app", host=args.host, port=args.port, log_level=args.log_level)
+        return
+
+    # Must be set before the app (and shared_cache) is imported
+    owns_cache = args.workers > 1 and not args.no_shared_cache and not os.getenv("SHARED_CACHE_PATH")
+    if owns_cache:
+        os.environ["SHARED_CACHE_PATH"] = _shared_cache_path()
+    try:
+        Supervisor(args.workers, args.host, args.port, args.graceful_timeout, args.log_level).run()
+    finally:
+        if owns_cache:
+            shutil.rmtree(os.path.dirname(os.environ["SHARED_CACHE_PATH"]), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from schema import TABLES
+from streaming import json_default
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "")
+SHARED_CACHE_TTL = float(os.getenv("SHARED_CACHE_TTL", os.getenv("PLAYER_CACHE_TTL", "60")))
+SHARED_CACHE_MAX_ENTRIES = int(os.getenv("SHARED_CACHE_MAX_ENTRIES", "1024"))
+SHARED_CACHE_CHANGE_RETENTION = float(os.getenv("SHARED_CACHE_CHANGE_RETENTION", "600"))
+
+
+class SharedCache:
+    """Query results and table generations shared by the worker processes of one server.
+
+    Backed by a SQLite file on a RAM disk (/dev/shm), so every worker that
+    server.py forks sees the same entries. Each table has a generation
+    that is bumped on every write; entries are stored with the generation
+    they were loaded under and ignored once it has moved on, so a write in
+    one worker is never masked by another worker's earlier read.
+
+    sync() compares the generations with the ones this process last saw and
+    calls the subscribed listeners for tables another process wrote to; it
+    runs before every request (SyncMiddleware, which reads the file off the
+    event loop with collect() and then calls notify()). Writes that only added rows
+    carry them (bump(table, rows)), so the other workers can append them to
+    their snapshots instead of reloading the table.
+
+    Values are stored as JSON, never pickled: the file must still belong to
+    this user (server.py creates it in a private directory), but a value
+    read from it can at worst be wrong data, not code.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = SHARED_CACHE_TTL,
+        max_entries: int = SHARED_CACHE_MAX_ENTRIES,
+        change_retention: float = SHARED_CACHE_CHANGE_RETENTION,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.change_retention = change_retention
+        self._local = threading.local()
+        self._listeners: List[Callable[[str, Optional[List[Dict]]], None]] = []
+        self._seen: Dict[str, Tuple[int, float]] = {}
+        # Generations bumped by this process and not yet passed by sync()
+        self._own: Dict[str, Set[int]] = {}
+        # Serializes bump() and collect() within the process, so a write of
+        # ours is never mistaken for another process's
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.remote_changes = 0
+
+        if os.path.exists(path) and os.stat(path).st_uid != os.getuid():
+            raise PermissionError(f"Shared cache {path} belongs to another user")
+        conn = sqlite3.connect(path, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS generations "
+                "(tbl TEXT PRIMARY KEY, generation INTEGER NOT NULL, modified REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, tbl TEXT NOT NULL, "
+                "generation INTEGER NOT NULL, expires REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS changes (tbl TEXT NOT NULL, generation INTEGER NOT NULL, "
+                "created REAL NOT NULL, rows TEXT NOT NULL, PRIMARY KEY (tbl, generation))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            now = time.time()
+            conn.executemany(
+                "INSERT OR IGNORE INTO generations VALUES (?, 0, ?)", [(table, now) for table in TABLES]
+            )
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('epoch', ?)", (format(int(now * 1000), "x"),))
+            # Shared by every process using the file, so their ETags agree
+            self.epoch = conn.execute("SELECT value FROM meta WHERE name = 'epoch'").fetchone()[0]
+            self._seen = self._read_generations(conn)
+        finally:
+            conn.close()
+
+    @classmethod
+    def from_env(cls) -> Optional["SharedCache"]:
+        """The cache at SHARED_CACHE_PATH, or None when it is not set (a single worker)"""
+        if not SHARED_CACHE_PATH:
+            return None
+        return cls(SHARED_CACHE_PATH)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread and process: SQLite handles must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def _read_generations(conn) -> Dict[str, Tuple[int, float]]:
+        return {table: (generation, modified) for table, generation, modified in conn.execute("SELECT * FROM generations")}
+
+    @staticmethod
+    def key(query: str, params=None) -> str:
+        return hashlib.blake2b(repr((query, tuple(params or ()))).encode("utf-8"), digest_size=16).hexdigest()
+
+    def subscribe(self, listener: Callable[[str, Optional[List[Dict]]], None]):
+        """Call ``listener(table, rows)`` when sync() finds that another process changed
+        ``table``; ``rows`` are the rows it added, or None if it changed anything else
+        (or the rows are no longer recorded)"""
+        self._listeners.append(listener)
+
+    def generation(self, table: str) -> int:
+        return self._seen.get(table, (0, 0.0))[0]
+
+    def modified(self, table: str) -> float:
+        return self._seen.get(table, (0, 0.0))[1]
+
+    def sync(self):
+        """Pick up writes made by other processes since the last sync"""
+        self.notify(self.collect())
+
+    def collect(self) -> List[Tuple[str, Optional[List[Dict]]]]:
+        """(table, rows added or None) for every table another process wrote to since
+        the last call. Blocks on the file, so call it off the event loop"""
+        changes = []
+        with self._lock:
+            current = self._read_generations(self._conn())
+            for table, state in current.items():
+                seen = self._seen.get(table, (0, 0.0))[0]
+                if seen == state[0]:
+                    continue
+                self._seen[table] = state
+                self.remote_changes += 1
+                changes.append((table, self._added_rows(table, seen, state[0])))
+        return changes
+
+    def notify(self, changes: List[Tuple[str, Optional[List[Dict]]]]):
+        """Call the listeners for changes found by collect()"""
+        for table, rows in changes:
+            for listener in self._listeners:
+                try:
+                    listener(table, rows)
+                except Exception as e:
+                    logger.error(f"Shared cache listener failed for {table}: {str(e)}")
+
+    def _added_rows(self, table: str, seen: int, current: int) -> Optional[List[Dict]]:
+        """The rows other processes added to ``table`` between two generations, or
+        None if any of those writes was not a plain insert"""
+        own = self._own.pop(table, set())
+        recorded = dict(self._conn().execute(
+            "SELECT generation, rows FROM changes WHERE tbl = ? AND generation > ? AND generation <= ?",
+            (table, seen, current)
+        ).fetchall())
+        rows = []
+        for generation in range(seen + 1, current + 1):
+            if generation in own:
+                # Already applied here when it was made
+                continue
+            if generation not in recorded:
+                return None
+            rows.extend(json.loads(recorded[generation]))
+        return rows
+
+    def bump(self, table: str, rows: Optional[List[Dict]] = None):
+        """Record a write to ``table`` made by this process; ``rows`` when it only
+        added those rows. Blocks on the file, so call it off the event loop"""
+        payload = None if rows is None else json.dumps(rows, default=json_default, separators=(",", ":"))
+        with self._lock:
+            self._bump(table, payload)
+
+    def _bump(self, table: str, payload: Optional[str]):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Last-Modified has one-second resolution, as in TableVersions.bump
+            conn.execute(
+                "UPDATE generations SET generation = generation + 1, "
+                "modified = MAX(?, CAST(modified AS INTEGER) + 1) WHERE tbl = ?",
+                (now, table)
+            )
+            generation, modified = conn.execute(
+                "SELECT generation, modified FROM generations WHERE tbl = ?", (table,)
+            ).fetchone()
+            if payload is not None:
+                conn.execute("INSERT OR REPLACE INTO changes VALUES (?, ?, ?, ?)", (table, generation, now, payload))
+            # A process that falls further behind than this reloads the table instead
+            conn.execute("DELETE FROM changes WHERE created < ?", (now - self.change_retention,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        # Only skip our own write: if another process wrote in between, leave
+        # the change for sync() so its listeners still run
+        if self.generation(table) == generation - 1:
+            self._seen[table] = (generation, modified)
+        else:
+            self._own.setdefault(table, set()).add(generation)
+
+    def get(self, table: str, key: str):
+        row = self._conn().execute(
+            "SELECT e.value FROM entries e JOIN generations g ON g.tbl = e.tbl "
+            "WHERE e.key = ? AND e.tbl = ? AND e.generation = g.generation AND e.expires > ?",
+            (key, table, time.time())
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, table: str, key: str, generation: int, value):
+        """Store ``value`` loaded while ``table`` was at ``generation``"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+            (key, table, generation, now + self.ttl, json.dumps(value, default=json_default, separators=(",", ":")))
+        )
+        self.stores += 1
+        conn.execute(
+            "DELETE FROM entries WHERE expires <= ? OR generation < (SELECT generation FROM generations g WHERE g.tbl = entries.tbl)",
+            (now,)
+        )
+        conn.execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def stats(self) -> Dict:
+        entries, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM entries").fetchone()
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "remote_changes": self.remote_changes,
+            "generations": {table: generation for table, (generation, _) in self._seen.items()},
+        }
+
+
+class SyncMiddleware:
+    """ASGI middleware applying other workers' writes (SharedCache.sync) before each request"""
+
+    def __init__(self, app, cache: SharedCache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            try:
+                changes = await asyncio.get_running_loop().run_in_executor(None, self.cache.collect)
+                self.cache.notify(changes)
+            except Exception as e:
+                logger.warning(f"Shared cache sync failed: {str(e)}")
+        await self.app(scope, receive, send)
+
+
+shared_cache = SharedCache.from_env()
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+from typing import Dict, Optional, Sequence, Tuple
+
+from features import FEATURES, FOOTBALL_SKILLS, raw_matrix, RAW_FEATURES
+from index import intersect
+from lazy import np, pd
+from schema import row_value
+
+logger = logging.getLogger(__name__)
+
+# Attributes each sport's players are compared on
+EMBEDDING_COLUMNS = {
+    "football": FOOTBALL_SKILLS,
+}
+
+LSH_TABLES = int(os.getenv("SIMILARITY_LSH_TABLES", "8"))
+LSH_BITS = int(os.getenv("SIMILARITY_LSH_BITS", "12"))
+# Candidate pools up to this size are ranked exactly; the LSH only pays off above it
+EXACT_SEARCH_MAX = int(os.getenv("SIMILARITY_EXACT_SEARCH_MAX", "20000"))
+
+_MONEY = re.compile(r"^\s*[^\d.]*([\d.]+)\s*([KMB]?)\s*$", re.IGNORECASE)
+_MULTIPLIERS = {"": 1.0, "K": 1e3, "M": 1e6, "B": 1e9}
+
+
+def parse_money(value) -> float:
+    """Parse market values such as '€110.5M' or '€500K' into a number; NaN if unknown"""
+    if value is None:
+        return np.nan
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    match = _MONEY.match(str(value))
+    if not match:
+        return np.nan
+    try:
+        return float(match.group(1)) * _MULTIPLIERS[match.group(2).upper()]
+    except ValueError:
+        return np.nan
+
+
+class SimilarityIndex:
+    """Cosine-similarity search over standardized player attribute vectors.
+
+    Each attribute is z-scored (with the statistics of the initial build) and
+    every vector is L2-normalized, so a dot product is the cosine similarity.
+    Large candidate pools are narrowed with random-projection LSH: ``tables``
+    hash tables, each keyed on the signs of ``bits`` random projections, are
+    probed at the query's bucket and every bucket one bit away, and the
+    candidates found are re-ranked exactly. Rows are aligned with the
+    snapshot frame, and inserts are hashed into the existing buckets.
+    """
+
+    def __init__(
+        self,
+        sport: str,
+        vectors: np.ndarray,
+        values: np.ndarray,
+        tables: int = LSH_TABLES,
+        bits: int = LSH_BITS,
+        seed: int = 0,
+    ):
+        self.sport = sport
+        self.tables, self.bits = tables, bits
+        self.mean = vectors.mean(axis=0) if len(vectors) else np.zeros(vectors.shape[1], dtype=np.float32)
+        std = vectors.std(axis=0) if len(vectors) else np.ones(vectors.shape[1], dtype=np.float32)
+        self.std = np.where(std > 0, std, 1).astype(np.float32)
+        self.planes = np.random.default_rng(seed).standard_normal((vectors.shape[1], tables * bits)).astype(np.float32)
+        self._weights = (1 << np.arange(bits, dtype=np.int64))
+
+        self._embeddings = self._embed(vectors)
+        self._values = np.asarray(values, dtype=np.float64)
+        self._size = len(vectors)
+        codes = self._codes(self._embeddings)
+        self.buckets = []
+        for table in range(tables):
+            column = codes[:, table]
+            order = np.argsort(column, kind="stable")
+            keys, starts = np.unique(column[order], return_index=True)
+            self.buckets.append({
+                int(key): positions.astype(np.int64)
+                for key, positions in zip(keys, np.split(order, starts[1:]))
+            })
+
+    @classmethod
+    def from_features(cls, store, frame: pd.DataFrame) -> "SimilarityIndex":
+        """Build from a FeatureStore (which already holds the raw attributes) and its frame"""
+        columns = [FEATURES[store.sport].index(name) for name in EMBEDDING_COLUMNS[store.sport]]
+        value_column = next((column for column in frame.columns if column.upper() == "VALUE"), None)
+        values = frame[value_column].map(parse_money).to_numpy() if value_column else np.full(len(frame), np.nan)
+        return cls(store.sport, store.matrix[:, columns], values)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        return self._embeddings[:self._size]
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:self._size]
+
+    def _embed(self, vectors: np.ndarray) -> np.ndarray:
+        z = (vectors - self.mean) / self.std
+        norms = np.linalg.norm(z, axis=1, keepdims=True)
+        return np.divide(z, norms, out=np.zeros_like(z), where=norms > 0).astype(np.float32)
+
+    def _codes(self, embeddings: np.ndarray) -> np.ndarray:
+        """(rows x tables) bucket keys: each table's projection signs packed into an int"""
+        signs = (embeddings @ self.planes > 0).reshape(len(embeddings), self.tables, self.bits)
+        return signs.astype(np.int64) @ self._weights
+
+    def append_rows(self, rows: Sequence[Dict]):
+        """Embed and hash rows appended to the snapshot"""
+        if not rows:
+            return
+        columns = [RAW_FEATURES[self.sport].index(name) for name in EMBEDDING_COLUMNS[self.sport]]
+        embeddings = self._embed(raw_matrix(self.sport, rows)[:, columns])
+        values = np.array([parse_money(row_value(row, "Value")) for row in rows], dtype=np.float64)
+        needed = self._size + len(rows)
+        if needed > len(self._embeddings):
+            capacity = max(needed, 2 * len(self._embeddings))
+            grown = np.zeros((capacity, self._embeddings.shape[1]), dtype=np.float32)
+            grown[:self._size] = self.embeddings
+            self._embeddings = grown
+            grown_values = np.full(capacity, np.nan)
+            grown_values[:self._size] = self.values
+            self._values = grown_values
+        self._embeddings[self._size:needed] = embeddings
+        self._values[self._size:needed] = values
+        for offset, codes in enumerate(self._codes(embeddings)):
+            position = self._size + offset
+            for table, key in enumerate(codes):
+                buckets = self.buckets[table]
+                # Appended positions are the largest, so bucket lists stay sorted
+                buckets[int(key)] = np.append(buckets.get(int(key), np.empty(0, dtype=np.int64)), position)
+        self._size = needed
+
+    def candidates(self, embedding: np.ndarray) -> np.ndarray:
+        """Sorted positions sharing a bucket (or a bucket one bit away) with ``embedding``"""
+        codes = self._codes(embedding[None, :])[0]
+        found = []
+        for table, key in enumerate(codes):
+            buckets = self.buckets[table]
+            for probe in [key] + [key ^ (1 << bit) for bit in range(self.bits)]:
+                positions = buckets.get(int(probe))
+                if positions is not None:
+                    found.append(positions)
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def search(
+        self,
+        position: int,
+        k: int,
+        allowed: Optional[np.ndarray] = None,
+        max_value: Optional[float] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, str]:
+        """Top-``k`` most similar rows to row ``position``, excluding itself.
+
+        ``allowed`` optionally restricts results to sorted row positions (e.g.
+        a club or position filter) and ``max_value`` to players whose market
+        value is known and at most that. Returns (positions, similarities,
+        method) where method is "exact" or "lsh".
+        """
+        query = self.embeddings[position]
+        pool_size = self._size if allowed is None else len(allowed)
+        method = "exact"
+        if pool_size > EXACT_SEARCH_MAX:
+            pool = self.candidates(query)
+            if allowed is not None:
+                pool = intersect(pool, allowed)
+            method = "lsh"
+        else:
+            pool = np.arange(self._size, dtype=np.int64) if allowed is None else allowed
+
+        pool = self._restrict(pool, position, max_value)
+        if method == "lsh" and len(pool) < k:
+            # Too few near-duplicates in the probed buckets: rank the whole pool
+            pool = np.arange(self._size, dtype=np.int64) if allowed is None else allowed
+            pool = self._restrict(pool, position, max_value)
+            method = "exact"
+
+        scores = self.embeddings[pool] @ query
+        if k < len(pool):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(pool))
+        top = top[np.lexsort((pool[top], -scores[top]))]
+        return pool[top], scores[top], method
+
+    def _restrict(self, pool: np.ndarray, position: int, max_value: Optional[float]) -> np.ndarray:
+        pool = pool[pool != position]
+        if max_value is not None:
+            pool = pool[self.values[pool] <= max_value]
+        return pool
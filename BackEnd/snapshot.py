@@ -0,0 +1,622 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import decimal
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from features import FeatureStore
+from index import TableIndex, linear_scan
+from lazy import np, pd
+from query_builder import all_players, table_fingerprint
+from schema import ID_COLUMNS, TABLES
+from search import NameIndex
+from similarity import EMBEDDING_COLUMNS, SimilarityIndex
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+# Seconds after which a refresh reloads the table even if it looks unchanged
+# (0 to rely on change detection alone); see TableSnapshot.refresh
+SNAPSHOT_FULL_RELOAD_INTERVAL = float(os.getenv("SNAPSHOT_FULL_RELOAD_INTERVAL", "3600"))
+# Seconds before retrying a table that failed to load, doubling up to the refresh interval
+LOAD_RETRY_DELAY = 1.0
+
+# (hash-indexed columns, sorted-indexed columns) per table, matching the
+# filters the player endpoints accept, plus the ID column /predict looks
+# players up by (sorted: it is nearly unique, so a hash index would hold a
+# posting list per row)
+INDEXED_COLUMNS = {
+    "cricket": (["Team", "Format", "Gender"], ["No"]),
+    "football": (["Club", "Nationality", "Position"], ["Overall", "PlayerID"]),
+}
+
+
+def _compact(frame: pd.DataFrame) -> pd.DataFrame:
+    """Turn warehouse DECIMALs into floats and downcast integer columns"""
+    for column in frame.columns:
+        series = frame[column]
+        if series.dtype == object:
+            sample = series.dropna()
+            if not sample.empty and isinstance(sample.iloc[0], decimal.Decimal):
+                frame[column] = series.astype(float)
+        if pd.api.types.is_integer_dtype(frame[column]):
+            frame[column] = pd.to_numeric(frame[column], downcast="integer")
+    return frame
+
+
+def _missing(value) -> bool:
+    return value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value)
+
+
+def records(frame: pd.DataFrame) -> List[Dict]:
+    """Convert a (small) frame to JSON-ready dicts with NaN as None"""
+    if frame.empty:
+        return []
+    # Column-wise tolist() yields Python scalars without a per-cell astype/where pass
+    columns = list(frame.columns)
+    values = [frame[column].tolist() for column in columns]
+    return [
+        {column: (None if _missing(value) else value) for column, value in zip(columns, row)}
+        for row in zip(*values)
+    ]
+
+
+class SnapshotState:
+    """One version of a table: the frame and the indexes built over it.
+
+    A load builds a new state and publishes it with a single reference swap
+    (TableSnapshot.state), so a reader holding a state never pairs an index
+    with another load's frame. Appends extend the current state in place,
+    under TableSnapshot's lock; readers that use more than one part of the
+    state take it with TableSnapshot.reading().
+    """
+
+    def __init__(self, sport: str, frame: pd.DataFrame, source: str, version: int, loaded_at: Optional[float] = None):
+        hash_columns, sorted_columns = INDEXED_COLUMNS.get(sport, ([], []))
+        self.sport = sport
+        self.index = TableIndex(
+            frame,
+            hash_columns=[_resolve(frame, column) for column in hash_columns],
+            sorted_columns=[_resolve(frame, column) for column in sorted_columns],
+        )
+        self.features = FeatureStore(sport, frame)
+        self.similarity: Optional[SimilarityIndex] = None
+        if sport in EMBEDDING_COLUMNS:
+            self.similarity = SimilarityIndex.from_features(self.features, frame)
+        self.search_index = NameIndex(sport, frame)
+        self.frame = frame
+        self.source = source
+        self.version = version
+        self.loaded_at = time.time() if loaded_at is None else loaded_at
+
+    def column(self, name: str) -> str:
+        """Resolve a column name case-insensitively (the warehouse may upper-case them)"""
+        resolved = _resolve(self.frame, name)
+        if resolved not in self.frame.columns:
+            raise KeyError(name)
+        return resolved
+
+    def append(self, rows: List[Dict]):
+        """Add rows to the frame and update the indexes in place rather than rebuilding them"""
+        if not rows:
+            return
+        frame = self.frame
+        rows = [{self.column(name): value for name, value in row.items()} for row in rows]
+        new_frame = pd.concat([frame, pd.DataFrame(rows)], ignore_index=True)
+        self.index.frame = new_frame
+        for offset, row in enumerate(rows):
+            self.index.add(row, len(frame) + offset)
+        self.features.append(rows)
+        if self.similarity is not None:
+            self.similarity.append_rows(rows)
+        self.search_index.append_rows(rows)
+        self.frame = new_frame
+        self.version += 1
+
+    def select(
+        self,
+        equals: Optional[Dict] = None,
+        ranges: Optional[Dict[str, Tuple]] = None,
+        ordering: Optional[Sequence[Tuple[str, bool]]] = None,
+        after: Optional[Sequence] = None,
+        limit: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> List[Dict]:
+        """Filter, keyset-paginate and order rows in memory.
+
+        Mirrors the warehouse queries: ``equals`` maps columns to required
+        values, ``ranges`` maps columns to inclusive (low, high) bounds where
+        either may be None, ``after`` holds the key values of the last row
+        of the previous page in ``ordering`` and ``columns`` is the projection
+        (None for all columns).
+        """
+        selected = self.filter(equals, ranges)
+        if ordering and after is not None:
+            selected = selected[self._after_mask(selected, ordering, after)]
+        if ordering:
+            selected = selected.sort_values(
+                [self.column(name) for name, _ in ordering],
+                ascending=[not desc for _, desc in ordering],
+                kind="stable",
+            )
+        if limit is not None:
+            selected = selected.head(limit)
+        return records(self._project(selected, columns))
+
+    def filter(self, equals: Optional[Dict] = None, ranges: Optional[Dict[str, Tuple]] = None) -> pd.DataFrame:
+        """Rows matching ``equals`` and ``ranges`` (see select)"""
+        frame = self.frame
+        positions = self.positions(equals, ranges)
+        return frame if positions is None else frame.iloc[positions]
+
+    def positions(self, equals: Optional[Dict] = None, ranges: Optional[Dict[str, Tuple]] = None) -> Optional[np.ndarray]:
+        """Sorted row positions matching the filters, or None to mean all rows.
+
+        Uses the secondary indexes when they cover the filters.
+        """
+        frame, index = self.frame, self.index
+        equals = {self.column(name): value for name, value in (equals or {}).items()}
+        ranges = {self.column(name): bounds for name, bounds in (ranges or {}).items()}
+        if index.covers(equals, ranges):
+            return index.lookup(equals, ranges)
+        return linear_scan(frame, equals, ranges)
+
+    def positions_in(self, name: str, values: Sequence) -> np.ndarray:
+        """Row positions (also rows of the feature store) whose ``name`` column is one of ``values``"""
+        column = self.column(name)
+        if column in self.index.sorted:
+            return self.index.sorted[column].lookup(list(values))
+        return np.flatnonzero(self.frame[column].isin(list(values)).to_numpy())
+
+    def records_at(self, positions: np.ndarray, columns: Optional[Sequence[str]] = None) -> List[Dict]:
+        return records(self._project(self.frame.iloc[positions], columns))
+
+    def _project(self, frame: pd.DataFrame, columns: Optional[Sequence[str]]) -> pd.DataFrame:
+        """Only ``columns`` of ``frame``, so records() converts no more than is returned"""
+        if columns is None:
+            return frame
+        return frame[[self.column(name) for name in columns]]
+
+    def _after_mask(self, frame, ordering, after) -> np.ndarray:
+        """Rows after the ``after`` key, with NULLs last (see pagination.keyset_clause)"""
+        mask = np.zeros(len(frame), dtype=bool)
+        prefix = np.ones(len(frame), dtype=bool)
+        for (name, desc), value in zip(ordering, after):
+            values = frame[self.column(name)]
+            null = values.isna().to_numpy()
+            if value is None:
+                prefix &= null
+                continue
+            # pandas compares missing values as False, where NumPy object arrays raise
+            beyond = (values < value) if desc else (values > value)
+            mask |= prefix & (beyond.to_numpy(dtype=bool, na_value=False) | null)
+            prefix &= (values == value).to_numpy(dtype=bool, na_value=False)
+        return mask
+
+
+    def stats(self) -> Dict:
+        return {
+            "rows": len(self.frame),
+            "bytes": int(self.frame.memory_usage(deep=True).sum()),
+            "source": self.source,
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+        }
+
+
+class TableSnapshot:
+    """In-memory columnar copy of one player table.
+
+    The table is held as a pandas DataFrame (one NumPy array per column) and
+    persisted to a local Parquet file so a restarted worker can serve reads
+    before the warehouse reload finishes. Each load builds a new
+    SnapshotState off to the side and swaps it in under the lock; appends
+    and readers take the same lock, so a reader never sees a half-applied
+    load or append.
+
+    With write-behind on, rows still queued for the warehouse are laid over
+    the loaded table: every load takes them from the queue (``queued``)
+    again, so a reload never drops a row that was accepted but not yet
+    written, and a row the queue gives up on is gone after the next load.
+    """
+
+    def __init__(self, sport: str, directory: str = SNAPSHOT_DIR):
+        self.sport = sport
+        self.table = TABLES[sport]
+        self.path = os.path.join(directory, f"{sport}.parquet")
+        self.state: Optional[SnapshotState] = None
+        # Writes made by other processes since the load started (see invalidate)
+        self.changes = 0
+        self._loaded_changes = 0
+        # (row count, row hash) the frame matches; None once rows were appended locally
+        self._fingerprint: Optional[Tuple] = None
+        # Reads the rows queued for this table as (write ID, row) (see SnapshotManager.overlay)
+        self.queued: Optional[Callable[[str], List[Tuple[int, Dict]]]] = None
+        # Write IDs of the queued rows in the frame
+        self._queued_ids = set()
+        # Held briefly: to swap in a loaded state, to append, and to read
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_frame(cls, sport: str, frame: pd.DataFrame, source: str = "warehouse") -> "TableSnapshot":
+        """A standalone snapshot over ``frame`` that is never persisted or refreshed"""
+        snapshot = cls(sport)
+        snapshot.state = SnapshotState(sport, _compact(frame), source, 1)
+        return snapshot
+
+    @property
+    def ready(self) -> bool:
+        return self.state is not None
+
+    @property
+    def stale(self) -> bool:
+        """True while a write made by another process is not in the frame yet"""
+        return self.changes != self._loaded_changes
+
+    def invalidate(self):
+        """Note a write to the table by another process; cleared by the next load()"""
+        self.changes += 1
+
+    @contextlib.contextmanager
+    def reading(self) -> Iterator[SnapshotState]:
+        """The current state, held still for a read that uses more than one part of it"""
+        with self._lock:
+            yield self.state
+
+    # The current state's parts, for reads that use only one of them
+
+    @property
+    def frame(self) -> Optional[pd.DataFrame]:
+        state = self.state
+        return state.frame if state is not None else None
+
+    @property
+    def features(self) -> Optional[FeatureStore]:
+        state = self.state
+        return state.features if state is not None else None
+
+    @property
+    def loaded_at(self) -> Optional[float]:
+        state = self.state
+        return state.loaded_at if state is not None else None
+
+    @property
+    def source(self) -> Optional[str]:
+        state = self.state
+        return state.source if state is not None else None
+
+    @property
+    def version(self) -> int:
+        state = self.state
+        return state.version if state is not None else 0
+
+    def column(self, name: str) -> str:
+        return self.state.column(name)
+
+    def select(self, *args, **kwargs) -> List[Dict]:
+        """See SnapshotState.select"""
+        with self.reading() as state:
+            return state.select(*args, **kwargs)
+
+    def filter(self, equals: Optional[Dict] = None, ranges: Optional[Dict[str, Tuple]] = None) -> pd.DataFrame:
+        with self.reading() as state:
+            return state.filter(equals, ranges)
+
+    def positions(self, equals: Optional[Dict] = None, ranges: Optional[Dict[str, Tuple]] = None) -> Optional[np.ndarray]:
+        with self.reading() as state:
+            return state.positions(equals, ranges)
+
+    def positions_in(self, name: str, values: Sequence) -> np.ndarray:
+        with self.reading() as state:
+            return state.positions_in(name, values)
+
+    def records_at(self, positions: np.ndarray, columns: Optional[Sequence[str]] = None) -> List[Dict]:
+        with self.reading() as state:
+            return state.records_at(positions, columns)
+
+    def _publish(self, frame: pd.DataFrame, source: str) -> bool:
+        """Build a state over ``frame`` and swap it in with the queued rows it does not
+        hold yet; True if there were any.
+
+        The indexes are built before taking the lock, so readers only wait
+        for the queue read and the swap. The queue is read under the lock, so
+        rows queued meanwhile are either read here or added by append_queued,
+        never both; a row written to the warehouse but not yet removed from
+        the queue is recognised by its ID.
+        """
+        state = SnapshotState(self.sport, frame, source, 0)
+        with self._lock:
+            queued = self.queued(self.sport) if self.queued is not None else []
+            self._queued_ids = {write_id for write_id, _ in queued}
+            rows = []
+            if queued:
+                id_column = _resolve(frame, ID_COLUMNS[self.sport])
+                held = set(frame[id_column].dropna().tolist()) if id_column in frame.columns else set()
+                rows = [{_resolve(frame, name): value for name, value in row.items()} for _, row in queued]
+                rows = [row for row in rows if row.get(id_column) not in held]
+                # Not published yet: no reader can see the append
+                state.append(rows)
+            state.version = self.version + 1
+            self.state = state
+        return bool(rows)
+
+    def load_local(self) -> bool:
+        """Load the persisted Parquet snapshot, if there is one"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            frame = pd.read_parquet(self.path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable {self.sport} snapshot {self.path}: {str(e)}")
+            return False
+        self._publish(frame, "local")
+        logger.info(f"Loaded {len(frame)} {self.sport} rows from {self.path}")
+        return True
+
+    def save_local(self, frame: Optional[pd.DataFrame] = None):
+        frame = self.frame if frame is None else frame
+        if frame is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Per process: several workers may persist the same table at once
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            frame.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Failed to persist {self.sport} snapshot: {str(e)}")
+
+    def _read_fingerprint(self, conn) -> Tuple:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(table_fingerprint(self.sport).sql)
+            return tuple(cursor.fetchone())
+        finally:
+            cursor.close()
+
+    def load(self, conn):
+        """Reload the whole table from the warehouse"""
+        changes = self.changes
+        # Read first: a write landing before the SELECT makes the frame newer
+        # than the fingerprint, which costs one extra reload, never a missed change
+        fingerprint = self._read_fingerprint(conn)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(all_players(self.sport).sql)
+            if hasattr(cursor, "fetch_pandas_all"):
+                frame = cursor.fetch_pandas_all()
+            else:
+                columns = [col[0] for col in cursor.description]
+                frame = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+        finally:
+            cursor.close()
+        frame = _compact(frame)
+        overlaid = self._publish(frame, "warehouse")
+        with self._lock:
+            self._loaded_changes = changes
+            # Queued rows are not in the warehouse yet: compare row counts, as after append_rows
+            self._fingerprint = None if overlaid else fingerprint
+        logger.info(f"Loaded {len(frame)} {self.sport} rows from the warehouse")
+        # Only the warehouse's rows: the queue is read again on the next load
+        self.save_local(frame)
+
+    def refresh(self, conn) -> bool:
+        """Reload from the warehouse if the table changed; True if reloaded.
+
+        Changes are detected with the row count and an order-independent
+        hash of every row (query_builder.table_fingerprint), so updates and
+        deletes by other processes are caught as well as inserts. Rows
+        appended through the API change the hash without a reload; the next
+        refresh then only has the count to compare against and takes its
+        fingerprint as the new baseline. A full reload every
+        SNAPSHOT_FULL_RELOAD_INTERVAL bounds how long a change made in that
+        window can go unseen.
+        """
+        if self.state is None or self.source != "warehouse" or self.stale or self.reload_due:
+            self.load(conn)
+            return True
+        fingerprint = self._read_fingerprint(conn)
+        with self._lock:
+            if self._fingerprint is None:
+                unchanged = fingerprint[0] == len(self.state.frame)
+                if unchanged:
+                    self._fingerprint = fingerprint
+            else:
+                unchanged = fingerprint == self._fingerprint
+        if unchanged:
+            return False
+        self.load(conn)
+        return True
+
+    @property
+    def reload_due(self) -> bool:
+        loaded_at = self.loaded_at
+        return (
+            SNAPSHOT_FULL_RELOAD_INTERVAL > 0
+            and loaded_at is not None
+            and time.time() - loaded_at >= SNAPSHOT_FULL_RELOAD_INTERVAL
+        )
+
+    def append_rows(self, rows: List[Dict]):
+        """Add rows written through the API without a warehouse round trip"""
+        with self._lock:
+            self._append(rows)
+
+    def append_queued(self, write_ids: List[int], rows: List[Dict]):
+        """Add rows just queued for the warehouse, unless a load already read them from the queue"""
+        with self._lock:
+            self._append([row for write_id, row in zip(write_ids, rows) if write_id not in self._queued_ids])
+            self._queued_ids.update(write_ids)
+
+    def _append(self, rows: List[Dict]):
+        if self.state is None or not rows:
+            return
+        self.state.append(rows)
+        self._fingerprint = None
+
+    def stats(self) -> Dict:
+        state = self.state
+        if state is None:
+            stats = {"rows": 0, "bytes": 0, "source": None, "version": 0, "loaded_at": None}
+        else:
+            stats = state.stats()
+        return {"ready": state is not None, **stats, "stale": self.stale}
+
+def _resolve(frame: pd.DataFrame, name: str) -> str:
+    if name in frame.columns:
+        return name
+    for column in frame.columns:
+        if column.upper() == name.upper():
+            return column
+    return name
+
+
+class SnapshotManager:
+    """Loads the player snapshots at startup and keeps them fresh"""
+
+    def __init__(self, sports: Sequence[str] = ("cricket", "football")):
+        self.snapshots = {sport: TableSnapshot(sport) for sport in sports}
+        self.enabled = os.getenv("SNAPSHOT_ENABLED", "1") == "1"
+        self.refresh_interval = float(os.getenv("SNAPSHOT_REFRESH_INTERVAL", "300"))
+        self._task = None
+        self._run_query: Optional[Callable] = None
+        self._reloads: Dict[str, asyncio.Task] = {}
+        self._listeners: List[Callable[[TableSnapshot], None]] = []
+
+    def subscribe(self, listener: Callable[[TableSnapshot], None]):
+        """Call ``listener(snapshot)`` on the event loop after a refresh changed a table"""
+        self._listeners.append(listener)
+
+    def overlay(self, queued: Callable[[str], List[Tuple[int, Dict]]]):
+        """Lay the rows ``queued(sport)`` returns, as (write ID, row), over every
+        table on load: rows accepted by the write-behind queue but not written yet"""
+        for snapshot in self.snapshots.values():
+            snapshot.queued = queued
+
+    def __getitem__(self, sport: str) -> TableSnapshot:
+        return self.snapshots[sport]
+
+    def ready(self, sport: str) -> bool:
+        snapshot = self.snapshots[sport]
+        return self.enabled and snapshot.ready and not snapshot.stale
+
+    @property
+    def loaded(self) -> bool:
+        """True once every table has been loaded, from its local file or the warehouse
+        (always when snapshots are off: reads then go to the warehouse)"""
+        return not self.enabled or all(snapshot.ready for snapshot in self.snapshots.values())
+
+    async def wait_loaded(self):
+        """Return once every table is loaded (at once when snapshots are off)"""
+        while not self.loaded:
+            await asyncio.sleep(0.05)
+
+    def load_local(self):
+        for snapshot in self.snapshots.values():
+            if not snapshot.ready:
+                snapshot.load_local()
+
+    def preload(self, connect: Callable):
+        """Load every table now, before the server forks its workers (see server.py).
+
+        ``connect`` opens a dedicated connection; tables that fail to load
+        fall back to their local file.
+        """
+        if not self.enabled:
+            return
+        for snapshot in self.snapshots.values():
+            try:
+                conn = connect()
+                try:
+                    snapshot.load(conn)
+                finally:
+                    conn.close()
+            except Exception as e:
+                logger.error(f"Failed to preload {snapshot.sport} snapshot: {str(e)}")
+                snapshot.load_local()
+
+    def invalidate(self, sport: str):
+        """``sport`` changed in a way the snapshot cannot apply in place (another process
+        wrote to it, or queued rows were dropped): serve it from the warehouse until reloaded"""
+        snapshot = self.snapshots[sport]
+        if not self.enabled or not snapshot.ready:
+            return
+        snapshot.invalidate()
+        if self._run_query is not None and sport not in self._reloads:
+            self._reloads[sport] = asyncio.ensure_future(self._reload(snapshot))
+
+    async def _reload(self, snapshot: TableSnapshot):
+        try:
+            # Loop in case more writes arrive while loading; on failure the
+            # scheduled refresh retries, as refresh() reloads stale tables
+            while snapshot.stale:
+                await self._run_query(snapshot.load, timeout=max(self.refresh_interval, 60))
+        except Exception as e:
+            logger.error(f"Failed to reload {snapshot.sport} snapshot: {str(e)}")
+        finally:
+            self._reloads.pop(snapshot.sport, None)
+
+    async def start(self, run_query: Callable):
+        """In the background, warm from local files (tables not preloaded), then load
+        from the warehouse and refresh on a schedule.
+
+        ``run_query`` is an async callable running ``fn(conn)`` with a pooled
+        connection, i.e. the query executor.
+        """
+        if not self.enabled:
+            return
+        self._run_query = run_query
+        self._task = asyncio.ensure_future(self._refresh_loop(run_query))
+
+    async def _refresh_loop(self, run_query: Callable):
+        # Reading and indexing the Parquet files is CPU-bound; keep it off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self.load_local)
+        delay = LOAD_RETRY_DELAY
+        while True:
+            await self.refresh(run_query)
+            if all(snapshot.source == "warehouse" for snapshot in self.snapshots.values()):
+                delay = LOAD_RETRY_DELAY
+                await asyncio.sleep(self.refresh_interval)
+                continue
+            # A table is still unloaded (or only holds its local file): retry soon
+            # rather than serving nothing, or old data, for a whole refresh interval
+            await asyncio.sleep(min(delay, self.refresh_interval))
+            delay *= 2
+
+    async def refresh(self, run_query: Callable):
+        for snapshot in self.snapshots.values():
+            try:
+                # Refreshes are background work: allow them longer than a request
+                changed = await run_query(snapshot.refresh, timeout=max(self.refresh_interval, 60))
+            except Exception as e:
+                logger.error(f"Failed to refresh {snapshot.sport} snapshot: {str(e)}")
+                continue
+            if changed:
+                for listener in self._listeners:
+                    listener(snapshot)
+
+    async def stop(self):
+        for task in list(self._reloads.values()):
+            task.cancel()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "refresh_interval_seconds": self.refresh_interval,
+            "tables": {sport: snapshot.stats() for sport, snapshot in self.snapshots.items()},
+        }
+
+
+snapshots = SnapshotManager()
@@ -0,0 +1,111 @@
+import datetime
+import decimal
+import json
+import logging
+import os
+import threading
+from typing import Iterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+
+import db
+from metrics import record_rows, timed
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+
+
+def json_default(value):
+    """Encode warehouse types the stdlib json module does not know about"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def wants_ndjson(request, stream: bool = False) -> bool:
+    """True if the client asked for a streamed NDJSON response"""
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+class RowStream:
+    """Executed query whose rows are fetched in batches and encoded as NDJSON.
+
+    The pooled connection is held until the rows are exhausted or close() is
+    called, so only one batch of rows is ever in memory. Serve it with
+    RowStreamResponse, which closes it however the response ends.
+    """
+
+    def __init__(self, query: str, params=None, batch_size: Optional[int] = None):
+        self.batch_size = batch_size or STREAM_BATCH_SIZE
+        self.rows_sent = 0
+        # Held while fetching, so close() from another thread waits for the batch
+        self._lock = threading.Lock()
+        self._conn = db.get_connection()
+        try:
+            self._cursor = self._conn.cursor()
+            with timed("execute"):
+                self._cursor.execute(query, params)
+            self.columns = [col[0] for col in self._cursor.description]
+        except Exception:
+            self._conn.close()
+            raise
+
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            while True:
+                with self._lock, timed("fetch"):
+                    if self._conn is None:
+                        break
+                    rows = self._cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                self.rows_sent += len(rows)
+                with timed("render"):
+                    batch = "".join(
+                        json.dumps(dict(zip(self.columns, row)), default=json_default) + "\n"
+                        for row in rows
+                    ).encode("utf-8")
+                yield batch
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            logger.error(f"Error streaming rows after {self.rows_sent} rows: {str(e)}")
+            yield (json.dumps({"status": "error", "message": "Stream interrupted", "error": str(e)}) + "\n").encode("utf-8")
+        finally:
+            self.close()
+
+    def close(self):
+        with self._lock:
+            conn, self._conn = self._conn, None
+            if conn is None:
+                return
+            record_rows(self.rows_sent)
+            try:
+                self._cursor.close()
+            finally:
+                conn.close()
+
+
+class RowStreamResponse(StreamingResponse):
+    """NDJSON response streaming a RowStream.
+
+    The stream's iterator closes it when the rows run out, but a client that
+    goes away before the body starts leaves the iterator unstarted, so the
+    response also closes it once it is done, whichever way it ends.
+    """
+
+    def __init__(self, rows: RowStream, headers=None):
+        super().__init__(iter(rows), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+        self.rows = rows
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await run_in_threadpool(self.rows.close)
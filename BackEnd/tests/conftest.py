@@ -0,0 +1,61 @@
+"""The API under test serves a small seeded SQLite database (the sqlite
+backend, see benchmarks/warehouse.py) with snapshots off. Tests of the
+snapshot read path build TableSnapshot objects directly."""
+import asyncio
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BACKEND_DIR, os.path.join(BACKEND_DIR, "benchmarks")]
+
+import warehouse  # noqa: E402
+
+DATA_DIR = tempfile.mkdtemp(prefix="sportsanalytics-tests-")
+DATABASE = os.path.join(DATA_DIR, "players.db")
+ROWS = {"cricket": 200, "football": 200}
+
+# Read by the app's modules at import time
+warehouse.install(DATABASE)
+os.environ["SNAPSHOT_ENABLED"] = "0"
+os.environ["SNAPSHOT_DIR"] = os.path.join(DATA_DIR, "snapshots")
+os.environ["PLAYER_CACHE_MAX_ENTRIES"] = "0"
+os.environ["PREDICTION_MODEL_DIR"] = os.path.join(DATA_DIR, "models")
+os.environ.pop("WRITE_BEHIND_ENABLED", None)
+os.environ.pop("SHARED_CACHE_PATH", None)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    warehouse.seed(DATABASE, ROWS)
+    yield DATABASE
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+@contextlib.asynccontextmanager
+async def serving():
+    """Run the app's startup and shutdown around an in-process client"""
+    import httpx
+    import app
+
+    await app.open_connection_pool()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://test") as client:
+            yield client
+    finally:
+        await app.close_connection_pool()
+
+
+@pytest.fixture
+def api():
+    """Call ``api(scenario)`` to await ``scenario(client)`` against a started app"""
+    def run(scenario):
+        async def main():
+            async with serving() as client:
+                return await scenario(client)
+        return asyncio.run(main())
+    return run
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from aggregates import group_stats, histogram, summary, top_k, top_k_per_group
+
+
+def frame():
+    rng = np.random.default_rng(7)
+    runs = rng.integers(0, 50, 300).astype(float)
+    runs[::11] = np.nan
+    teams = rng.choice(["India", "England", "Australia", None], 300)
+    return pd.DataFrame({"Team": teams, "RUNS": runs})
+
+
+def test_top_k_matches_a_stable_sort_without_nulls():
+    players = frame()
+    for descending in (True, False):
+        expected = players.dropna(subset=["RUNS"]).sort_values("RUNS", ascending=not descending, kind="stable")
+        # Column names resolve case-insensitively, as the warehouse upper-cases them
+        found = top_k(players, "Runs", 25, descending=descending)
+        assert found.index.tolist() == expected.index[:25].tolist()
+    assert top_k(players, "Runs", 0).empty
+
+
+def test_top_k_per_group_matches_top_k_within_each_group():
+    players = frame()
+    found = top_k_per_group(players, "Team", "Runs", 5)
+    for team, rows in players.groupby("Team"):
+        assert found[team].index.tolist() == top_k(rows, "Runs", 5).index.tolist()
+
+
+def test_summaries_skip_nulls():
+    players = frame()
+    runs = players["RUNS"].dropna()
+    assert summary(players, "Runs") == {
+        "count": len(runs), "mean": round(runs.mean(), 4), "min": runs.min(), "max": runs.max(), "sum": runs.sum(),
+    }
+    assert summary(players.assign(RUNS=np.nan), "Runs") is None
+
+    stats = group_stats(players, "Team", "Runs", sort="sum")
+    expected = players.dropna(subset=["Team", "RUNS"]).groupby("Team")["RUNS"].agg(["count", "sum"])
+    assert [row["Team"] for row in stats] == expected.sort_values("sum", ascending=False).index.tolist()
+    assert {row["Team"]: (row["count"], row["sum"]) for row in stats} == {
+        team: (count, total) for team, (count, total) in expected.iterrows()
+    }
+
+
+def test_histogram_counts_every_value_once():
+    players = frame()
+    result = histogram(players, "Runs", bins=7)
+    assert len(result["bins"]) == 7
+    assert sum(bin["count"] for bin in result["bins"]) + result["missing"] == len(players)
+    assert result["missing"] == players["RUNS"].isna().sum()
+    # A constant column still gets a non-empty range
+    flat = histogram(players.assign(RUNS=3.0), "Runs", bins=2)
+    assert flat["bins"][0]["low"] == 3.0 and sum(bin["count"] for bin in flat["bins"]) == len(players)
@@ -0,0 +1,99 @@
+import asyncio
+
+import cache
+from cache import QueryCache, make_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock.monotonic)
+    results = QueryCache(ttl=10)
+    results.set("cricket", "key", [1])
+    clock.now += 9.9
+    assert results.get("key") == [1]
+    clock.now += 0.1
+    assert results.get("key") is None
+    assert results.stats()["expirations"] == 1 and results.stats()["entries"] == 0
+
+
+def test_the_least_recently_used_entry_is_evicted():
+    results = QueryCache(max_entries=2)
+    results.set("cricket", "a", 1)
+    results.set("cricket", "b", 2)
+    assert results.get("a") == 1  # b is now the least recently used
+    results.set("football", "c", 3)
+    assert results.get("b") is None
+    assert (results.get("a"), results.get("c")) == (1, 3)
+    assert results.stats()["evictions"] == 1
+
+
+def test_concurrent_misses_share_one_load():
+    results = QueryCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["row"]
+
+    async def main():
+        key = make_key("cricket/players", team="India", format=None)
+        loaded = await asyncio.gather(*(results.get_or_load("cricket", key, loader) for _ in range(5)))
+        again = await results.get_or_load("cricket", key, loader)
+        return loaded, again
+
+    loaded, again = asyncio.run(main())
+    assert loaded == [["row"]] * 5 and again == ["row"]
+    assert len(calls) == 1
+    stats = results.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 4, 1)
+
+
+def test_a_load_overtaken_by_an_invalidation_is_not_stored():
+    results = QueryCache()
+    key = make_key("cricket/players/all")
+
+    async def main():
+        loading = asyncio.Event()
+        release = asyncio.Event()
+
+        async def stale_loader():
+            loading.set()
+            await release.wait()
+            return ["before the write"]
+
+        async def fresh_loader():
+            return ["after the write"]
+
+        pending = asyncio.ensure_future(results.get_or_load("cricket", key, stale_loader))
+        await loading.wait()
+        results.invalidate("cricket")
+        release.set()
+        # The callers already waiting still get the result they asked for...
+        stale = await pending
+        # ...but the next read loads again instead of seeing it
+        fresh = await results.get_or_load("cricket", key, fresh_loader)
+        return stale, fresh
+
+    stale, fresh = asyncio.run(main())
+    assert stale == ["before the write"]
+    assert fresh == ["after the write"]
+    assert results.get(key) == ["after the write"]
+
+
+def test_invalidate_only_drops_its_table():
+    results = QueryCache()
+    results.set("cricket", "a", 1)
+    results.set("football", "b", 2)
+    results.invalidate("cricket")
+    assert results.get("a") is None
+    assert results.get("b") == 2
+    assert results.generation("cricket") == 1 and results.generation("football") == 0
@@ -0,0 +1,27 @@
+"""ETags and 304s on the player list endpoints."""
+
+
+def test_no_validators_when_reads_go_to_the_warehouse(api):
+    async def scenario(client):
+        return await client.get("/football/players", headers={"If-None-Match": "*"})
+
+    response = api(scenario)
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+
+
+def test_invalid_parameters_are_rejected_before_revalidation(api, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app.table_versions, "enabled", True)
+
+    async def scenario(client):
+        valid = await client.get("/football/players")
+        invalid = await client.get(
+            "/football/players", params={"sort": "NoSuchColumn"}, headers={"If-None-Match": "*"}
+        )
+        return valid, invalid
+
+    valid, invalid = api(scenario)
+    assert "etag" in valid.headers
+    assert invalid.status_code == 400
@@ -0,0 +1,45 @@
+from test_health import wait_ready
+
+
+def test_unknown_ids_skip_the_probe_once_the_directory_is_complete(api, monkeypatch):
+    import app
+
+    probes = []
+    real_probe = app.probe_player_ids
+
+    def probe(conn, sports, player_ids):
+        probes.append(list(sports))
+        return real_probe(conn, sports, player_ids)
+
+    monkeypatch.setattr(app, "probe_player_ids", probe)
+
+    async def scenario(client):
+        await wait_ready(client)
+        unknown = await client.post("/predict", json={"player_ids": [10 ** 9]})
+        app.directory.invalidate("football")
+        after_invalidate = await client.post("/predict", json={"player_ids": [10 ** 9 + 1]})
+        known = await client.post("/predict", json={"player_ids": [1, 2]})
+        return unknown, after_invalidate, known
+
+    unknown, after_invalidate, known = api(scenario)
+    assert unknown.status_code == after_invalidate.status_code == known.status_code == 200
+    assert unknown.json()["prediction"] is None
+    # Only the table the directory no longer holds completely is probed
+    assert probes == [["football"]]
+    assert known.json()["prediction"] is not None
+
+
+def test_a_complete_reload_drops_ids_no_longer_in_the_table():
+    from directory import PlayerDirectory
+
+    directory = PlayerDirectory(("cricket", "football"))
+    directory.add("cricket", [1, 2], complete=True)
+    directory.add("football", [2], complete=True)
+
+    directory.listing("cricket")
+    directory.add("cricket", [3])  # inserted while the listing was read
+    directory.add("cricket", [1], complete=True)
+
+    found, unknown = directory.locate([1, 2, 3, 4])
+    assert found == {"cricket": [1, 3], "football": [2]}
+    assert unknown == [4]
@@ -0,0 +1,35 @@
+import threading
+
+import encoding
+
+
+def test_large_responses_are_encoded_and_compressed_off_the_event_loop(api, monkeypatch):
+    threads = {}
+    render, compress = encoding._render, encoding._compress
+
+    def recording(stage, fn):
+        def run(*args):
+            threads[stage] = threading.current_thread()
+            return fn(*args)
+        return run
+
+    monkeypatch.setattr(encoding, "_render", recording("render", render))
+    monkeypatch.setattr(encoding, "_compress", recording("compress", compress))
+
+    async def scenario(client):
+        threads.clear()
+        small = await client.get("/cricket/players?limit=5", headers={"Accept-Encoding": "gzip"})
+        inline = dict(threads)
+        monkeypatch.setattr(encoding, "OFFLOAD_MIN_ROWS", 5)
+        monkeypatch.setattr(encoding, "OFFLOAD_MIN_BYTES", 0)
+        threads.clear()
+        large = await client.get("/cricket/players?limit=5", headers={"Accept-Encoding": "gzip"})
+        return small, inline, large, dict(threads)
+
+    small, inline, large, offloaded = api(scenario)
+    loop_thread = threading.main_thread()
+    assert inline == {"render": loop_thread, "compress": loop_thread}
+    assert offloaded["render"] is not loop_thread and offloaded["compress"] is not loop_thread
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.json() == small.json()
+    assert large.json()["count"] == 5
@@ -0,0 +1,22 @@
+import db
+from executor import _QueryHandle
+
+
+def test_cancel_reaches_the_connection_while_the_query_holds_it(monkeypatch):
+    cancelled = []
+    monkeypatch.setattr(db, "cancel_running_queries", cancelled.append)
+    handle, conn = _QueryHandle(), object()
+    assert handle.attach(conn)
+    handle._cancel(conn)
+    assert cancelled == [conn]
+
+
+def test_cancel_after_the_connection_went_back_to_the_pool_is_dropped(monkeypatch):
+    cancelled = []
+    monkeypatch.setattr(db, "cancel_running_queries", cancelled.append)
+    handle, conn = _QueryHandle(), object()
+    handle.attach(conn)
+    # The cancel thread starts only after the worker finished and released the connection
+    handle.detach()
+    handle._cancel(conn)
+    assert cancelled == []
@@ -0,0 +1,40 @@
+import pytest
+
+from pagination import resolve_sort
+from query_builder import all_players, filtered_players
+from schema import InvalidFieldsError, parse_fields, with_columns
+
+
+def test_fields_are_matched_case_insensitively_in_the_order_given():
+    assert parse_fields("football", "overall, NAME,overall,") == ["Overall", "Name"]
+    assert parse_fields("football", "") is None
+    with pytest.raises(InvalidFieldsError, match="Salary"):
+        parse_fields("football", "Name,Salary")
+
+
+def test_the_projection_is_pushed_down_to_sql():
+    assert all_players("football", ["Name", "Overall"]).sql.startswith("SELECT Name, Overall FROM")
+    ordering = resolve_sort("football", "age", "asc")
+    # The sort keys are fetched for the cursor even when not requested
+    selected = with_columns(["Name"], [column for column, _ in ordering])
+    statement, _ = filtered_players("football", {}, ordering, None, 5, selected)
+    assert statement.sql.startswith("SELECT Name, Age, PlayerID FROM")
+
+
+def test_pages_return_only_the_requested_fields(api):
+    async def scenario(client):
+        first = await client.get("/football/players", params={"fields": "name,overall", "sort": "age", "limit": 5})
+        second = await client.get(
+            "/football/players",
+            params={"fields": "name,overall", "sort": "age", "limit": 5, "cursor": first.json()["next_cursor"]},
+        )
+        unknown = await client.get("/football/players", params={"fields": "name,salary"})
+        return first, second, unknown
+
+    first, second, unknown = api(scenario)
+    assert first.status_code == second.status_code == 200
+    for page in (first.json(), second.json()):
+        assert len(page["data"]) == 5
+        assert all(list(row) == ["Name", "Overall"] for row in page["data"])
+    assert unknown.status_code == 400
+    assert "salary" in unknown.json()["detail"]["error"]
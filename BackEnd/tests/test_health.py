@@ -0,0 +1,72 @@
+import asyncio
+
+from health import Readiness
+
+
+async def wait_ready(client, timeout: float = 10.0):
+    for _ in range(int(timeout / 0.05)):
+        response = await client.get("/readyz")
+        if response.status_code == 200:
+            break
+        await asyncio.sleep(0.05)
+    return response
+
+
+def test_ready_with_snapshots_off(api):
+    async def scenario(client):
+        health = await client.get("/healthz")
+        return health, await wait_ready(client)
+
+    health, ready = api(scenario)
+    assert health.status_code == 200
+    assert ready.status_code == 200
+    assert ready.json()["status"] == "ready"
+    assert ready.json()["checks"] == {"pool": True, "models": True, "snapshots": True, "directory": True}
+
+
+def test_not_ready_after_shutdown(api):
+    import app
+
+    api(wait_ready)
+    ready, checks = app.readiness.status()
+    assert not ready
+    assert app.readiness.stopping
+
+
+def test_readiness_latches():
+    readiness = Readiness()
+    state = {"warm": False}
+    readiness.add("warm", lambda: state["warm"])
+    readiness.add("broken", lambda: 1 / 0 if not state["warm"] else True)
+    assert readiness.status() == (False, {"warm": False, "broken": False})
+    state["warm"] = True
+    # Passing checks are reported, but only the end of the warm-up makes the worker ready
+    assert readiness.status() == (False, {"warm": True, "broken": True})
+    readiness.warmed()
+    assert readiness.status()[0]
+    state["warm"] = False
+    # A check failing later (e.g. during a snapshot reload) keeps the worker ready
+    assert readiness.status()[0]
+    readiness.stop()
+    assert not readiness.status()[0]
+
+
+def test_importing_the_app_defers_numpy_and_pandas():
+    import os
+    import subprocess
+    import sys
+
+    code = "import sys, app; print(sorted(m for m in ('numpy', 'pandas') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_metrics_do_not_open_the_pool():
+    import db
+    import app
+
+    db.close_pool()
+    assert "sportsanalytics_pool_size" not in app.registry.render()
+    assert not db.pool_open()
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from index import TableIndex, linear_scan
+
+
+@pytest.mark.parametrize("ranges", [
+    {"Runs": (50, None)},
+    {"Runs": (None, 50)},
+    {"Runs": (None, None)},
+    {"Runs": (10.5, 70)},
+    {"Average": (20, None)},
+])
+def test_range_matches_a_linear_scan_over_a_column_with_nulls(ranges):
+    frame = pd.DataFrame({
+        "Team": ["a", "b", "a", "b", "a", "b"],
+        "Runs": [10.0, np.nan, 90.0, 50.0, np.nan, 70.0],
+        "Average": [np.nan, 30, 20, np.nan, 10, 40],
+    })
+    index = TableIndex(frame, ["Team"], ["Runs", "Average"])
+    for equals in ({}, {"Team": "a"}):
+        found = index.lookup(equals, ranges)
+        expected = linear_scan(frame, equals, ranges)
+        assert (np.arange(len(frame)) if found is None else found).tolist() == expected.tolist()
+
+    index.add({"Team": "a", "Runs": np.nan, "Average": 25}, len(frame))
+    frame.loc[len(frame)] = ["a", np.nan, 25]
+    assert index.lookup({}, {"Runs": (0, None)}).tolist() == linear_scan(frame, {}, {"Runs": (0, None)}).tolist()
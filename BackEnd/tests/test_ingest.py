@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+
+def football_rows(template, first_id: int, count: int):
+    return [{**template, "PlayerID": first_id + i} for i in range(count)]
+
+
+def test_bulk_insert(api):
+    import app
+
+    async def scenario(client):
+        template = (await client.get("/football/players", params={"limit": 1})).json()["data"][0]
+        return await client.post("/football/players/bulk", json=football_rows(template, 4_000_000, 25))
+
+    response = api(scenario)
+    assert response.status_code == 200
+    assert response.json()["count"] == 25
+    assert app.directory.locate([4_000_000, 4_000_024])[1] == []
+
+
+def test_bulk_insert_published_when_the_request_times_out(api, monkeypatch):
+    import app
+
+    real_insert = app.insert_rows
+
+    def slow_insert(conn, *args):
+        time.sleep(0.3)
+        return real_insert(conn, *args)
+
+    monkeypatch.setattr(app, "insert_rows", slow_insert)
+    monkeypatch.setattr(app, "BULK_INSERT_TIMEOUT", 0.05)
+
+    async def scenario(client):
+        template = (await client.get("/football/players", params={"limit": 1})).json()["data"][0]
+        response = await client.post("/football/players/bulk", json=football_rows(template, 5_000_000, 25))
+        for _ in range(100):
+            if not app.directory.locate([5_000_024])[1]:
+                break
+            await asyncio.sleep(0.05)
+        return response
+
+    response = api(scenario)
+    assert response.status_code == 504
+    # The rows committed after the request gave up are still visible
+    assert app.directory.locate([5_000_000, 5_000_024])[1] == []
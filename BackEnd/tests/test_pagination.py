@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+import db
+from pagination import decode_cursor, resolve_sort, split_page
+from database import table_name
+from snapshot import TableSnapshot
+
+PAGE = 7
+
+
+@pytest.fixture(scope="module", autouse=True)
+def null_averages(database):
+    """Blank the batting average (a nullable sort column) of every third player"""
+    conn = sqlite3.connect(database)
+    try:
+        conn.execute(f"UPDATE {table_name('cricket')} SET Avg = NULL WHERE rowid % 3 = 0")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def keys(rows):
+    return [(row["Team"], row["Format"], row["Gender"], row["No"], row["Name"]) for row in rows]
+
+
+def warehouse_pages(api, order):
+    async def scenario(client):
+        rows, cursor = [], None
+        while True:
+            params = {"sort": "Avg", "order": order, "limit": PAGE}
+            if cursor:
+                params["cursor"] = cursor
+            body = (await client.get("/cricket/players", params=params)).json()
+            rows.extend(body["data"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                return rows
+
+    return api(scenario)
+
+
+def snapshot_pages(order):
+    snapshot = TableSnapshot("cricket")
+    conn = db.get_connection()
+    try:
+        snapshot.load(conn)
+    finally:
+        conn.close()
+    ordering = resolve_sort("cricket", "Avg", order)
+    rows, cursor = [], None
+    while True:
+        after = decode_cursor(ordering, cursor) if cursor else None
+        page, cursor = split_page(snapshot.select(ordering=ordering, after=after, limit=PAGE + 1), ordering, PAGE)
+        rows.extend(page)
+        if not cursor:
+            return rows
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_pages_cover_null_sort_values(api, order):
+    rows = warehouse_pages(api, order)
+    assert len(rows) == 200
+    assert len(set(keys(rows))) == 200
+    averages = [row["Avg"] for row in rows]
+    nulls = averages.index(None)
+    # NULLs last in either direction
+    assert all(value is None for value in averages[nulls:])
+    assert averages[:nulls] == sorted(averages[:nulls], reverse=order == "desc")
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_snapshot_pages_match_the_warehouse(api, order):
+    assert keys(snapshot_pages(order)) == keys(warehouse_pages(api, order))
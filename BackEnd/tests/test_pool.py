@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from pool import ConnectionPool, ConnectionReleasedError, PoolTimeoutError
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+    def cursor(self):
+        return "cursor"
+
+
+def make_pool(**options):
+    created = []
+
+    def factory():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    return ConnectionPool(factory, **options), created
+
+
+def test_pool_never_grows_past_max_size():
+    pool, created = make_pool(min_size=0, max_size=2, acquire_timeout=0.05)
+    borrowed = [pool.acquire(), pool.acquire()]
+    started = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert time.monotonic() - started < 1
+    assert len(created) == 2
+    assert pool.metrics()["acquire_timeouts"] == 1
+
+    borrowed[0].close()
+    assert pool.acquire().raw is created[0]
+    assert len(created) == 2
+
+
+def test_a_waiter_gets_the_next_released_connection():
+    pool, _ = make_pool(min_size=0, max_size=1, acquire_timeout=5)
+    conn = pool.acquire()
+    threading.Timer(0.05, conn.close).start()
+    assert pool.acquire().raw is not None
+    assert pool.metrics()["max_wait_ms"] > 0
+
+
+def test_broken_connections_are_discarded():
+    pool, created = make_pool(
+        min_size=0, max_size=2, health_check=lambda conn: conn.healthy, health_check_after=0
+    )
+    conn = pool.acquire()
+    created[0].closed = True
+    conn.close()
+    assert pool.metrics()["size"] == 0
+
+    conn = pool.acquire()
+    created[1].healthy = False
+    conn.close()
+    # Failing its health check, the idle connection is replaced by a new one
+    assert pool.acquire().raw is created[2]
+    assert created[1].closed
+    assert pool.metrics()["total_discarded"] == 2
+
+
+def test_a_failed_open_gives_back_its_slots():
+    def factory():
+        raise ConnectionError("warehouse down")
+
+    pool = ConnectionPool(factory, min_size=2, max_size=2)
+    with pytest.raises(ConnectionError):
+        pool.open()
+    assert pool.metrics()["size"] == 0
+
+
+def test_a_released_connection_refuses_use():
+    pool, _ = make_pool(min_size=0, max_size=1)
+    conn = pool.acquire()
+    assert conn.cursor() == "cursor"
+    conn.close()
+    with pytest.raises(ConnectionReleasedError):
+        conn.cursor()
+    with pytest.raises(ConnectionReleasedError):
+        conn.raw
+    # Closing again is harmless and does not return it twice
+    conn.close()
+    assert pool.metrics()["idle"] == 1
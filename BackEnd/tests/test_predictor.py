@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from features import FOOTBALL_RAW, feature_matrix
+from predictor import predictor
+
+
+def players(count: int):
+    rng = np.random.default_rng(3)
+    rows = []
+    for i in range(count):
+        row = {feature: int(rng.integers(20, 99)) for feature in FOOTBALL_RAW}
+        row.update(PlayerID=i, Name=f"Player {i}")
+        rows.append(row)
+    return rows
+
+
+def test_predict_many_matches_predict():
+    predictor.load()
+    pool = players(60)
+    X = feature_matrix("football", pool)
+    rng = np.random.default_rng(5)
+    squads = [rng.choice(len(pool), int(rng.integers(1, 12)), replace=False).tolist() for _ in range(30)]
+    squads += [[4, 4, 9], []]
+    batched = predictor.predict_many("football", pool, squads, X)
+    for squad, result in zip(squads, batched):
+        expected = predictor.predict("football", [pool[i] for i in squad], X[np.asarray(squad, dtype=np.int64)])
+        assert result["key_players"] == expected["key_players"]
+        assert result["average_rating"] == pytest.approx(expected["average_rating"])
+        assert result["win_probability"] == pytest.approx(expected["win_probability"])
+    assert predictor.predict_many("football", pool, [], X) == []
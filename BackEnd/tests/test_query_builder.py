@@ -0,0 +1,79 @@
+import pytest
+
+import db
+from pagination import resolve_sort, split_page
+from query_builder import all_players, filtered_players, players_by_id
+
+
+@pytest.fixture
+def conn():
+    connection = db.get_connection()
+    yield connection
+    connection.close()
+
+
+def fetch(conn, statement, params=()):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(statement.sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def test_values_are_bound_and_never_change_the_statement():
+    ordering = resolve_sort("football", "overall", "desc")
+    first, first_params = filtered_players("football", {"max_rating": 80, "club": "Club 1"}, ordering, None, 10)
+    second, second_params = filtered_players("football", {"club": "B'; DROP", "max_rating": 70}, ordering, None, 50)
+    assert first == second
+    assert "Club 1" not in first.sql and "DROP" not in first.sql
+    # Predicates (and so params) follow FILTERS order, not the order given
+    assert first_params == ["Club 1", 80, 11]
+    assert second_params == ["B'; DROP", 70, 51]
+    assert first.sql.count("%s") == len(first_params)
+    # Unset, empty and zero filters are left out
+    unset, params = filtered_players("football", {"club": "", "min_rating": 0, "position": None}, ordering, None, 5)
+    assert "WHERE 1=1" in unset.sql and params == [6]
+
+
+def test_cursor_values_are_bound_including_nulls():
+    ordering = resolve_sort("football", "overall", "asc")
+    _, cursor = split_page([{"Overall": 70, "PlayerID": 5}, {}], ordering, 1)
+    statement, params = filtered_players("football", {"club": "A"}, ordering, cursor, 10)
+    assert statement.sql.count("%s") == len(params)
+    assert params[0] == "A" and params[-1] == 11
+    _, null_cursor = split_page([{"Overall": None, "PlayerID": 5}, {}], ordering, 1)
+    null_statement, null_params = filtered_players("football", {"club": "A"}, ordering, null_cursor, 10)
+    assert null_statement != statement
+    assert "Overall IS NULL" in null_statement.sql
+    assert null_statement.sql.count("%s") == len(null_params)
+
+
+def test_paging_keeps_the_filters_ahead_of_the_cursor_branches(conn):
+    # The cursor's OR branches must not escape the filters' ANDs: rows of
+    # other positions tied on Overall would otherwise follow each page
+    ordering = resolve_sort("football", "overall", "desc")
+    filters = {"position": "CM", "min_rating": 50}
+    columns = ["PlayerID", "Overall", "Position"]
+    seen, cursor = [], None
+    while True:
+        statement, params = filtered_players("football", filters, ordering, cursor, 3, columns)
+        page, cursor = split_page(fetch(conn, statement, params), ordering, 3)
+        seen.extend(page)
+        if cursor is None:
+            break
+    expected = sorted(
+        (row for row in fetch(conn, all_players("football", columns)) if row["Position"] == "CM" and row["Overall"] >= 50),
+        key=lambda row: (-row["Overall"], row["PlayerID"]),
+    )
+    assert len(expected) > 3
+    assert seen == expected
+
+
+def test_id_lookups_are_padded_to_a_bucket(conn):
+    statement, params = players_by_id("football", [3, 1], ["PlayerID"])
+    assert statement.name == "football.players_by_id[4]"
+    assert params == [3, 1, 1, 1]
+    assert sorted(row["PlayerID"] for row in fetch(conn, statement, params)) == [1, 3]
+    assert players_by_id("football", [7, 8, 9], ["PlayerID"]) == (statement, [7, 8, 9, 9])
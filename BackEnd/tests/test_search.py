@@ -0,0 +1,46 @@
+import pandas as pd
+
+from search import NameIndex, edit_distance, normalize
+
+NAMES = ["Sergio Agüero", "Lionel Messi", "Cristiano Ronaldo", "Ronaldinho", "Mesut Özil", "Ronald Koeman"]
+
+
+def index():
+    return NameIndex("football", pd.DataFrame({"Name": NAMES}))
+
+
+def names(matches):
+    return [NAMES[position] for position, _ in matches]
+
+
+def test_accents_and_case_are_ignored():
+    assert normalize("Mesut ÖZIL") == "mesut ozil"
+    assert names(index().search("aguero")) == ["Sergio Agüero"]
+    assert names(index().search("Özil")) == ["Mesut Özil"]
+
+
+def test_the_last_term_matches_as_a_prefix():
+    found = names(index().search("ronald"))
+    # The exact token ranks above the longer names it is a prefix of
+    assert found[0] == "Ronald Koeman"
+    assert set(found) == {"Ronald Koeman", "Ronaldinho", "Cristiano Ronaldo"}
+    # Earlier terms must match whole tokens
+    assert names(index().search("cris ronaldo")) == []
+    assert names(index().search("cristiano ron")) == ["Cristiano Ronaldo"]
+
+
+def test_typos_are_tolerated_by_term_length():
+    assert names(index().search("lionel mesi")) == ["Lionel Messi"]
+    assert names(index().search("ronaldiniho")) == ["Ronaldinho"]
+    # Terms under four characters must match exactly (or as a prefix)
+    # ...and a name starting with the query ranks first
+    assert names(index().search("mes")) == ["Mesut Özil", "Lionel Messi"]
+    assert names(index().search("msi")) == []
+    assert edit_distance("messi", "mesi", 2) == 1
+
+
+def test_appended_rows_are_searchable():
+    names_index = index()
+    names_index.append_rows([{"Name": "Erling Haaland"}])
+    assert [position for position, _ in names_index.search("haland")] == [len(NAMES)]
+    assert len(names_index) == len(NAMES) + 1
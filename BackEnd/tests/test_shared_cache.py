@@ -0,0 +1,73 @@
+"""Rows added by one worker reach the others through the shared cache."""
+import os
+
+from shared_cache import SharedCache
+
+
+def _workers(tmp_path, count=2):
+    path = os.path.join(tmp_path, "shared.db")
+    workers = [SharedCache(path) for _ in range(count)]
+    changes = [[] for _ in workers]
+    for worker, seen in zip(workers, changes):
+        worker.subscribe(lambda table, rows, seen=seen: seen.append((table, rows)))
+    return workers, changes
+
+
+def test_added_rows_are_passed_to_other_workers(tmp_path):
+    (first, second), (_, seen) = _workers(tmp_path)
+    first.bump("cricket", [{"PLAYER_ID": 1}])
+    first.bump("cricket", [{"PLAYER_ID": 2}])
+    second.sync()
+    assert seen == [("cricket", [{"PLAYER_ID": 1}, {"PLAYER_ID": 2}])]
+
+
+def test_other_changes_force_a_reload(tmp_path):
+    (first, second), (_, seen) = _workers(tmp_path)
+    first.bump("cricket", [{"PLAYER_ID": 1}])
+    first.bump("cricket")
+    second.sync()
+    assert seen == [("cricket", None)]
+
+
+def test_rows_pruned_before_a_sync_force_a_reload(tmp_path):
+    (first, second), (_, seen) = _workers(tmp_path)
+    first.change_retention = -1
+    first.bump("cricket", [{"PLAYER_ID": 1}])
+    second.sync()
+    assert seen == [("cricket", None)]
+
+
+def test_own_rows_are_not_applied_twice(tmp_path):
+    (first, second), (seen_first, _) = _workers(tmp_path)
+    second.bump("cricket", [{"PLAYER_ID": 1}])
+    # first has not synced yet, so its own write lands behind second's
+    first.bump("cricket", [{"PLAYER_ID": 2}])
+    first.sync()
+    assert seen_first == [("cricket", [{"PLAYER_ID": 1}])]
+
+
+def test_values_are_stored_as_json(tmp_path):
+    import decimal
+
+    (first, second), _ = _workers(tmp_path)
+    first.set("cricket", "key", first.generation("cricket"), [{"Runs": decimal.Decimal("12.5")}])
+    assert second.get("cricket", "key") == [{"Runs": 12.5}]
+    stored = second._conn().execute("SELECT value FROM entries").fetchone()[0]
+    assert stored == '[{"Runs":12.5}]'
+
+
+def test_server_creates_the_file_in_a_private_directory():
+    import shutil
+    import stat
+
+    import server
+
+    paths = [server._shared_cache_path(), server._shared_cache_path()]
+    try:
+        assert paths[0] != paths[1]
+        for path in paths:
+            assert stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode) == 0o700
+            assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    finally:
+        for path in paths:
+            shutil.rmtree(os.path.dirname(path))
@@ -0,0 +1,72 @@
+import numpy as np
+
+import similarity
+from similarity import SimilarityIndex, parse_money
+
+
+def build(rows=2000, dims=12, seed=1):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(50, 15, (rows, dims)).astype(np.float32)
+    # Row 1 is a near-duplicate of row 0
+    vectors[1] = vectors[0] + rng.normal(0, 0.5, dims)
+    values = rng.uniform(1e5, 1e8, rows)
+    values[::7] = np.nan
+    return SimilarityIndex("football", vectors, values), vectors
+
+
+def brute_force(vectors, position, k, keep=None):
+    z = (vectors - vectors.mean(axis=0)) / vectors.std(axis=0)
+    z /= np.linalg.norm(z, axis=1, keepdims=True)
+    scores = z @ z[position]
+    scores[position] = -np.inf
+    if keep is not None:
+        scores[~keep] = -np.inf
+    return np.argsort(-scores, kind="stable")[:k]
+
+
+def test_exact_search_ranks_like_brute_force():
+    index, vectors = build()
+    positions, scores, method = index.search(0, 10)
+    assert method == "exact"
+    assert positions.tolist() == brute_force(vectors, 0, 10).tolist()
+    assert positions[0] == 1 and np.all(np.diff(scores) <= 0)
+
+
+def test_lsh_search_finds_the_near_neighbours(monkeypatch):
+    index, vectors = build()
+    monkeypatch.setattr(similarity, "EXACT_SEARCH_MAX", 0)
+    positions, scores, method = index.search(0, 10)
+    assert method == "lsh"
+    assert positions[0] == 1
+    assert 0 not in positions.tolist()
+    # Candidates are re-ranked exactly, so the scores are true cosine similarities
+    exact = dict(zip(*index.search(0, len(index))[:2]))
+    assert np.allclose(scores, [exact[position] for position in positions])
+
+
+def test_max_value_keeps_known_values_at_most_the_limit(monkeypatch):
+    index, vectors = build()
+    limit = 5e7
+    keep = ~np.isnan(index.values) & (index.values <= limit)
+    positions, _, method = index.search(3, 20, max_value=limit)
+    assert method == "exact"
+    assert positions.tolist() == brute_force(vectors, 3, 20, keep).tolist()
+
+    monkeypatch.setattr(similarity, "EXACT_SEARCH_MAX", 0)
+    positions, _, _ = index.search(3, 20, max_value=limit)
+    assert len(positions) == 20
+    assert np.all(index.values[positions] <= limit)
+
+
+def test_lsh_falls_back_to_exact_when_too_few_candidates(monkeypatch):
+    index, vectors = build()
+    monkeypatch.setattr(similarity, "EXACT_SEARCH_MAX", 0)
+    positions, _, method = index.search(0, len(index) - 1)
+    assert method == "exact"
+    assert len(positions) == len(index) - 1
+
+
+def test_parse_money():
+    assert parse_money("€110.5M") == 110.5e6
+    assert parse_money("€500K") == 500e3
+    assert np.isnan(parse_money("unknown")) and np.isnan(parse_money(None))
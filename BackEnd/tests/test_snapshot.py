@@ -0,0 +1,123 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import db
+from database import table_name
+from snapshot import TableSnapshot
+from write_behind import WriteBehindQueue
+
+
+@pytest.fixture
+def conn():
+    connection = db.get_connection()
+    yield connection
+    connection.close()
+
+
+def write(database, sql, params=()):
+    connection = sqlite3.connect(database)
+    try:
+        connection.execute(sql.format(table=table_name("football")), params)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def test_refresh_detects_updates_and_same_size_replacements(conn, database):
+    snapshot = TableSnapshot("football")
+    snapshot.load(conn)
+    assert not snapshot.refresh(conn)
+
+    write(database, "UPDATE {table} SET Name = ? WHERE PlayerID = 3", ("Renamed Player",))
+    assert snapshot.refresh(conn)
+    assert snapshot.select(equals={"PlayerID": 3})[0]["Name"] == "Renamed Player"
+    assert not snapshot.refresh(conn)
+
+    # A delete and an insert leave the row count unchanged
+    row = snapshot.select(equals={"PlayerID": 4})[0]
+    write(database, "DELETE FROM {table} WHERE PlayerID = 4")
+    columns = ", ".join(f'"{column}"' for column in row)
+    placeholders = ", ".join("?" * len(row))
+    write(database, f"INSERT INTO {{table}} ({columns}) VALUES ({placeholders})", [*{**row, "PlayerID": 6_000_000}.values()])
+    assert snapshot.refresh(conn)
+    assert snapshot.select(equals={"PlayerID": 4}) == []
+
+
+def test_rows_appended_through_the_api_do_not_force_a_reload(conn, database):
+    snapshot = TableSnapshot("football")
+    snapshot.load(conn)
+    row = {**snapshot.select(equals={"PlayerID": 5})[0], "PlayerID": 6_100_000}
+    columns = ", ".join(f'"{column}"' for column in row)
+    write(database, f"INSERT INTO {{table}} ({columns}) VALUES ({', '.join('?' * len(row))})", list(row.values()))
+    snapshot.append_rows([row])
+    version = snapshot.version
+    assert not snapshot.refresh(conn)
+    assert snapshot.version == version
+
+
+def test_queued_rows_survive_reloads_until_written_or_dropped(conn, database, tmp_path):
+    queue = WriteBehindQueue(str(tmp_path / "writes.db"), max_attempts=1)
+    snapshot = TableSnapshot("football")
+    snapshot.queued = queue.queued
+    snapshot.load(conn)
+    template = snapshot.select(equals={"PlayerID": 5})[0]
+    kept, dropped = ({**template, "PlayerID": player_id} for player_id in (6_200_000, 6_200_001))
+    write_ids = queue.enqueue("football", [kept, dropped])
+    snapshot.append_queued(write_ids, [kept, dropped])
+
+    snapshot.load(conn)
+    snapshot.append_queued(write_ids, [kept, dropped])
+    assert len(snapshot.select(equals={"PlayerID": 6_200_000})) == 1
+    assert len(snapshot.select(equals={"PlayerID": 6_200_001})) == 1
+
+    # Written to the warehouse but not yet removed from the queue: shown once
+    columns = ", ".join(f'"{column}"' for column in kept)
+    write(database, f"INSERT INTO {{table}} ({columns}) VALUES ({', '.join('?' * len(kept))})", list(kept.values()))
+    assert queue._settle([], {write_ids[1]: "rejected"}) == 1
+    snapshot.load(conn)
+    assert len(snapshot.select(equals={"PlayerID": 6_200_000})) == 1
+    assert snapshot.select(equals={"PlayerID": 6_200_001}) == []
+
+
+def test_a_load_never_changes_the_state_a_reader_holds(conn, database):
+    snapshot = TableSnapshot("football")
+    snapshot.load(conn)
+    with snapshot.reading() as state:
+        before = len(state.frame)
+        write(database, "DELETE FROM {table} WHERE PlayerID = 6")
+        snapshot.load(conn)
+        assert snapshot.state is not state
+        assert len(state.frame) == len(state.features) == before
+        assert state.records_at(state.positions_in("PlayerID", [6]), ["PlayerID"]) == [{"PlayerID": 6}]
+    assert snapshot.select(equals={"PlayerID": 6}) == []
+
+
+def test_a_failed_first_load_is_retried_before_the_refresh_interval(conn, monkeypatch):
+    import snapshot as module
+
+    monkeypatch.setattr(module, "LOAD_RETRY_DELAY", 0.01)
+    manager = module.SnapshotManager(("football",))
+    manager.enabled, manager.refresh_interval = True, 3600
+    attempts = []
+
+    async def run_query(fn, timeout=None):
+        attempts.append(fn)
+        if len(attempts) <= 2:
+            raise ConnectionError("warehouse unavailable")
+        return fn(conn)
+
+    async def main():
+        await manager.start(run_query)
+        try:
+            for _ in range(200):
+                if manager["football"].source == "warehouse":
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await manager.stop()
+
+    asyncio.run(main())
+    assert manager["football"].source == "warehouse"
+    assert len(attempts) == 3
@@ -0,0 +1,46 @@
+import asyncio
+import sqlite3
+
+import db
+from database import table_name
+from schema import TABLES
+from streaming import RowStream, RowStreamResponse
+
+
+def borrowed() -> int:
+    return db.get_pool().metrics()["borrowed"]
+
+
+def test_streams_all_rows(api, database):
+    conn = sqlite3.connect(database)
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM {table_name('football')}").fetchone()[0]
+    finally:
+        conn.close()
+
+    async def scenario(client):
+        return await client.get("/football/players/all", headers={"Accept": "application/x-ndjson"})
+
+    response = api(scenario)
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == total
+    assert borrowed() == 0
+
+
+def test_connection_released_when_client_leaves_before_the_body():
+    rows = RowStream(f"SELECT * FROM {TABLES['football']}")
+    assert borrowed() == 1
+    response = RowStreamResponse(rows)
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client went away")
+
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+    try:
+        asyncio.run(response(scope, receive, send))
+    except Exception:
+        pass
+    assert borrowed() == 0
@@ -0,0 +1,31 @@
+import pytest
+
+from write_behind import QueueFullError, WriteBehindQueue
+
+
+def pending(queue):
+    return queue._conn().execute("SELECT value FROM counters WHERE name = 'pending'").fetchone()[0]
+
+
+def test_the_pending_counter_follows_enqueue_settle_and_retry(tmp_path):
+    queue = WriteBehindQueue(str(tmp_path / "writes.db"), max_pending=3, max_attempts=1)
+    first, second = queue.enqueue("cricket", [{"Player_Id": 1}, {"Player_Id": 2}])
+    assert pending(queue) == 2
+    with pytest.raises(QueueFullError):
+        queue.enqueue("cricket", [{"Player_Id": 3}, {"Player_Id": 4}])
+    assert queue.rejected == 2 and pending(queue) == 2
+
+    # One row written, the other dropped on its only attempt
+    assert queue._settle([first], {second: "bad row"}) == 1
+    assert pending(queue) == 0
+    assert queue.retry_failed() == 1
+    assert pending(queue) == 1
+    # Settling a row another process already deleted does not count it twice
+    queue._settle([first], {})
+    assert pending(queue) == queue.stats()["depth"] == 1
+
+
+def test_the_counter_starts_from_an_existing_log(tmp_path):
+    path = str(tmp_path / "writes.db")
+    WriteBehindQueue(path).enqueue("football", [{"Player_Id": 1}] * 3)
+    assert pending(WriteBehindQueue(path)) == 3
@@ -0,0 +1,366 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ingest import BULK_BATCH_SIZE, insert_rows
+from schema import TABLES
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "0") == "1"
+WRITE_BEHIND_PATH = os.getenv("WRITE_BEHIND_PATH", "write_behind.db")
+WRITE_BEHIND_BATCH_ROWS = int(os.getenv("WRITE_BEHIND_BATCH_ROWS", str(BULK_BATCH_SIZE)))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "1"))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "100000"))
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "20"))
+WRITE_BEHIND_MAX_RETRY_DELAY = float(os.getenv("WRITE_BEHIND_MAX_RETRY_DELAY", "60"))
+
+# A flusher that dies mid-batch leaves its rows claimed for this long
+CLAIM_SECONDS = 300.0
+
+
+class QueueFullError(Exception):
+    """Raised when accepting more rows would exceed WRITE_BEHIND_MAX_PENDING"""
+
+
+def retry_delay(attempts: int, max_delay: float = WRITE_BEHIND_MAX_RETRY_DELAY) -> float:
+    """Exponential backoff: 1s, 2s, 4s, ... capped at ``max_delay``"""
+    return min(2.0 ** max(attempts - 1, 0), max_delay)
+
+
+class WriteBehindQueue:
+    """Durable log of accepted player inserts, written to the warehouse in the background.
+
+    Inserts are committed to a local SQLite file (synchronous=FULL, so an
+    acknowledged row survives a crash) and answered with their write ID
+    right away. A background task claims the oldest rows of each table and
+    inserts them in one transaction per batch, so a burst of single-row
+    requests costs a few warehouse round trips and at most one connection.
+
+    A batch that fails is retried row by row to isolate bad rows. Rows that
+    fail on their own are retried with exponential backoff and, after
+    WRITE_BEHIND_MAX_ATTEMPTS, dropped: kept as failed until retry_failed(),
+    and reported to the listeners so reads stop showing them. Rows are
+    deleted only after their transaction commits, so delivery is at least
+    once: a crash between the commit and the delete writes the batch again.
+
+    Several worker processes can share one log; each claims different rows.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_rows: int = WRITE_BEHIND_BATCH_ROWS,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        max_attempts: int = WRITE_BEHIND_MAX_ATTEMPTS,
+    ):
+        self.path = path
+        self.batch_rows = max(1, batch_rows)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._task = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._listeners: List[Callable[[str, int], None]] = []
+
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+        self.last_flush: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS writes (id INTEGER PRIMARY KEY AUTOINCREMENT, sport TEXT NOT NULL, "
+            "row TEXT NOT NULL, enqueued REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_attempt REAL NOT NULL DEFAULT 0, claimed_until REAL NOT NULL DEFAULT 0, "
+            "failed INTEGER NOT NULL DEFAULT 0, error TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS writes_due ON writes (sport, failed, next_attempt)")
+        # Rows not yet written or dropped, kept in step by every transaction that changes
+        # that number so enqueue() never counts the log; shared by all worker processes
+        conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute(
+            "INSERT OR IGNORE INTO counters (name, value) "
+            "SELECT 'pending', COUNT(*) FROM writes WHERE failed = 0"
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["WriteBehindQueue"]:
+        """The queue at WRITE_BEHIND_PATH, or None when WRITE_BEHIND_ENABLED is off"""
+        if not WRITE_BEHIND_ENABLED:
+            return None
+        return cls(WRITE_BEHIND_PATH)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread and process: SQLite handles must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def subscribe(self, listener: Callable[[str, int, int], None]):
+        """Call ``listener(sport, written, dropped)`` on the event loop after a flush wrote
+        rows to the warehouse or dropped rows that exhausted their attempts"""
+        self._listeners.append(listener)
+
+    # Accepting writes
+
+    def enqueue(self, sport: str, rows: List[Dict]) -> List[int]:
+        """Durably queue validated {table column: value} rows; returns their write IDs.
+
+        Blocks on an fsync, so call it off the event loop.
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            pending = conn.execute("SELECT value FROM counters WHERE name = 'pending'").fetchone()[0]
+            if pending + len(rows) > self.max_pending:
+                raise QueueFullError(f"{pending} writes already queued (limit {self.max_pending})")
+            ids = [
+                conn.execute(
+                    "INSERT INTO writes (sport, row, enqueued) VALUES (?, ?, ?)", (sport, json.dumps(row), now)
+                ).lastrowid
+                for row in rows
+            ]
+            self._count(conn, len(ids))
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            if isinstance(e, QueueFullError):
+                self.rejected += len(rows)
+            raise
+        self.accepted += len(rows)
+        if self._loop is not None and pending + len(rows) >= self.batch_rows:
+            # A full batch is waiting: flush now rather than at the next tick
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return ids
+
+    @staticmethod
+    def _count(conn: sqlite3.Connection, change: int):
+        """Adjust the pending counter, inside the caller's transaction"""
+        if change:
+            conn.execute("UPDATE counters SET value = value + ? WHERE name = 'pending'", (change,))
+
+    def queued(self, sport: str) -> List[Tuple[int, Dict]]:
+        """(write ID, row) of every row of ``sport`` not yet written (or dropped), oldest first"""
+        return [
+            (write_id, json.loads(row))
+            for write_id, row in self._conn().execute(
+                "SELECT id, row FROM writes WHERE sport = ? AND failed = 0 ORDER BY id", (sport,)
+            )
+        ]
+
+    def status(self, write_id: int) -> Optional[Dict]:
+        """State of one write: queued, failed or written; None for IDs never issued"""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT sport, enqueued, attempts, failed, error FROM writes WHERE id = ?", (write_id,)
+        ).fetchone()
+        if row is not None:
+            sport, enqueued, attempts, failed, error = row
+            return {
+                "id": write_id,
+                "sport": sport,
+                "state": "failed" if failed else "queued",
+                "age_seconds": round(time.time() - enqueued, 3),
+                "attempts": attempts,
+                "error": error,
+            }
+        # IDs are issued in increasing order and rows are deleted once written
+        issued = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'writes'").fetchone()
+        if issued is None or not 0 < write_id <= issued[0]:
+            return None
+        return {"id": write_id, "state": "written"}
+
+    def retry_failed(self) -> int:
+        """Queue rows that exhausted their attempts again; returns how many"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            count = conn.execute(
+                "UPDATE writes SET failed = 0, attempts = 0, next_attempt = 0 WHERE failed = 1"
+            ).rowcount
+            self._count(conn, count)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return count
+
+    # Flushing
+
+    def _claim(self, sport: str) -> List[Tuple[int, Dict]]:
+        """Mark up to batch_rows due rows of ``sport`` as being written by this process"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            claimed = conn.execute(
+                "SELECT id, row FROM writes WHERE sport = ? AND failed = 0 AND next_attempt <= ? "
+                "AND claimed_until <= ? ORDER BY id LIMIT ?",
+                (sport, now, now, self.batch_rows)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE writes SET claimed_until = ? WHERE id = ?",
+                [(now + CLAIM_SECONDS, write_id) for write_id, _ in claimed]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [(write_id, json.loads(row)) for write_id, row in claimed]
+
+    def _settle(self, written: List[int], failed: Dict[int, str]) -> int:
+        """Delete written rows and schedule the retry of failed ones; returns how many were dropped"""
+        conn = self._conn()
+        now = time.time()
+        dropped = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have written and deleted a row whose claim expired
+            deleted = conn.executemany(
+                "DELETE FROM writes WHERE id = ?", [(write_id,) for write_id in written]
+            ).rowcount
+            for write_id, error in failed.items():
+                attempts = conn.execute("SELECT attempts FROM writes WHERE id = ?", (write_id,)).fetchone()[0] + 1
+                exhausted = 0 < self.max_attempts <= attempts
+                conn.execute(
+                    "UPDATE writes SET attempts = ?, next_attempt = ?, claimed_until = 0, failed = ?, error = ? "
+                    "WHERE id = ?",
+                    (attempts, now + retry_delay(attempts), int(exhausted), error, write_id)
+                )
+                dropped += exhausted
+            self._count(conn, -(max(deleted, 0) + dropped))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return dropped
+
+    def flush(self, conn) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Write one batch of due rows per table to the warehouse on ``conn``.
+
+        Returns the number of rows written, and of rows dropped, per sport.
+        """
+        written_by_sport = {}
+        dropped_by_sport = {}
+        for sport in TABLES:
+            claimed = self._claim(sport)
+            if not claimed:
+                continue
+            inserted, errors = insert_rows(conn, sport, claimed, batch_size=len(claimed))
+            if errors and len(claimed) > 1:
+                # Retry one row per transaction so a bad row only holds back itself
+                inserted, errors = insert_rows(conn, sport, claimed, batch_size=1)
+            failed = {error["row"]: error["error"] for error in errors}
+            written = [write_id for write_id, _ in claimed if write_id not in failed]
+            dropped = self._settle(written, failed)
+            self.flushes += 1
+            self.failures += len(failed)
+            if failed:
+                self.last_error = next(iter(failed.values()))
+            if dropped:
+                dropped_by_sport[sport] = dropped
+                logger.error(f"Dropped {dropped} queued {sport} players after {self.max_attempts} attempts")
+            if written:
+                written_by_sport[sport] = len(written)
+                self.flushed += len(written)
+                self.last_flush = time.time()
+                logger.info(f"Wrote {len(written)} queued {sport} players to the warehouse")
+        return written_by_sport, dropped_by_sport
+
+    async def start(self, run_query: Callable):
+        """Flush in the background every flush_interval seconds (sooner when a batch is full).
+
+        ``run_query`` is an async callable running ``fn(conn)`` with a pooled
+        connection, i.e. the query executor.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._flush_loop(run_query))
+
+    async def _flush_loop(self, run_query: Callable):
+        failures = 0
+        while True:
+            try:
+                written, dropped = await run_query(self.flush)
+                failures = 0
+            except Exception as e:
+                # Nothing was written or lost: claimed rows are released when the claim expires
+                failures += 1
+                self.last_error = str(e)
+                logger.error(f"Write-behind flush failed: {str(e)}")
+                written, dropped = {}, {}
+            for sport in TABLES:
+                if sport in written or sport in dropped:
+                    for listener in self._listeners:
+                        listener(sport, written.get(sport, 0), dropped.get(sport, 0))
+            if written and any(count >= self.batch_rows for count in written.values()):
+                # More may be due already
+                continue
+            self._wakeup.clear()
+            delay = retry_delay(failures) if failures else self.flush_interval
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self, run_query: Optional[Callable] = None):
+        """Stop flushing; with ``run_query``, first try to write what is due once more"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+        if run_query is not None:
+            try:
+                await run_query(self.flush)
+            except Exception as e:
+                # Still in the log: written after the next start
+                logger.warning(f"Final write-behind flush failed: {str(e)}")
+
+    def stats(self) -> Dict:
+        conn = self._conn()
+        pending = {sport: 0 for sport in TABLES}
+        for sport, count in conn.execute("SELECT sport, COUNT(*) FROM writes WHERE failed = 0 GROUP BY sport"):
+            pending[sport] = count
+        failed, oldest = conn.execute(
+            "SELECT SUM(failed), MIN(CASE WHEN failed = 0 THEN enqueued END) FROM writes"
+        ).fetchone()
+        return {
+            "path": self.path,
+            "pending": pending,
+            "depth": sum(pending.values()),
+            "failed": failed or 0,
+            "max_pending": self.max_pending,
+            # How far the warehouse is behind: age of the oldest queued row
+            "lag_seconds": round(time.time() - oldest, 3) if oldest is not None else 0.0,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "row_failures": self.failures,
+            "last_flush": self.last_flush,
+            "last_error": self.last_error,
+        }
+
+
+write_queue = WriteBehindQueue.from_env()